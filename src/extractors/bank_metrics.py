@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, List
+
+import pandas as pd
+
+from storage.aggregates import AggregateStore
+from storage.models import BankMetric, NewsArticle
+from storage.records_repository import bank_metric_repository, news_repository
+
+logger = logging.getLogger(__name__)
+
+# Listed banks and the short names news articles use for them; longer names
+# first so that "中国工商银行" wins over "中国银行".
+BANK_ALIASES = {
+    "中国工商银行": "工商银行", "工商银行": "工商银行", "工行": "工商银行",
+    "中国建设银行": "建设银行", "建设银行": "建设银行", "建行": "建设银行",
+    "中国农业银行": "农业银行", "农业银行": "农业银行", "农行": "农业银行",
+    "中国银行": "中国银行", "中行": "中国银行",
+    "交通银行": "交通银行", "交行": "交通银行",
+    "中国邮政储蓄银行": "邮储银行", "邮储银行": "邮储银行",
+    "招商银行": "招商银行", "招行": "招商银行",
+    "兴业银行": "兴业银行", "中信银行": "中信银行", "浦发银行": "浦发银行", "民生银行": "民生银行",
+    "光大银行": "光大银行", "平安银行": "平安银行", "华夏银行": "华夏银行", "广发银行": "广发银行",
+    "浙商银行": "浙商银行", "北京银行": "北京银行", "上海银行": "上海银行", "江苏银行": "江苏银行",
+    "宁波银行": "宁波银行", "南京银行": "南京银行", "杭州银行": "杭州银行", "汉口银行": "汉口银行",
+    "湖北银行": "湖北银行",
+}
+# A name ending in 银行 that runs on into 银行业 (the banking industry, but not
+# 业绩/业务), 银行间 (interbank) or 银行保险/银保监 (the regulator) is part of
+# a longer term: "中国银行业金融机构" and "湖北银行业" name no single bank.
+BANK_NAME_END = r"(?!业(?!绩|务)|间|保险|保监)"
+# Metric phrases mapped to the canonical metric name stored in BankMetric.
+METRIC_TERMS = {
+    "科技贷款": "科技贷款余额", "科技型企业贷款": "科技贷款余额", "科技企业贷款": "科技贷款余额",
+    "科技金融贷款": "科技贷款余额", "科创贷款": "科技贷款余额", "科创企业贷款": "科技贷款余额",
+    "专精特新企业贷款": "专精特新贷款余额", "专精特新贷款": "专精特新贷款余额",
+    "科技型企业客户": "科技企业客户数", "科技企业客户": "科技企业客户数", "科创企业客户": "科技企业客户数",
+    "科技金融客户": "科技企业客户数", "专精特新企业客户": "专精特新客户数", "专精特新客户": "专精特新客户数",
+    "投贷联动": "投贷联动",
+}
+# Canonical unit and scale factor of every unit the pattern accepts.
+UNIT_SCALE = {
+    "万亿元": ("亿元", 10000.0), "亿元": ("亿元", 1.0), "万元": ("亿元", 0.0001),
+    "万户": ("万户", 1.0), "万家": ("万户", 1.0), "户": ("万户", 0.0001), "家": ("万户", 0.0001),
+    "%": ("%", 1.0),
+}
+GROWTH_SUFFIX = "同比增速"
+MIN_SNIPPET = 40
+MAX_SNIPPET = 200
+
+
+def _alternatives(terms: Iterable[str]) -> str:
+    return "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+
+
+def _bank_alternatives() -> str:
+    aliases = sorted(BANK_ALIASES, key=len, reverse=True)
+    return "|".join(re.escape(alias) + (BANK_NAME_END if alias.endswith("银行") else "") for alias in aliases)
+
+
+BANK_PATTERN = f"({_bank_alternatives()})"
+YEAR_PATTERN = r"(20\d{2})\s*年"
+# One combined pattern: metric phrase, a short gap without digits or sentence
+# breaks, a number with unit, and optionally the year-over-year growth after it.
+METRIC_PATTERN = re.compile(
+    rf"(?P<metric>{_alternatives(METRIC_TERMS)})(?:余额|规模|数量|数)?[^。；！？\d%]{{0,16}}?"
+    rf"(?P<number>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>{_alternatives(UNIT_SCALE)})"
+    r"(?:[^。；！？\d]{0,8}?(?:增长|增加|提升|增幅为?|增速为?)\s*(?P<growth>\d+(?:\.\d+)?)\s*%)?"
+)
+PARAGRAPH_SPLIT = re.compile(r"\s*\n\s*")
+SENTENCE_SPLIT = re.compile(r"(?<=[。！？；])")
+
+
+def segment(text: str | None) -> List[str]:
+    """Split ``text`` into evidence segments of ``MIN_SNIPPET``-``MAX_SNIPPET`` characters.
+
+    Paragraphs are cut at sentence ends; short paragraphs are joined with the
+    next one and sentences longer than ``MAX_SNIPPET`` are cut hard. A short
+    tail is merged into the last segment, or takes ``MIN_SNIPPET`` characters
+    from it when both would not fit; only a text shorter than ``MIN_SNIPPET``
+    yields a shorter segment.
+    """
+    segments: List[str] = []
+    current = ""
+    for paragraph in PARAGRAPH_SPLIT.split(text or ""):
+        for sentence in SENTENCE_SPLIT.split(paragraph.strip()):
+            if len(current) + len(sentence) <= MAX_SNIPPET:
+                current += sentence
+                continue
+            if len(current) >= MIN_SNIPPET:
+                segments.append(current)
+                current = ""
+            current += sentence
+            while len(current) > MAX_SNIPPET:
+                segments.append(current[:MAX_SNIPPET])
+                current = current[MAX_SNIPPET:]
+        if len(current) >= MIN_SNIPPET:
+            segments.append(current)
+            current = ""
+    if current and segments:
+        current = segments.pop() + current
+        if len(current) > MAX_SNIPPET:
+            cut = len(current) - MIN_SNIPPET
+            segments.append(current[:cut])
+            current = current[cut:]
+    if current:
+        segments.append(current)
+    return segments
+
+
+def bank_metrics(articles: Iterable[NewsArticle]) -> List[BankMetric]:
+    """Extract bank tech-finance metrics (balances, client counts, growth) from news articles.
+
+    Articles are segmented into evidence snippets whose sentences are scanned
+    in one batch with vectorized pandas string operations. A sentence without
+    a bank or year takes the last one named earlier in the article (or in its
+    title); the snippet around the sentence is kept as evidence.
+    Amounts are normalized to 亿元 and client counts to 万户; growth rates
+    following a value become ``<metric>同比增速`` records in %.
+    """
+    articles = list(articles)
+    snippets = [(position, text) for position, article in enumerate(articles) for text in segment(article.content_text)]
+    rows = [(snippets[index][0], index, sentence) for index, (_, text) in enumerate(snippets) for sentence in SENTENCE_SPLIT.split(text) if sentence]
+    if not rows:
+        return []
+    sentences = pd.DataFrame(rows, columns=["article", "snippet", "text"])
+    titles = pd.Series([article.title or "" for article in articles])
+
+    context = sentences[["article", "snippet"]].copy()
+    context["bank"] = sentences["text"].str.extract(BANK_PATTERN, expand=False).map(BANK_ALIASES)
+    context["year"] = sentences["text"].str.extract(YEAR_PATTERN, expand=False)
+    context[["bank", "year"]] = context.groupby("article")[["bank", "year"]].ffill()
+    title_bank = titles.str.extract(BANK_PATTERN, expand=False).map(BANK_ALIASES)
+    title_year = titles.str.extract(YEAR_PATTERN, expand=False)
+    context["bank"] = context["bank"].fillna(sentences["article"].map(title_bank))
+    context["year"] = context["year"].fillna(sentences["article"].map(title_year))
+
+    found = sentences["text"].str.extractall(METRIC_PATTERN)
+    if found.empty:
+        return []
+    found = found.droplevel("match").join(context)
+    found["text"] = found["snippet"].map(pd.Series([text for _, text in snippets]))
+    found = found.dropna(subset=["bank", "year"])
+    found["metric"] = found["metric"].map(METRIC_TERMS)
+    found["value"] = found["number"].str.replace(",", "", regex=False).astype(float)
+    units = found["unit"].map(UNIT_SCALE)
+    found["unit"] = units.str[0]
+    found["value"] = found["value"] * units.str[1]
+    # A bare percentage after a metric phrase is the growth rate itself.
+    rates = found["unit"] == "%"
+    found.loc[rates, "metric"] = found.loc[rates, "metric"] + GROWTH_SUFFIX
+
+    growth = found[found["growth"].notna() & ~rates]
+    growth = growth.assign(metric=growth["metric"] + GROWTH_SUFFIX, value=growth["growth"].astype(float), unit="%")
+    records = pd.concat([found, growth]).sort_index(kind="stable")
+    records = records.drop_duplicates(subset=["article", "bank", "metric", "year"], keep="first")
+
+    urls = [article.source_url for article in articles]
+    return [
+        BankMetric(bank=bank, metric=metric, year=int(year), value=round(value, 6), unit=unit, evidence_url=urls[article], snippet=text)
+        for article, bank, metric, year, value, unit, text in zip(
+            records["article"], records["bank"], records["metric"], records["year"], records["value"], records["unit"], records["text"]
+        )
+    ]
+
+
+def synthetic_articles(count: int) -> List[NewsArticle]:
+    """News-like articles mixing metric sentences with filler, for benchmarks and tests."""
+    banks = ["招商银行", "工商银行", "建设银行", "兴业银行", "中信银行", "宁波银行"]
+    filler = "会议强调，要坚持稳中求进工作总基调，完整准确全面贯彻新发展理念，持续优化金融服务供给，推动经济实现质的有效提升和量的合理增长。"
+    articles = []
+    for n in range(count):
+        bank = banks[n % len(banks)]
+        paragraphs = [
+            filler,
+            f"{bank}发布2024年年度报告。截至2024年末，该行科技贷款余额{1000 + n % 900}.5亿元，同比增长{10 + n % 20}.3%。",
+            filler * 2,
+            f"2023年，{bank}服务科技型企业客户{2 + n % 5}.1万户，投贷联动{300 + n % 50}亿元。",
+            "相关负责人表示，将继续加大对专精特新企业的信贷支持力度。" + filler,
+        ]
+        articles.append(
+            NewsArticle(
+                id=f"news-{n}",
+                title=f"{bank}科技金融业绩观察",
+                publish_date=date(2025, 3, 1) + timedelta(days=n % 90),
+                site="bank_news",
+                source_url=f"https://www.thepaper.cn/newsDetail_forward_{n}",
+                content_text="\n".join(paragraphs),
+            )
+        )
+    return articles
+
+
+def benchmark(count: int) -> None:
+    articles = synthetic_articles(count)
+    started = time.perf_counter()
+    metrics = bank_metrics(articles)
+    elapsed = time.perf_counter() - started
+    print(f"{count} articles -> {len(metrics)} metrics in {elapsed:.2f}s ({count / elapsed:,.0f} articles/s)")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Extract bank tech-finance metrics from crawled bank news.")
+    parser.add_argument("--news-root", default="data/bank_news", help="银行新闻抓取目录（articles.jsonl 所在目录）")
+    parser.add_argument("--root", default="data/bank_tech_finance", help="银行指标库目录")
+    parser.add_argument("--bench", type=int, metavar="N", help="不读取新闻库，改为用 N 篇合成新闻做抽取基准测试")
+    parser.add_argument("--log-level", default="INFO", help="日志级别，例如 INFO/DEBUG")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.bench:
+        benchmark(args.bench)
+        return
+    articles = news_repository(args.news_root).load_index().values()
+    metrics = bank_metrics(articles)
+    repo = bank_metric_repository(args.root)
+    AggregateStore(Path(args.root).parent / "aggregates").attach(repo)
+    repo.upsert_many(metrics)
+    logger.info("从 %d 篇新闻中抽取 %d 条银行指标。", len(articles), len(metrics))
+
+
+if __name__ == "__main__":
+    main()
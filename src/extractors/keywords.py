@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import List, Optional
+
+# Domain vocabulary for 科技金融 / 普惠金融 policies; longer terms first so that
+# "科技型中小企业" wins over "中小企业" when both match the same span.
+LEXICON = sorted(
+    {
+        "科技金融", "科技贷款", "科技创新", "科创企业", "科技型中小企业", "专精特新", "小巨人", "高新技术企业",
+        "中小企业", "小微企业", "民营经济", "民营企业", "普惠金融", "绿色金融", "数字金融", "养老金融",
+        "知识产权质押", "知识产权", "融资担保", "政府性融资担保", "风险补偿", "贷款贴息", "贴息",
+        "信用贷款", "首贷", "续贷", "无还本续贷", "中长期贷款", "再贷款", "再贴现", "信贷投放",
+        "股权投资", "创业投资", "天使投资", "私募股权", "投贷联动", "科创票据", "科创债", "债券融资",
+        "上市融资", "北交所", "科创板", "创业板", "新三板", "区域性股权市场", "产业基金", "政府引导基金",
+        "供应链金融", "融资租赁", "保险", "科技保险", "首台套", "外汇", "跨境融资",
+        "金融监管", "监管规章", "风险防控", "数据安全", "征信", "营商环境", "减税降费", "研发费用加计扣除",
+        "人工智能", "集成电路", "生物医药", "新能源", "先进制造", "数字经济", "新质生产力",
+    },
+    key=len,
+    reverse=True,
+)
+LEXICON_PATTERN = re.compile("|".join(re.escape(term) for term in LEXICON))
+TITLE_WEIGHT = 3
+
+
+def extract_keywords(title: str, text: Optional[str] = None, top_k: int = 10) -> List[str]:
+    """Return up to ``top_k`` vocabulary terms ranked by frequency (title hits weigh more)."""
+    counts: Counter = Counter()
+    for term in LEXICON_PATTERN.findall(title or ""):
+        counts[term] += TITLE_WEIGHT
+    for term in LEXICON_PATTERN.findall(text or ""):
+        counts[term] += 1
+    return [term for term, _ in counts.most_common(top_k)]
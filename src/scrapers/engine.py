@@ -0,0 +1,479 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urljoin
+
+import httpx
+import yaml
+from bs4 import BeautifulSoup
+from pydantic import BaseModel
+from tenacity import retry, stop_after_attempt, wait_exponential_jitter
+
+from extractors.keywords import extract_keywords
+from storage.aggregates import AggregateStore
+from storage.models import Investment, NewsArticle, Policy, Product
+from storage.policies_repository import PolicyRepository
+from storage.records_repository import REPOSITORY_FACTORIES
+
+logger = logging.getLogger(__name__)
+
+SITES_DIR = Path(__file__).resolve().parents[2] / "openspec" / "sites"
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; OpenSpecBot/0.1)"}
+DEFAULT_DATE_FORMATS = ["%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d", "%Y年%m月%d日"]
+DATE_PATTERN = re.compile(r"\d{4}\s*[-/.年]\s*\d{1,2}\s*[-/.月]\s*\d{1,2}\s*日?")
+
+MODELS: Dict[str, type[BaseModel]] = {
+    "policy": Policy,
+    "product": Product,
+    "investment": Investment,
+    "article": NewsArticle,
+}
+
+
+@dataclass
+class FieldSpec:
+    """How to pull one value out of a node: CSS ``selector`` then ``attr``.
+
+    ``attr`` is ``text`` (default), ``html`` or an attribute name such as ``href``;
+    ``regex`` keeps the first group of a match; ``many`` returns every match.
+    """
+
+    selector: Optional[str] = None
+    attr: str = "text"
+    regex: Optional[str] = None
+    many: bool = False
+
+    @classmethod
+    def parse(cls, value: Any) -> "FieldSpec":
+        if isinstance(value, str):
+            return cls(selector=value)
+        return cls(**value)
+
+    def extract(self, node) -> Any:
+        targets = node.select(self.selector) if self.selector else [node]
+        if not self.many:
+            targets = targets[:1]
+        values = [v for v in (self._value(target) for target in targets) if v]
+        if self.many:
+            return values
+        return values[0] if values else None
+
+    def _value(self, node) -> Optional[str]:
+        if self.attr == "text":
+            value = node.get_text("\n", strip=True)
+        elif self.attr == "html":
+            value = str(node)
+        else:
+            value = node.get(self.attr)
+        if value and self.regex:
+            match = re.search(self.regex, value)
+            value = (match.group(1) if match.groups() else match.group(0)) if match else None
+        return value.strip() if isinstance(value, str) else value
+
+
+@dataclass
+class SiteSpec:
+    """Declarative description of a site, loaded from ``openspec/sites/<site>.yml``."""
+
+    site: str
+    model: str
+    base_url: str
+    list_url: Optional[str] = None
+    item_selector: Optional[str] = None
+    list_fields: Dict[str, FieldSpec] = field(default_factory=dict)
+    detail_fields: Dict[str, FieldSpec] = field(default_factory=dict)
+    seeds: List[str] = field(default_factory=list)
+    start_page: int = 1
+    max_pages: Optional[int] = None
+    date_field: Optional[str] = None
+    date_formats: List[str] = field(default_factory=lambda: list(DEFAULT_DATE_FORMATS))
+    id_pattern: Optional[str] = None
+    defaults: Dict[str, Any] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+    headers_env: Dict[str, str] = field(default_factory=dict)
+    concurrency: int = 4
+    requests_per_second: float = 2.0
+    cache_detail: bool = True
+    storage_root: Optional[str] = None
+    batch_size: int = 50
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SiteSpec":
+        list_cfg = data.get("list") or {}
+        detail_cfg = data.get("detail") or {}
+        pagination = data.get("pagination") or {}
+        rate = data.get("rate_limit") or {}
+        return cls(
+            site=data["site"],
+            model=data.get("model", "policy"),
+            base_url=data["base_url"],
+            list_url=list_cfg.get("url"),
+            item_selector=list_cfg.get("item"),
+            list_fields={name: FieldSpec.parse(value) for name, value in (list_cfg.get("fields") or {}).items()},
+            detail_fields={name: FieldSpec.parse(value) for name, value in (detail_cfg.get("fields") or {}).items()},
+            seeds=list(data.get("seeds") or []),
+            start_page=pagination.get("start", 1),
+            max_pages=pagination.get("max_pages"),
+            date_field=data.get("date_field"),
+            date_formats=list(data.get("date_formats") or DEFAULT_DATE_FORMATS),
+            id_pattern=data.get("id_pattern"),
+            defaults=dict(data.get("defaults") or {}),
+            headers=dict(data.get("headers") or {}),
+            headers_env=dict(data.get("headers_env") or {}),
+            concurrency=data.get("concurrency", 4),
+            requests_per_second=rate.get("per_second", 2.0),
+            cache_detail=data.get("cache_detail", True),
+            storage_root=data.get("storage"),
+            batch_size=data.get("batch_size", 50),
+        )
+
+    def parse_list(self, html: str, page_url: Optional[str] = None) -> List[Dict[str, Any]]:
+        soup = BeautifulSoup(html, "lxml")
+        items = []
+        for node in soup.select(self.item_selector or "body"):
+            item = {name: spec.extract(node) for name, spec in self.list_fields.items()}
+            if item.get("url"):
+                item["url"] = urljoin(page_url or self.base_url, item["url"])
+            items.append(item)
+        soup.decompose()
+        return items
+
+    def parse_detail(self, html: str) -> Dict[str, Any]:
+        soup = BeautifulSoup(html, "lxml")
+        detail = {name: spec.extract(soup) for name, spec in self.detail_fields.items()}
+        soup.decompose()
+        return {name: value for name, value in detail.items() if value not in (None, "", [])}
+
+    def parse_date(self, value: Any) -> Optional[date]:
+        if value is None or isinstance(value, date):
+            return value
+        match = DATE_PATTERN.search(str(value))
+        if not match:
+            return None
+        text = re.sub(r"\s+", "", match.group(0))
+        for fmt in self.date_formats:
+            try:
+                return datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+        return None
+
+
+def load_site_spec(site: str, sites_dir: str | Path = SITES_DIR) -> SiteSpec:
+    path = Path(sites_dir) / f"{site}.yml"
+    with path.open("r", encoding="utf-8") as fh:
+        return SiteSpec.from_dict(yaml.safe_load(fh))
+
+
+class RateLimiter:
+    """Thread-safe pacing so that requests start at most ``per_second`` times a second."""
+
+    def __init__(self, per_second: float) -> None:
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PageCache:
+    """Gzip-compressed on-disk cache of fetched detail pages, keyed by URL."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, url: str) -> Path:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}.html.gz"
+
+    def get(self, url: str) -> Optional[str]:
+        path = self._path(url)
+        if not path.exists():
+            return None
+        return gzip.decompress(path.read_bytes()).decode("utf-8")
+
+    def put(self, url: str, html: str) -> None:
+        path = self._path(url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(gzip.compress(html.encode("utf-8")))
+
+
+class Watermark:
+    """Latest publish date already stored for a site, used to stop paging early."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def load(self) -> Optional[date]:
+        if not self.path.exists():
+            return None
+        value = json.loads(self.path.read_text(encoding="utf-8")).get("latest")
+        return date.fromisoformat(value) if value else None
+
+    def save(self, latest: date) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"latest": latest.isoformat()}), encoding="utf-8")
+
+
+class SiteEngine:
+    """Crawl a site described by a :class:`SiteSpec`.
+
+    Detail pages of each list page are fetched concurrently through a shared,
+    rate-limited client; detail HTML is cached on disk; records are handed to
+    the repository in batches. The date watermark advances only after a run
+    that crawled everything back to its floor: runs cut short by ``limit``,
+    a caller's ``max_pages`` or an error leave it unchanged, so older items
+    they never fetched are picked up next time. The same holds for an explicit
+    ``since`` later than the watermark, which skips the items in between. The
+    spec's own page cap is the site's crawl scope and does not count as cut
+    short.
+    """
+
+    def __init__(
+        self,
+        spec: SiteSpec,
+        data_root: str | Path = "data",
+        client: httpx.Client | None = None,
+        sink: Callable[[List[BaseModel]], None] | None = None,
+    ) -> None:
+        self.spec = spec
+        self.root = Path(spec.storage_root or Path(data_root) / spec.site)
+        self.similarity_path = Path(data_root) / "similarity.sqlite"
+        headers = {**DEFAULT_HEADERS, **spec.headers}
+        for name, env_var in spec.headers_env.items():
+            if os.getenv(env_var):
+                headers[name] = os.environ[env_var]
+        self.client = client or httpx.Client(base_url=spec.base_url, headers=headers, timeout=20, follow_redirects=True)
+        self.rate_limiter = RateLimiter(spec.requests_per_second)
+        self.cache = PageCache(self.root / "cache") if spec.cache_detail else None
+        self.watermark = Watermark(self.root / "watermark.json")
+        # The default sink opens repositories (creating their directories) on first flush.
+        self.sink = sink
+        self.crawl_complete = False
+        self._listing_exhausted = False
+
+    def close(self) -> None:
+        self.client.close()
+
+    def __enter__(self) -> "SiteEngine":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential_jitter(), reraise=True)
+    def fetch(self, url: str) -> str:
+        self.rate_limiter.wait()
+        logger.debug("GET %s", url)
+        response = self.client.get(url)
+        response.raise_for_status()
+        return response.text
+
+    def fetch_detail(self, url: str) -> str:
+        if self.cache:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached
+        html = self.fetch(url)
+        if self.cache:
+            self.cache.put(url, html)
+        return html
+
+    def crawl(
+        self,
+        since: Optional[date] = None,
+        max_pages: Optional[int] = None,
+        limit: Optional[int] = None,
+        incremental: bool = True,
+    ) -> Iterator[BaseModel]:
+        """Yield new records; an explicit ``since`` overrides the watermark.
+
+        ``crawl_complete`` is set once the listing was followed back to the
+        floor or to its end without hitting ``limit`` or ``max_pages``.
+        """
+        floor = since
+        if floor is None and incremental:
+            floor = self.watermark.load()
+        self.crawl_complete = False
+        collected = 0
+        with ThreadPoolExecutor(max_workers=max(self.spec.concurrency, 1)) as pool:
+            for page_items in self._iter_list_pages(max_pages):
+                fresh = []
+                reached_floor = False
+                for item in page_items:
+                    item_date = self.spec.parse_date(item.get(self.spec.date_field)) if self.spec.date_field else None
+                    if floor and item_date and item_date < floor:
+                        reached_floor = True
+                        continue
+                    fresh.append(item)
+                for record in pool.map(self._complete_item, fresh):
+                    if record is None:
+                        continue
+                    if floor and self._record_date(record) and self._record_date(record) < floor:
+                        continue
+                    collected += 1
+                    yield record
+                    if limit and collected >= limit:
+                        return
+                if reached_floor:
+                    self.crawl_complete = True
+                    return
+        self.crawl_complete = not max_pages or self._listing_exhausted
+
+    def run(
+        self,
+        since: Optional[date] = None,
+        max_pages: Optional[int] = None,
+        limit: Optional[int] = None,
+        incremental: bool = True,
+        dry_run: bool = False,
+    ) -> int:
+        batch: List[BaseModel] = []
+        previous = latest = self.watermark.load()
+        saved = 0
+        for record in self.crawl(since=since, max_pages=max_pages, limit=limit, incremental=incremental):
+            if dry_run:
+                logger.info("[DRY RUN] %s", record)
+                continue
+            batch.append(record)
+            record_date = self._record_date(record)
+            if record_date and (latest is None or record_date > latest):
+                latest = record_date
+            if len(batch) >= self.spec.batch_size:
+                saved += self._flush(batch)
+        if batch:
+            saved += self._flush(batch)
+        if dry_run:
+            return saved
+        if not self.crawl_complete:
+            logger.info("%s: 本次抓取未覆盖到水位线（limit/max_pages），水位线保持 %s。", self.spec.site, previous)
+        elif since and previous and since > previous:
+            logger.info("%s: 起始日期 %s 晚于水位线，水位线保持 %s。", self.spec.site, since, previous)
+        elif latest and latest != previous:
+            self.watermark.save(latest)
+        logger.info("%s: 入库 %d 条记录。", self.spec.site, saved)
+        return saved
+
+    def _flush(self, batch: List[BaseModel]) -> int:
+        count = len(batch)
+        if self.sink is None:
+            self.sink = self._default_sink()
+        self.sink(list(batch))
+        batch.clear()
+        return count
+
+    def _iter_list_pages(self, max_pages: Optional[int]) -> Iterator[List[Dict[str, Any]]]:
+        self._listing_exhausted = False
+        if self.spec.seeds:
+            yield [{"url": urljoin(self.spec.base_url, seed)} for seed in self.spec.seeds]
+            self._listing_exhausted = True
+            return
+        if not self.spec.list_url:
+            self._listing_exhausted = True
+            return
+        limit = max_pages or self.spec.max_pages
+        page = self.spec.start_page
+        pages = 0
+        while not limit or pages < limit:
+            url = self.spec.list_url.format(page=page)
+            items = self.spec.parse_list(self.fetch(url), page_url=urljoin(self.spec.base_url, url))
+            if not items:
+                self._listing_exhausted = True
+                break
+            yield items
+            page += 1
+            pages += 1
+
+    def _complete_item(self, item: Dict[str, Any]) -> Optional[BaseModel]:
+        data = dict(item)
+        if self.spec.detail_fields and item.get("url"):
+            try:
+                data.update(self.spec.parse_detail(self.fetch_detail(item["url"])))
+            except httpx.HTTPError as exc:
+                logger.error("详情页请求失败，跳过 %s (%s)", item["url"], exc)
+                return None
+        return self.to_model(data)
+
+    def to_model(self, data: Dict[str, Any]) -> Optional[BaseModel]:
+        model = MODELS[self.spec.model]
+        values = {**self.spec.defaults, **data}
+        url = values.pop("url", None)
+        values.setdefault("source_url", url)
+        if self.spec.date_field and self.spec.date_field in values:
+            values[self.spec.date_field] = self.spec.parse_date(values[self.spec.date_field])
+        if "id" in model.model_fields and not values.get("id"):
+            values["id"] = self._make_id(values.get("source_url") or json.dumps(data, sort_keys=True, default=str))
+        if "site" in model.model_fields:
+            values.setdefault("site", self.spec.site)
+        if "keywords" in model.model_fields and not values.get("keywords"):
+            values["keywords"] = extract_keywords(values.get("title") or "", values.get("content_text")) or None
+        known = {name: value for name, value in values.items() if name in model.model_fields}
+        try:
+            record = model(**known)
+        except ValueError as exc:
+            logger.warning("%s: 记录不完整，跳过 (%s)", self.spec.site, exc)
+            return None
+        if isinstance(record, Policy):
+            record.fingerprint = record.content_fingerprint()
+        return record
+
+    def _make_id(self, source: str) -> str:
+        if self.spec.id_pattern:
+            match = re.search(self.spec.id_pattern, source)
+            if match:
+                return f"{self.spec.site}-{match.group(1)}"
+        return f"{self.spec.site}-{hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]}"
+
+    def _record_date(self, record: BaseModel) -> Optional[date]:
+        if not self.spec.date_field:
+            return None
+        value = getattr(record, self.spec.date_field, None)
+        return value if isinstance(value, date) else None
+
+    def _default_sink(self) -> Callable[[List[BaseModel]], None]:
+        if self.spec.model == "policy":
+            repo = PolicyRepository(self.root, similarity_path=self.similarity_path)
+
+            def sink(batch: List[BaseModel]) -> None:
+                for policy in batch:
+                    repo.flag_duplicate(policy)
+                repo.upsert_many(batch)
+
+            return sink
+        repo = REPOSITORY_FACTORIES[self.spec.model](self.root)
+        if self.spec.model in ("product", "bank_metric"):
+            AggregateStore(self.root.parent / "aggregates").attach(repo)
+        return repo.upsert_many
+
+
+@lru_cache(maxsize=None)
+def site_engine(site: str) -> SiteEngine:
+    """Engine shared by the helpers of a site module, built on first use."""
+    return SiteEngine(load_site_spec(site))
+
+
+def run_site(site: str, **kwargs) -> int:
+    """Crawl ``site`` according to its spec and persist the new records."""
+    with SiteEngine(load_site_spec(site)) as engine:
+        return engine.run(**kwargs)
@@ -1,22 +1,23 @@
-import httpx
-from bs4 import BeautifulSoup
-from tenacity import retry, stop_after_attempt, wait_exponential_jitter
+"""光谷金融大脑惠企政策：抓取规则见 openspec/sites/ggjrdn_policies.yml，由 scrapers.engine 执行。"""
+from __future__ import annotations
+
+from scrapers.engine import load_site_spec, run_site, site_engine
+
+SITE = "ggjrdn_policies"
+SPEC = load_site_spec(SITE)
 
-headers = {"User-Agent": "Mozilla/5.0 (compatible; OpenSpecBot/0.1)"}
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential_jitter())
 def fetch(url: str) -> str:
-    with httpx.Client(timeout=20) as client:
-        r = client.get(url, headers=headers)
-        r.raise_for_status()
-        return r.text
+    return site_engine(SITE).fetch(url)
+
 
 def parse_list(html: str):
-    soup = BeautifulSoup(html, "lxml")
-    # TODO: 解析页面结构，返回 item 列表
-    return []
+    return SPEC.parse_list(html)
+
 
 def parse_detail(html: str):
-    soup = BeautifulSoup(html, "lxml")
-    # TODO: 提取标题/时间/正文
-    return {"title":"", "publish_date":None, "content_html":""}
+    return SPEC.parse_detail(html)
+
+
+def run(**kwargs) -> int:
+    return run_site(SITE, **kwargs)
@@ -1,19 +1,37 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import closing
 from datetime import date, datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
+import httpx
 from dotenv import load_dotenv
 
+from extractors.keywords import extract_keywords
 from services.google_docs import GoogleDocsExporter
+from services.google_sheets import GoogleSheetsIndexer
+from storage.models import Policy
 from storage.policies_repository import PolicyRepository
-from scrapers.zxkc import ZxkcPoliciesClient
+from storage.work_queue import Job, WorkQueue
+from scrapers.zxkc import REVALIDATE_CHANGED, ListItem, ZxkcPoliciesClient
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+# Near-duplicate index shared with the site-engine crawlers under data/.
+SIMILARITY_PATH = Path("data/similarity.sqlite")
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Crawl ZXKC policies and export to Google Docs.")
@@ -25,7 +43,17 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--download-dir", default="data/policies_npc/attachments", help="附件保存目录")
     parser.add_argument("--skip-google-docs", action="store_true", help="跳过 Google Docs 导出")
     parser.add_argument("--dry-run", action="store_true", help="仅打印将要处理的记录，不落地数据")
+    parser.add_argument("--keep-duplicates", action="store_true", help="近似重复的政策也下载附件并导出 Google Docs")
     parser.add_argument("--log-level", default="INFO", help="日志级别，例如 INFO/DEBUG")
+    parser.add_argument("--queue", help="工作队列 SQLite 路径；配合 --enqueue / --worker 使用")
+    parser.add_argument("--enqueue", action="store_true", help="仅把列表页任务写入 --queue，不抓取")
+    parser.add_argument("--worker", action="store_true", help="以 worker 身份从 --queue 领取任务直到队列清空")
+    parser.add_argument("--worker-id", default=None, help="worker 标识（默认 主机名-进程号）")
+    parser.add_argument("--revalidate", action="store_true", help="复查已入库政策（条件请求），仅更新发生变更的记录")
+    parser.add_argument("--lease-seconds", type=float, default=300.0, help="任务租约时长（秒），超时未完成将重新分配")
+    parser.add_argument("--stream", action="store_true", help="流式回填：内存占用恒定，适合大规模历史抓取")
+    parser.add_argument("--flush-every", type=int, default=200, help="流式模式下每 N 条政策批量写入一次")
+    parser.add_argument("--prefetch", type=int, default=32, help="流式模式下抓取线程最多预取的政策条数")
     return parser.parse_args()
 
 
@@ -43,9 +71,11 @@ def run(
     dry_run: bool = False,
     exporter: GoogleDocsExporter | None = None,
     start_page: int = 1,
+    skip_duplicates: bool = True,
+    sheets_indexer: GoogleSheetsIndexer | None = None,
 ) -> None:
     load_dotenv()
-    repo = PolicyRepository()
+    repo = PolicyRepository(similarity_path=SIMILARITY_PATH)
     existing_index = repo.load_index()
     attachments_dir = Path(download_dir)
     attachments_dir.mkdir(parents=True, exist_ok=True)
@@ -53,6 +83,7 @@ def run(
     docs_exporter = exporter
     if not docs_exporter and not skip_google_docs and not dry_run:
         docs_exporter = GoogleDocsExporter()
+    sheets_indexer = _attach_sheets_indexer(repo, sheets_indexer, enabled=not skip_google_docs and not dry_run)
 
     discovered = 0
     saved = 0
@@ -73,13 +104,16 @@ def run(
             if dry_run:
                 logger.info("[DRY RUN] %s %s -> %s", policy.publish_date, policy.title, policy.source_url)
                 continue
-            downloaded = [client.download_attachment(att, attachments_dir) for att in policy.attachments]
-            policy.attachments = downloaded
-            if docs_exporter:
-                docs_exporter.export(policy)
+            if skip_duplicates and repo.flag_duplicate(policy):
+                logger.info("近似重复，关联到 %s，跳过附件与导出：%s", policy.duplicate_of, policy.title)
+                _tag_keywords(policy)
+            else:
+                _materialize(client, policy, attachments_dir, docs_exporter)
             repo.upsert_one(existing_index, policy)
             saved += 1
 
+    if sheets_indexer:
+        sheets_indexer.flush()
     if dry_run:
         logger.info("Dry run完成，发现 %d 条潜在新政策。", discovered)
         return
@@ -90,6 +124,412 @@ def run(
         logger.info("没有发现新的政策记录。")
 
 
+def stream(
+    since: Optional[date] = None,
+    before: Optional[date] = None,
+    max_pages: Optional[int] = None,
+    limit: Optional[int] = None,
+    download_dir: str | Path = "data/policies_npc/attachments",
+    skip_google_docs: bool = False,
+    dry_run: bool = False,
+    exporter: GoogleDocsExporter | None = None,
+    start_page: int = 1,
+    skip_duplicates: bool = True,
+    flush_every: int = 200,
+    prefetch: int = 32,
+    sheets_indexer: GoogleSheetsIndexer | None = None,
+) -> int:
+    """Memory-bounded crawl for large backfills; returns the number of policies saved.
+
+    Only 64-bit digests of the stored keys are kept, in a temporary SQLite
+    table rather than in memory.
+    Pages are fetched in a producer thread through a queue of ``prefetch``
+    policies, so fetching blocks while storage falls behind. New policies are
+    appended to the store every ``flush_every`` records and their bodies are
+    released once written. ``dry_run`` behaves as in :func:`run`: new policies
+    are only logged.
+    """
+    load_dotenv()
+    repo = PolicyRepository(similarity_path=SIMILARITY_PATH)
+    known = _DigestSet(_key_digest(key) for key in repo.iter_keys())
+    attachments_dir = Path(download_dir)
+    attachments_dir.mkdir(parents=True, exist_ok=True)
+
+    docs_exporter = exporter
+    if not docs_exporter and not skip_google_docs and not dry_run:
+        docs_exporter = GoogleDocsExporter()
+    sheets_indexer = _attach_sheets_indexer(repo, sheets_indexer, enabled=not skip_google_docs and not dry_run)
+
+    discovered = 0
+    saved = 0
+    batch: List[Policy] = []
+    with ZxkcPoliciesClient() as client, closing(known):
+        crawl = client.crawl(since=since, before=before, max_pages=max_pages, limit=limit, start_page=start_page)
+        for policy in _bounded(crawl, prefetch):
+            digest = _key_digest(_policy_key(policy.title, policy.publish_date, policy.site))
+            if digest in known:
+                logger.debug("Skip existing policy: %s", policy.title)
+                continue
+            discovered += 1
+            if dry_run:
+                logger.info("[DRY RUN] %s %s -> %s", policy.publish_date, policy.title, policy.source_url)
+                continue
+            known.add(digest)
+            if skip_duplicates and repo.flag_duplicate(policy):
+                _tag_keywords(policy)
+            else:
+                _materialize(client, policy, attachments_dir, docs_exporter)
+            batch.append(policy)
+            if len(batch) >= flush_every:
+                repo.append_many(batch)
+                saved += len(batch)
+                batch = []
+                logger.info("流式回填进度：已入库 %d 条", saved)
+    if batch:
+        repo.append_many(batch)
+        saved += len(batch)
+    if sheets_indexer:
+        sheets_indexer.flush()
+    if dry_run:
+        logger.info("Dry run完成，发现 %d 条潜在新政策。", discovered)
+        return 0
+    logger.info("流式回填完成，入库 %d 条新政策。", saved)
+    return saved
+
+
+def _bounded(items: Iterable[T], maxsize: int) -> Iterator[T]:
+    """Iterate ``items`` in a producer thread through a queue holding at most ``maxsize`` items."""
+    buffer: queue.Queue = queue.Queue(maxsize=max(maxsize, 1))
+    done = object()
+    stop = threading.Event()
+    errors: List[BaseException] = []
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as exc:
+            errors.append(exc)
+        put(done)
+
+    producer = threading.Thread(target=produce, name="crawl-producer", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        producer.join()
+
+
+class _DigestSet:
+    """Set of 64-bit key digests held in a private temporary SQLite database.
+
+    SQLite keeps a bounded page cache and spills the rest to a temporary file
+    that is deleted on close, so the known keys of a large store do not grow
+    resident memory.
+    """
+
+    def __init__(self, digests: Iterable[int]) -> None:
+        self._conn = sqlite3.connect("")
+        self._conn.execute("CREATE TABLE digests (digest INTEGER PRIMARY KEY)")
+        self._conn.executemany("INSERT OR IGNORE INTO digests VALUES (?)", ((digest,) for digest in digests))
+        self._conn.commit()
+
+    def __contains__(self, digest: int) -> bool:
+        return self._conn.execute("SELECT 1 FROM digests WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def add(self, digest: int) -> None:
+        self._conn.execute("INSERT OR IGNORE INTO digests VALUES (?)", (digest,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _key_digest(key: Tuple[str, Optional[str], Optional[str]]) -> int:
+    # Signed, so that it fits an SQLite INTEGER.
+    digest = hashlib.blake2b("\x1f".join(part or "" for part in key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def enqueue(
+    queue_path: str | Path,
+    since: Optional[date] = None,
+    before: Optional[date] = None,
+    max_pages: Optional[int] = None,
+    start_page: int = 1,
+) -> int:
+    """Seed the work queue with list-page jobs; returns the number of jobs queued.
+
+    With ``max_pages`` every page is queued up front so workers fetch them in
+    parallel; otherwise only ``start_page`` is queued and each list job chains
+    the next page until the listing is exhausted or older than ``since``.
+    """
+    start_page = max(start_page, 1)
+    pages = range(start_page, start_page + max_pages) if max_pages else [start_page]
+    queued = 0
+    with WorkQueue(queue_path) as queue:
+        for page in pages:
+            payload = {
+                "page": page,
+                "since": since.isoformat() if since else None,
+                "before": before.isoformat() if before else None,
+                "chain": not max_pages,
+            }
+            if queue.enqueue("list", f"list:{page}", payload, priority=1, reset_done=True):
+                queued += 1
+    logger.info("已写入 %d 个列表页任务到 %s", queued, queue_path)
+    return queued
+
+
+def work(
+    queue_path: str | Path,
+    worker_id: Optional[str] = None,
+    download_dir: str | Path = "data/policies_npc/attachments",
+    skip_google_docs: bool = False,
+    exporter: GoogleDocsExporter | None = None,
+    lease_seconds: float = 300.0,
+    poll_interval: float = 0.5,
+    sheets_indexer: GoogleSheetsIndexer | None = None,
+    skip_duplicates: bool = True,
+) -> int:
+    """Process queued jobs until the queue is drained; returns the number of jobs done.
+
+    Jobs are delivered at least once: a worker that dies mid-job leaves its lease
+    to expire and another worker redoes the job. Each new policy is appended to
+    the store (constant cost per job, no full rewrite under the lock). Detail
+    jobs are idempotent because attachments are cached on disk and a policy
+    appended twice resolves to its last line on load.
+    """
+    load_dotenv()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    repo = PolicyRepository(similarity_path=SIMILARITY_PATH)
+    known_keys = set(repo.load_index())
+    attachments_dir = Path(download_dir)
+    attachments_dir.mkdir(parents=True, exist_ok=True)
+
+    docs_exporter = exporter
+    if not docs_exporter and not skip_google_docs:
+        docs_exporter = GoogleDocsExporter()
+    sheets_indexer = _attach_sheets_indexer(repo, sheets_indexer, enabled=not skip_google_docs)
+
+    done = 0
+    with WorkQueue(queue_path, lease_seconds=lease_seconds) as queue, ZxkcPoliciesClient() as client:
+        while True:
+            job = queue.lease(worker_id)
+            if job is None:
+                if queue.is_drained():
+                    break
+                time.sleep(poll_interval)
+                continue
+            try:
+                if job.kind == "list":
+                    _handle_list_job(client, queue, job, known_keys)
+                elif job.kind == "detail":
+                    policy = _handle_detail_job(client, repo, job, attachments_dir, docs_exporter, known_keys, skip_duplicates)
+                    if policy is not None:
+                        repo.append_many([policy])
+                else:
+                    raise ValueError(f"Unknown job kind: {job.kind}")
+            except Exception as exc:
+                logger.warning("[%s] 任务 %s 失败（第 %d 次）：%s", worker_id, job.key, job.attempts, exc)
+                queue.fail(job, repr(exc))
+                continue
+            queue.complete(job)
+            done += 1
+
+    if sheets_indexer:
+        sheets_indexer.flush()
+    logger.info("[%s] 队列已清空，完成 %d 个任务。", worker_id, done)
+    return done
+
+
+def revalidate(
+    since: Optional[date] = None,
+    limit: Optional[int] = None,
+    download_dir: str | Path = "data/policies_npc/attachments",
+    skip_google_docs: bool = False,
+    exporter: GoogleDocsExporter | None = None,
+    batch_size: int = 50,
+    sheets_indexer: GoogleSheetsIndexer | None = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """Re-check stored zxkc policies and patch the ones whose content changed.
+
+    Each policy costs one conditional GET; unchanged pages (304, identical bytes
+    or identical fingerprint) are not re-parsed further. Changed policies get
+    their new attachments downloaded and their Google Doc rewritten in place,
+    and are stored every ``batch_size`` records. Policies whose only change is
+    a new ETag, Last-Modified or page hash are stored together at the end, so
+    they add no store rewrites of their own. With ``dry_run`` changes are only
+    logged: nothing is downloaded, exported or written. Returns counts per
+    revalidation status.
+    """
+    load_dotenv()
+    repo = PolicyRepository(similarity_path=SIMILARITY_PATH)
+    attachments_dir = Path(download_dir)
+    if not dry_run:
+        attachments_dir.mkdir(parents=True, exist_ok=True)
+    docs_exporter = exporter if not dry_run else None
+    if not docs_exporter and not skip_google_docs and not dry_run:
+        docs_exporter = GoogleDocsExporter()
+    sheets_indexer = _attach_sheets_indexer(repo, sheets_indexer, enabled=not skip_google_docs and not dry_run)
+
+    stats: Counter = Counter()
+    pending: List[Policy] = []
+    refreshed: List[Policy] = []
+    checked = 0
+    with ZxkcPoliciesClient() as client:
+        for policy in repo.load_index().values():
+            if (policy.site or "zxkc") != "zxkc":
+                continue
+            if since and policy.publish_date and policy.publish_date < since:
+                continue
+            if limit and checked >= limit:
+                break
+            checked += 1
+            validators = (policy.etag, policy.last_modified, policy.page_hash, policy.fingerprint)
+            try:
+                status, fresh = client.revalidate(policy)
+            except httpx.HTTPError as exc:
+                logger.warning("复查失败，跳过 %s (%s)", policy.source_url, exc)
+                stats["error"] += 1
+                continue
+            stats[status] += 1
+            if dry_run:
+                if status == REVALIDATE_CHANGED:
+                    logger.info("[DRY RUN] 政策内容已更新：%s -> %s", policy.title, policy.source_url)
+                continue
+            if status == REVALIDATE_CHANGED:
+                logger.info("政策内容已更新：%s", policy.title)
+                _apply_revision(client, policy, fresh, attachments_dir, docs_exporter)
+                pending.append(policy)
+            elif validators != (policy.etag, policy.last_modified, policy.page_hash, policy.fingerprint):
+                refreshed.append(policy)
+            if len(pending) >= batch_size:
+                repo.upsert_many(pending)
+                pending = []
+    if pending or refreshed:
+        repo.upsert_many(pending + refreshed)
+    if sheets_indexer:
+        sheets_indexer.flush()
+    logger.info("复查完成：%s", dict(stats))
+    return dict(stats)
+
+
+def _apply_revision(
+    client: ZxkcPoliciesClient,
+    policy: Policy,
+    fresh: Policy,
+    attachments_dir: Path,
+    docs_exporter: GoogleDocsExporter | None,
+) -> None:
+    """Copy revised content onto the stored record, keeping its dedup key and known attachments."""
+    if fresh.title != policy.title:
+        logger.info("标题变更（保留原标题作为去重键）：%s -> %s", policy.title, fresh.title)
+    known = {att.url: att for att in policy.attachments}
+    attachments = []
+    for attachment in fresh.attachments:
+        if attachment.url in known:
+            attachments.append(known[attachment.url])
+        else:
+            attachments.append(client.download_attachment(attachment, attachments_dir))
+    policy.content_html = fresh.content_html
+    policy.content_text = fresh.content_text
+    policy.attachments = attachments
+    policy.keywords = extract_keywords(policy.title, policy.content_text) or None
+    policy.fingerprint = fresh.fingerprint
+    policy.page_hash = fresh.page_hash
+    policy.etag = fresh.etag
+    policy.last_modified = fresh.last_modified
+    if docs_exporter and not policy.duplicate_of:
+        docs_exporter.update(policy)
+
+
+def _handle_list_job(client: ZxkcPoliciesClient, queue: WorkQueue, job: Job, known_keys: set) -> None:
+    payload = job.payload
+    since = date.fromisoformat(payload["since"]) if payload.get("since") else None
+    before = date.fromisoformat(payload["before"]) if payload.get("before") else None
+    items = client.parse_list(client.fetch_list_page(payload["page"]))
+    reached_since = False
+    for item in items:
+        if since and item.publish_date and item.publish_date < since:
+            reached_since = True
+            continue
+        if before and item.publish_date and item.publish_date > before:
+            continue
+        if _policy_key(item.title, item.publish_date, "zxkc") in known_keys:
+            continue
+        queue.enqueue("detail", f"detail:{item.article_id or item.url}", item.to_payload())
+    if payload.get("chain") and items and not reached_since:
+        next_payload = dict(payload, page=payload["page"] + 1)
+        queue.enqueue("list", f"list:{next_payload['page']}", next_payload, priority=1, reset_done=True)
+
+
+def _handle_detail_job(
+    client: ZxkcPoliciesClient,
+    repo: PolicyRepository,
+    job: Job,
+    attachments_dir: Path,
+    docs_exporter: GoogleDocsExporter | None,
+    known_keys: set,
+    skip_duplicates: bool = True,
+) -> Optional[Policy]:
+    policy = client.fetch_policy(ListItem.from_payload(job.payload))
+    key = _policy_key(policy.title, policy.publish_date, policy.site)
+    if key in known_keys:
+        logger.debug("Skip existing policy: %s", policy.title)
+        return None
+    if skip_duplicates and repo.flag_duplicate(policy):
+        logger.info("近似重复，关联到 %s，跳过附件与导出：%s", policy.duplicate_of, policy.title)
+        _tag_keywords(policy)
+    else:
+        _materialize(client, policy, attachments_dir, docs_exporter)
+    known_keys.add(key)
+    return policy
+
+
+def _attach_sheets_indexer(
+    repo: PolicyRepository,
+    sheets_indexer: GoogleSheetsIndexer | None,
+    enabled: bool,
+) -> Optional[GoogleSheetsIndexer]:
+    """Mirror every upsert into the Sheets index; enabled by ``GOOGLE_SHEETS_INDEX_ID``."""
+    if sheets_indexer is None and enabled and os.getenv("GOOGLE_SHEETS_INDEX_ID"):
+        sheets_indexer = GoogleSheetsIndexer()
+    if sheets_indexer:
+        repo.add_listener(sheets_indexer.add_policies)
+    return sheets_indexer
+
+
+def _materialize(client: ZxkcPoliciesClient, policy: Policy, attachments_dir: Path, docs_exporter: GoogleDocsExporter | None) -> None:
+    """Tag keywords, download attachments and export to Google Docs before the policy is stored."""
+    _tag_keywords(policy)
+    policy.attachments = [client.download_attachment(att, attachments_dir) for att in policy.attachments]
+    if docs_exporter:
+        docs_exporter.export(policy)
+
+
+def _tag_keywords(policy: Policy) -> None:
+    if not policy.keywords:
+        policy.keywords = extract_keywords(policy.title, policy.content_text) or None
+
+
 def _policy_key(title: str, publish_date: Optional[date], site: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
     return title.strip(), publish_date.isoformat() if publish_date else None, site or "zxkc"
 
@@ -97,6 +537,39 @@ def _policy_key(title: str, publish_date: Optional[date], site: Optional[str]) -
 def main() -> None:
     args = parse_args()
     logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.revalidate:
+        revalidate(since=args.since, limit=args.limit, download_dir=args.download_dir, skip_google_docs=args.skip_google_docs, dry_run=args.dry_run)
+        return
+    if args.stream:
+        stream(
+            since=args.since,
+            before=args.before,
+            max_pages=args.max_pages,
+            limit=args.limit,
+            download_dir=args.download_dir,
+            skip_google_docs=args.skip_google_docs,
+            dry_run=args.dry_run,
+            start_page=args.start_page,
+            skip_duplicates=not args.keep_duplicates,
+            flush_every=args.flush_every,
+            prefetch=args.prefetch,
+        )
+        return
+    if args.enqueue or args.worker:
+        if not args.queue:
+            raise SystemExit("--enqueue/--worker 需要同时指定 --queue")
+        if args.enqueue:
+            enqueue(args.queue, since=args.since, before=args.before, max_pages=args.max_pages, start_page=args.start_page)
+        if args.worker:
+            work(
+                args.queue,
+                worker_id=args.worker_id,
+                download_dir=args.download_dir,
+                skip_google_docs=args.skip_google_docs,
+                lease_seconds=args.lease_seconds,
+                skip_duplicates=not args.keep_duplicates,
+            )
+        return
     run(
         since=args.since,
         max_pages=args.max_pages,
@@ -106,6 +579,7 @@ def main() -> None:
         download_dir=args.download_dir,
         skip_google_docs=args.skip_google_docs,
         dry_run=args.dry_run,
+        skip_duplicates=not args.keep_duplicates,
     )
 
 
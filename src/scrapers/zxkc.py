@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 import mimetypes
 import re
 from dataclasses import dataclass
 from datetime import date, datetime
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Iterable, List, Optional, Tuple
 from urllib.parse import parse_qs, urljoin, urlparse
 import time
 
@@ -32,6 +33,10 @@ HEADERS = {
     "Connection": "keep-alive",
     "DNT": "1",
 }
+REVALIDATE_NOT_MODIFIED = "not_modified"
+REVALIDATE_UNCHANGED = "unchanged"
+REVALIDATE_CHANGED = "changed"
+REVALIDATE_GONE = "gone"
 ATTACHMENT_PATTERN = re.compile(r"\.(pdf|docx?|wps|jpe?g|png|gif|bmp)$", re.IGNORECASE)
 
 
@@ -42,6 +47,24 @@ class ListItem:
     url: str
     publish_date: Optional[date]
 
+    def to_payload(self) -> dict:
+        return {
+            "article_id": self.article_id,
+            "title": self.title,
+            "url": self.url,
+            "publish_date": self.publish_date.isoformat() if self.publish_date else None,
+        }
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "ListItem":
+        publish_date = payload.get("publish_date")
+        return cls(
+            article_id=payload["article_id"],
+            title=payload["title"],
+            url=payload["url"],
+            publish_date=date.fromisoformat(publish_date) if publish_date else None,
+        )
+
 
 class ZxkcPoliciesClient:
     def __init__(self, base_url: str = BASE_URL, timeout: float = 20.0) -> None:
@@ -98,22 +121,10 @@ class ZxkcPoliciesClient:
                 if before and item.publish_date and item.publish_date > before:
                     continue
                 try:
-                    detail_html = self.fetch_detail_page(item.url)
+                    policy = self.fetch_policy(item)
                 except httpx.HTTPError as exc:
                     logger.error("详情页请求失败，跳过 %s (%s)", item.url, exc)
                     continue
-                detail = self.parse_detail(detail_html, fallback_title=item.title, fallback_date=item.publish_date, url=item.url)
-                policy = Policy(
-                    id=f"zxkc-{item.article_id}",
-                    title=detail["title"],
-                    publish_date=detail["publish_date"],
-                    region_level=self.infer_region_level(detail["title"]),
-                    site="zxkc",
-                    source_url=item.url,
-                    content_html=detail["content_html"],
-                    content_text=detail["content_text"],
-                    attachments=detail["attachments"],
-                )
                 collected += 1
                 yield policy
                 if limit and collected >= limit:
@@ -123,8 +134,74 @@ class ZxkcPoliciesClient:
             page += 1
             pages_processed += 1
 
+    def fetch_policy(self, item: ListItem) -> Policy:
+        """Fetch and parse the detail page of a list item into a Policy."""
+        return self._build_policy(item, self._get(item.url))
+
+    def revalidate(self, policy: Policy) -> Tuple[str, Optional[Policy]]:
+        """Re-check a stored policy with one conditional request.
+
+        Returns ``(status, fresh)`` where status is ``not_modified`` (HTTP 304),
+        ``unchanged`` (same page bytes or same content fingerprint), ``changed``
+        (``fresh`` holds the re-parsed policy) or ``gone`` (404). Validators on
+        ``policy`` are refreshed in place for the unchanged cases. Records stored
+        before fingerprints existed adopt the fresh one as their baseline.
+        """
+        headers = {}
+        if policy.etag:
+            headers["If-None-Match"] = policy.etag
+        if policy.last_modified:
+            headers["If-Modified-Since"] = policy.last_modified
+        response = self.client.get(policy.source_url, headers=headers)
+        if response.status_code == 304:
+            return REVALIDATE_NOT_MODIFIED, None
+        if response.status_code == 404:
+            return REVALIDATE_GONE, None
+        response.raise_for_status()
+        page_hash = hashlib.sha1(response.content).hexdigest()
+        if policy.page_hash == page_hash:
+            self._set_validators(policy, response, page_hash)
+            return REVALIDATE_UNCHANGED, None
+        article_id = parse_qs(urlparse(policy.source_url).query).get("id", [policy.id.removeprefix("zxkc-")])[0]
+        item = ListItem(article_id=article_id, title=policy.title, url=policy.source_url, publish_date=policy.publish_date)
+        fresh = self._build_policy(item, response)
+        if policy.fingerprint is None or fresh.fingerprint == policy.fingerprint:
+            self._set_validators(policy, response, page_hash)
+            policy.fingerprint = fresh.fingerprint
+            return REVALIDATE_UNCHANGED, None
+        return REVALIDATE_CHANGED, fresh
+
+    def _build_policy(self, item: ListItem, response: httpx.Response) -> Policy:
+        detail = self.parse_detail(response.text, fallback_title=item.title, fallback_date=item.publish_date, url=item.url)
+        policy = Policy(
+            id=f"zxkc-{item.article_id}",
+            title=detail["title"],
+            publish_date=detail["publish_date"],
+            region_level=self.infer_region_level(detail["title"]),
+            site="zxkc",
+            source_url=item.url,
+            content_html=detail["content_html"],
+            content_text=detail["content_text"],
+            attachments=detail["attachments"],
+        )
+        policy.fingerprint = policy.content_fingerprint()
+        self._set_validators(policy, response, hashlib.sha1(response.content).hexdigest())
+        return policy
+
+    @staticmethod
+    def _set_validators(policy: Policy, response: httpx.Response, page_hash: str) -> None:
+        policy.page_hash = page_hash
+        policy.etag = response.headers.get("etag") or policy.etag
+        policy.last_modified = response.headers.get("last-modified") or policy.last_modified
+
     def parse_list(self, html: str) -> List[ListItem]:
         soup = BeautifulSoup(html, "lxml")
+        try:
+            return self._parse_list(soup)
+        finally:
+            soup.decompose()
+
+    def _parse_list(self, soup: BeautifulSoup) -> List[ListItem]:
         links = soup.select("div.lsrw a.newa")
         items: List[ListItem] = []
         for link in links:
@@ -144,7 +221,14 @@ class ZxkcPoliciesClient:
         return items
 
     def parse_detail(self, html: str, fallback_title: str, fallback_date: Optional[date], url: str) -> dict:
+        """Extract detail fields as plain strings; the soup is decomposed before returning."""
         soup = BeautifulSoup(html, "lxml")
+        try:
+            return self._parse_detail(soup, fallback_title, fallback_date, url)
+        finally:
+            soup.decompose()
+
+    def _parse_detail(self, soup: BeautifulSoup, fallback_title: str, fallback_date: Optional[date], url: str) -> dict:
         title_node = soup.select_one("div.xw_xq div.b_t")
         title = title_node.get_text(strip=True) if title_node else fallback_title
         meta_node = soup.select_one("div.xw_xq div.z_c")
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import logging
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+from xml.etree.ElementTree import iterparse
+
+from storage.models import Attachment, Policy
+from storage.policies_repository import PolicyRepository
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+EXTRACTABLE_SUFFIXES = {".pdf", ".docx"}
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+class ExtractionUnavailable(RuntimeError):
+    """Raised when the optional parser for a file type is not installed."""
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_docx_paragraphs(path: str | Path) -> Iterable[str]:
+    """Stream paragraphs out of ``word/document.xml`` without building the whole tree."""
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as fh:
+        for _, elem in iterparse(fh, events=("end",)):
+            if elem.tag == f"{WORD_NS}p":
+                text = "".join(node.text or "" for node in elem.iter(f"{WORD_NS}t")).strip()
+                if text:
+                    yield text
+                elem.clear()
+
+
+def iter_pdf_pages(path: str | Path) -> Iterable[str]:
+    """Stream page texts; pages are parsed one at a time by pypdf (optional dependency)."""
+    try:
+        from pypdf import PdfReader
+    except ImportError as exc:
+        raise ExtractionUnavailable("PDF extraction requires pypdf: uv sync --extra attachments") from exc
+    reader = PdfReader(str(path), strict=False)
+    for page in reader.pages:
+        text = (page.extract_text() or "").strip()
+        if text:
+            yield text
+
+
+def extract_to_file(source: str, target: str, max_chars: int) -> int:
+    """Pool task: write the text of ``source`` to gzip ``target`` chunk by chunk; returns chars written."""
+    suffix = Path(source).suffix.lower()
+    chunks = iter_pdf_pages(source) if suffix == ".pdf" else iter_docx_paragraphs(source)
+    written = 0
+    tmp = Path(f"{target}.tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        for chunk in chunks:
+            chunk = chunk[: max_chars - written]
+            fh.write(chunk)
+            fh.write("\n")
+            written += len(chunk)
+            if written >= max_chars:
+                break
+    tmp.replace(target)
+    return written
+
+
+def _limit_worker_memory(memory_limit_mb: Optional[int]) -> None:
+    if resource and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+class AttachmentTextExtractor:
+    """Extract PDF/DOCX attachment text in a process pool, outside the crawl loop.
+
+    Text is cached by attachment content hash (``<sha256>.txt.gz``), so an annex
+    shared by several policies is parsed once. Memory stays bounded: workers are
+    recycled every ``max_tasks_per_child`` files and capped at ``memory_limit_mb``
+    of address space, files above ``max_file_mb`` are skipped, at most
+    ``workers * 2`` files are in flight and output is truncated at ``max_chars``.
+
+    A file whose extraction fails keeps no ``sha256``, so the next run retries
+    it. A worker killed by the memory cap breaks the pool; it is replaced and
+    the remaining files go to the new pool.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = "data/policies_npc/attachment_text",
+        workers: int = 2,
+        max_tasks_per_child: int = 20,
+        memory_limit_mb: Optional[int] = 1024,
+        max_file_mb: int = 100,
+        max_chars: int = 500_000,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.memory_limit_mb = memory_limit_mb
+        self.max_file_bytes = max_file_mb * 1024 * 1024
+        self.max_chars = max_chars
+
+    def cache_path(self, sha256: str) -> Path:
+        return self.cache_dir / f"{sha256}.txt.gz"
+
+    def cached_text(self, sha256: str) -> Optional[str]:
+        path = self.cache_path(sha256)
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            return fh.read()
+
+    def run(self, repo: PolicyRepository, batch_size: int = 50, limit: Optional[int] = None) -> int:
+        """Extract text for stored policies with unprocessed attachments; returns policies updated."""
+        todo = [policy for policy in repo.load_index().values() if self._pending(policy)]
+        if limit:
+            todo = todo[:limit]
+        updated = 0
+        self._pool = self._new_pool()
+        try:
+            for start in range(0, len(todo), batch_size):
+                batch = todo[start:start + batch_size]
+                self._extract_batch(batch)
+                repo.upsert_many(batch)
+                updated += len(batch)
+                logger.info("附件文本抽取进度：%d/%d", updated, len(todo))
+        finally:
+            self._pool.shutdown()
+        return updated
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            max_tasks_per_child=self.max_tasks_per_child,
+            initializer=_limit_worker_memory,
+            initargs=(self.memory_limit_mb,),
+        )
+
+    def _submit(self, source: str, sha256: str) -> Future:
+        try:
+            return self._pool.submit(extract_to_file, source, str(self.cache_path(sha256)), self.max_chars)
+        except BrokenProcessPool:
+            logger.warning("抽取进程池已损坏（进程可能超出内存上限），重建后继续。")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._new_pool()
+            return self._pool.submit(extract_to_file, source, str(self.cache_path(sha256)), self.max_chars)
+
+    def _extract_batch(self, policies: List[Policy]) -> None:
+        sources: Dict[str, str] = {}
+        for policy in policies:
+            for attachment in self._extractable(policy):
+                attachment.sha256 = attachment.sha256 or file_sha256(attachment.local_path)
+                if not self.cache_path(attachment.sha256).exists():
+                    sources.setdefault(attachment.sha256, attachment.local_path)
+
+        failed: Set[str] = set()
+        in_flight: Dict[Future, str] = {}
+        for sha256, source in sources.items():
+            if len(in_flight) >= self.workers * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future, in_flight.pop(future), failed)
+            in_flight[self._submit(source, sha256)] = sha256
+        for future in list(in_flight):
+            self._collect(future, in_flight.pop(future), failed)
+
+        for policy in policies:
+            sections = []
+            for attachment in self._extractable(policy):
+                if attachment.sha256 in failed:
+                    attachment.sha256 = None  # not extracted: retried by the next run
+                    continue
+                text = self.cached_text(attachment.sha256)
+                if text:
+                    sections.append(f"【{attachment.name}】\n{text.strip()}")
+            policy.attachment_text = "\n\n".join(sections) or None
+
+    def _collect(self, future: Future, sha256: str, failed: Set[str]) -> None:
+        try:
+            future.result()
+        except ExtractionUnavailable as exc:
+            failed.add(sha256)
+            logger.warning("%s", exc)
+        except Exception as exc:
+            failed.add(sha256)
+            logger.warning("附件文本抽取失败 %s: %r", sha256[:12], exc)
+
+    def _extractable(self, policy: Policy) -> List[Attachment]:
+        attachments = []
+        for attachment in policy.attachments:
+            if not attachment.local_path or Path(attachment.local_path).suffix.lower() not in EXTRACTABLE_SUFFIXES:
+                continue
+            path = Path(attachment.local_path)
+            if not path.exists() or path.stat().st_size > self.max_file_bytes:
+                continue
+            attachments.append(attachment)
+        return attachments
+
+    def _pending(self, policy: Policy) -> bool:
+        return any(not attachment.sha256 for attachment in self._extractable(policy))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Extract PDF/DOCX attachment text into stored policies.")
+    parser.add_argument("--root", default="data/policies_npc", help="政策库目录")
+    parser.add_argument("--workers", type=int, default=2, help="抽取进程数")
+    parser.add_argument("--memory-limit-mb", type=int, default=1024, help="单个抽取进程的内存上限（MB）")
+    parser.add_argument("--limit", type=int, default=None, help="最多处理多少条政策")
+    parser.add_argument("--log-level", default="INFO", help="日志级别，例如 INFO/DEBUG")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    repo = PolicyRepository(args.root)
+    extractor = AttachmentTextExtractor(Path(args.root) / "attachment_text", workers=args.workers, memory_limit_mb=args.memory_limit_mb)
+    count = extractor.run(repo, limit=args.limit)
+    logger.info("附件文本抽取完成，更新 %d 条政策。", count)
+
+
+if __name__ == "__main__":
+    main()
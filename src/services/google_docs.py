@@ -124,6 +124,31 @@ class GoogleDocsExporter:
 
         return ExportResult(document_id=doc_id, document_url=doc_url, attachments=uploaded_attachments)
 
+    def update(self, policy: Policy) -> ExportResult:
+        """Replace the body of the policy's existing doc; only attachments new to Drive are uploaded."""
+        if not policy.google_doc_id:
+            return self.export(policy)
+        doc_id = policy.google_doc_id
+        document = self._docs_service.documents().get(documentId=doc_id, fields="body/content/endIndex").execute()
+        end_index = max((item.get("endIndex", 1) for item in document.get("body", {}).get("content", [])), default=1)
+
+        uploaded = list(self._upload_attachments(att for att in policy.attachments if not att.drive_file_id))
+        attachments = [att for att in policy.attachments if att.drive_file_id]
+        body_text = self._compose_body(policy)
+        if attachments:
+            body_text += "\n附件：\n" + "\n".join(
+                f"- {att.name}: {att.drive_view_url or att.drive_download_url or att.url}" for att in attachments
+            )
+        requests = []
+        if end_index > 2:
+            requests.append({"deleteContentRange": {"range": {"startIndex": 1, "endIndex": end_index - 1}}})
+        requests.append({"insertText": {"location": {"index": 1}, "text": body_text}})
+        self._docs_service.documents().batchUpdate(documentId=doc_id, body={"requests": requests}).execute()
+        logger.info("Updated doc %s (%d new attachments)", doc_id, len(uploaded))
+
+        policy.attachments = attachments
+        return ExportResult(document_id=doc_id, document_url=policy.google_doc_url or f"https://docs.google.com/document/d/{doc_id}/edit", attachments=attachments)
+
     def _compose_body(self, policy: Policy) -> str:
         parts = [
             policy.title,
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+from services.google_docs import DOCS_SCOPES, _load_credentials
+from storage.models import Policy
+
+logger = logging.getLogger(__name__)
+
+HEADER = ["发布日期", "标题", "层级", "原始链接", "Google Doc", "附件"]
+KEY_COLUMN = "D"  # source_url identifies the row of a policy
+LAST_COLUMN = "F"
+RETRY_STATUSES = {429, 500, 502, 503}
+ROW_IN_RANGE = re.compile(r"![A-Z]+(\d+)")
+
+
+class GoogleSheetsIndexer:
+    """Keep one row per policy in a Google Sheet, written in buffered batches.
+
+    Rows are keyed by ``source_url``. Changes are buffered and sent every
+    ``batch_size`` rows: existing rows in one ``values.batchUpdate`` call, new
+    rows in one ``values.append`` call (which also grows the grid). Before
+    appending, the key column is read again so that rows appended meanwhile by
+    other workers are updated instead of duplicated. Calls are spaced
+    ``min_interval`` seconds apart and retried with backoff on quota errors, so
+    a backfill of thousands of rows stays within the per-minute write quota.
+    """
+
+    def __init__(
+        self,
+        spreadsheet_id: str | None = None,
+        sheet: str | None = None,
+        credentials=None,
+        service=None,
+        batch_size: int = 500,
+        min_interval: float = 1.0,
+        max_retries: int = 5,
+    ) -> None:
+        self.spreadsheet_id = spreadsheet_id or os.getenv("GOOGLE_SHEETS_INDEX_ID")
+        if not self.spreadsheet_id:
+            raise RuntimeError("Missing spreadsheet id. Provide GOOGLE_SHEETS_INDEX_ID or spreadsheet_id.")
+        self.sheet = sheet or os.getenv("GOOGLE_SHEETS_INDEX_SHEET", "政策索引")
+        if service is None:
+            service = build("sheets", "v4", credentials=credentials or _load_credentials(DOCS_SCOPES), cache_discovery=False)
+        self._values = service.spreadsheets().values()
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self._rows: Optional[Dict[str, int]] = None
+        self._has_header = False
+        self._pending: Dict[str, List[str]] = {}
+        self._last_call = 0.0
+
+    def __enter__(self) -> "GoogleSheetsIndexer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.flush()
+
+    def add(self, policy: Policy) -> None:
+        self._pending[policy.source_url] = self.row(policy)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def add_policies(self, policies: Iterable[Policy]) -> None:
+        """Repository listener: buffer rows for upserted policies."""
+        for policy in policies:
+            self.add(policy)
+
+    def flush(self) -> int:
+        """Send buffered rows; returns the number of rows written."""
+        if not self._pending:
+            return 0
+        cached = self._rows is not None
+        rows = self._load_rows()
+        if cached and any(url not in rows for url in self._pending):
+            rows = self._load_rows(refresh=True)
+        pending, self._pending = self._pending, {}
+        updates = [(rows[url], values) for url, values in pending.items() if url in rows]
+        appends = [(url, values) for url, values in pending.items() if url not in rows]
+
+        if updates:
+            data = [
+                {"range": self._range(f"A{number}:{LAST_COLUMN}{number}"), "values": [values]}
+                for number, values in updates
+            ]
+            self._execute(
+                self._values.batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={"valueInputOption": "RAW", "data": data},
+                )
+            )
+        if appends:
+            values = [row for _, row in appends]
+            header = not self._has_header and not rows
+            if header:
+                values.insert(0, HEADER)
+            response = self._execute(
+                self._values.append(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=self._range(f"A:{LAST_COLUMN}"),
+                    valueInputOption="RAW",
+                    insertDataOption="INSERT_ROWS",
+                    body={"values": values},
+                )
+            )
+            match = ROW_IN_RANGE.search(response.get("updates", {}).get("updatedRange", ""))
+            first = int(match.group(1)) + (1 if header else 0) if match else max(rows.values(), default=1) + 1
+            self._has_header = self._has_header or header
+            for offset, (url, _) in enumerate(appends):
+                rows[url] = first + offset
+        logger.info("Google Sheets 索引已同步：更新 %d 行，新增 %d 行", len(updates), len(appends))
+        return len(updates) + len(appends)
+
+    def sync(self, policies: Iterable[Policy]) -> int:
+        """Backfill or refresh rows for ``policies``; returns the number of rows written."""
+        written = 0
+        for policy in policies:
+            self._pending[policy.source_url] = self.row(policy)
+            if len(self._pending) >= self.batch_size:
+                written += self.flush()
+        return written + self.flush()
+
+    @staticmethod
+    def row(policy: Policy) -> List[str]:
+        attachments = "\n".join(
+            f"{att.name}: {att.drive_view_url or att.drive_download_url or att.url}" for att in policy.attachments
+        )
+        return [
+            policy.publish_date.isoformat() if policy.publish_date else "",
+            policy.title,
+            policy.region_level or "",
+            policy.source_url,
+            policy.google_doc_url or "",
+            attachments,
+        ]
+
+    def _load_rows(self, refresh: bool = False) -> Dict[str, int]:
+        """Map source URLs to row numbers, reading row 1 and the key column in one call."""
+        if self._rows is None or refresh:
+            response = self._execute(
+                self._values.batchGet(
+                    spreadsheetId=self.spreadsheet_id,
+                    ranges=[self._range(f"A1:{LAST_COLUMN}1"), self._range(f"{KEY_COLUMN}:{KEY_COLUMN}")],
+                )
+            )
+            first, keys = (value_range.get("values", []) for value_range in response.get("valueRanges", [{}, {}]))
+            self._has_header = bool(first) and first[0] == HEADER
+            self._rows = {}
+            for number, values in enumerate(keys, start=1):
+                if number == 1 and self._has_header:
+                    continue
+                if values and values[0]:
+                    self._rows.setdefault(values[0], number)
+        return self._rows
+
+    def _range(self, cells: str) -> str:
+        return "'{}'!{}".format(self.sheet.replace("'", "''"), cells)
+
+    def _execute(self, request) -> dict:
+        for attempt in range(self.max_retries + 1):
+            wait = self._last_call + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_call = time.monotonic()
+            try:
+                return request.execute()
+            except HttpError as exc:
+                status = getattr(exc.resp, "status", None)
+                if status not in RETRY_STATUSES or attempt == self.max_retries:
+                    raise
+                delay = min(2 ** attempt * max(self.min_interval, 1.0), 64.0)
+                logger.warning("Sheets API 返回 %s，%.0f 秒后重试", status, delay)
+                time.sleep(delay)
+        raise AssertionError("unreachable")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill the Google Sheets index of stored policies.")
+    parser.add_argument("--root", default="data/policies_npc", help="政策库目录")
+    parser.add_argument("--spreadsheet-id", help="表格 ID（默认读取 GOOGLE_SHEETS_INDEX_ID）")
+    parser.add_argument("--sheet", help="工作表名称（默认读取 GOOGLE_SHEETS_INDEX_SHEET，或“政策索引”）")
+    parser.add_argument("--batch-size", type=int, default=500, help="每次批量写入的行数")
+    parser.add_argument("--log-level", default="INFO", help="日志级别，例如 INFO/DEBUG")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from storage.policies_repository import PolicyRepository
+
+    args = parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    load_dotenv()
+    policies = sorted(PolicyRepository(args.root).load_index().values(), key=lambda p: (p.publish_date is None, p.publish_date))
+    indexer = GoogleSheetsIndexer(args.spreadsheet_id, sheet=args.sheet, batch_size=args.batch_size)
+    count = indexer.sync(policies)
+    logger.info("Google Sheets 索引回填完成，共写入 %d 行。", count)
+
+
+if __name__ == "__main__":
+    main()
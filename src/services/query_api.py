@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from storage.models import Investment
+from storage.record_index import RecordIndex
+from storage.records_repository import RecordRepository, investment_repository, product_repository
+
+logger = logging.getLogger(__name__)
+
+HOMEPAGE_SIZE = 10
+PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+class QueryService:
+    """Read API over the investment and product repositories.
+
+    Lists use keyset pagination: following the ``next`` cursor costs one
+    index seek per page at any depth. ``page=N`` is resolved through
+    page-boundary cursors remembered per index generation: the first request
+    for a deep page walks the index to it (linear in ``N * limit``), later
+    requests for any page up to N reuse the boundaries, and every ingest
+    starts the walk again. The homepage top ``HOMEPAGE_SIZE`` investments are
+    cached until the next ingest bumps the index generation.
+    """
+
+    def __init__(self, investments: RecordIndex | None = None, products: RecordIndex | None = None) -> None:
+        if investments is None:
+            investments = RecordIndex(investment_repository(), filters=("industry", "region"))
+        if products is None:
+            products = RecordIndex(product_repository(), sort_fields=("org", "product_name"), filters=("org", "category"), descending=False)
+        self.views: Dict[str, RecordIndex] = {"investments": investments, "products": products}
+        self._homepage: Optional[Tuple[int, List[dict]]] = None
+        self._boundaries: Dict[Tuple, List[Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def sync(self) -> None:
+        """Pick up repository changes written by other processes (e.g. a crawler run)."""
+        for index in self.views.values():
+            index.sync()
+
+    def homepage(self) -> List[dict]:
+        index = self.views["investments"]
+        generation = index.generation()
+        cached = self._homepage
+        if cached and cached[0] == generation:
+            return cached[1]
+        items = [self._to_dict(index, record) for record in index.page(HOMEPAGE_SIZE).items]
+        self._homepage = (generation, items)
+        return items
+
+    def list(
+        self,
+        view: str,
+        cursor: Optional[str] = None,
+        page: Optional[int] = None,
+        limit: int = PAGE_SIZE,
+        **filters: Optional[str],
+    ) -> Dict[str, Any]:
+        index = self.views[view]
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if cursor is None and page and page > 1:
+            cursor = self._page_cursor(index, view, page, limit, filters)
+            if cursor is None:
+                return {"items": [], "next": None}
+        result = index.page(limit, cursor, **filters)
+        return {"items": [self._to_dict(index, record) for record in result.items], "next": result.next_cursor}
+
+    def detail(self, view: str, record_id: str) -> Optional[dict]:
+        index = self.views[view]
+        record = index.get(record_id)
+        return self._to_dict(index, record) if record else None
+
+    def _page_cursor(self, index: RecordIndex, view: str, page: int, limit: int, filters: dict) -> Optional[str]:
+        key = (view, index.generation(), limit, tuple(sorted(filters.items())))
+        with self._lock:
+            if key not in self._boundaries:
+                self._boundaries = {k: v for k, v in self._boundaries.items() if k[:2] != key[:2]}
+                self._boundaries[key] = [None]
+            boundaries = self._boundaries[key]
+            # boundaries[n] is the cursor that starts page n + 1.
+            while len(boundaries) < page:
+                cursor = index.next_cursor(limit, boundaries[-1], **filters)
+                if cursor is None:
+                    return None
+                boundaries.append(cursor)
+            return boundaries[page - 1]
+
+    @staticmethod
+    def _to_dict(index: RecordIndex, record: Any) -> dict:
+        return {"id": index.record_id(record)} | record.model_dump(mode="json", exclude={"id"})
+
+
+def make_handler(service: QueryService) -> type:
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            parts = [part for part in url.path.split("/") if part]
+            try:
+                service.sync()
+                if not parts:
+                    self._send(HTTPStatus.OK, {"investments": service.homepage()})
+                elif parts[0] not in service.views or len(parts) > 2:
+                    self._send(HTTPStatus.NOT_FOUND, {"error": "not found"})
+                elif len(parts) == 2:
+                    record = service.detail(parts[0], parts[1])
+                    self._send(HTTPStatus.OK if record else HTTPStatus.NOT_FOUND, record or {"error": "not found"})
+                else:
+                    self._send(HTTPStatus.OK, self._list(parts[0], params))
+            except ValueError as exc:
+                self._send(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+
+        def _list(self, view: str, params: Dict[str, str]) -> Dict[str, Any]:
+            page = int(params.pop("page")) if "page" in params else None
+            limit = int(params.pop("limit", PAGE_SIZE))
+            cursor = params.pop("cursor", None)
+            result = service.list(view, cursor=cursor, page=page, limit=limit, **params)
+            if result["next"]:
+                result["next"] = f"/{view}?" + urlencode({"cursor": result["next"], "limit": limit, **params})
+            return result
+
+        def _send(self, status: HTTPStatus, payload: Any) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug(format, *args)
+
+    return QueryHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, service: QueryService | None = None) -> None:
+    service = service or QueryService()
+    service.sync()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    logger.info("查询服务已启动：http://%s:%d/", host, port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def benchmark(records: int = 100_000, samples: int = 50) -> None:
+    """Compare keyset and OFFSET page latency at increasing depth on synthetic investments."""
+    with tempfile.TemporaryDirectory() as tmp:
+        repo: RecordRepository[Investment] = investment_repository(tmp)
+        index = RecordIndex(repo, filters=("industry", "region"))
+        start = date(2024, 1, 1)
+        started = time.perf_counter()
+        repo.upsert_many(
+            Investment(
+                id=f"inv-{n}",
+                date=start + timedelta(days=n % 365),
+                startup=f"初创公司{n}",
+                round="A轮",
+                amount="数千万",
+                currency="CNY",
+                investors=["红杉中国", "高瓴创投"],
+                industry=["企业服务", "人工智能", "先进制造"][n % 3],
+                region="湖北",
+                source_url=f"https://www.itjuzi.com/investevent/{n}",
+            )
+            for n in range(records)
+        )
+        print(f"ingest {records} records: {time.perf_counter() - started:.1f}s")
+        service = QueryService(investments=index, products=RecordIndex(product_repository(tmp)))
+
+        for depth in (1, 10, 100, 1000, records // PAGE_SIZE - 1):
+            cursor = service._page_cursor(index, "investments", depth, PAGE_SIZE, {})
+            keyset = _median_ms(lambda: index.page(PAGE_SIZE, cursor), samples)
+            offset_sql = "SELECT payload FROM records ORDER BY sort_key DESC, id DESC LIMIT ? OFFSET ?"
+            offset = _median_ms(lambda: index._conn.execute(offset_sql, (PAGE_SIZE, (depth - 1) * PAGE_SIZE)).fetchall(), samples)
+            print(f"page {depth:>6}: keyset {keyset:7.3f} ms   offset {offset:7.3f} ms")
+        service.homepage()
+        print(f"homepage (cached): {_median_ms(service.homepage, samples):.4f} ms")
+        print(f"detail by id:      {_median_ms(lambda: service.detail('investments', 'inv-54321'), samples):.3f} ms")
+        index.close()
+
+
+def _median_ms(func, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve investments and products over a local read-only HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口")
+    parser.add_argument("--bench", type=int, metavar="N", help="不启动服务，改为用 N 条合成记录做分页基准测试")
+    parser.add_argument("--log-level", default="INFO", help="日志级别，例如 INFO/DEBUG")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.bench:
+        benchmark(args.bench)
+        return
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
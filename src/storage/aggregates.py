@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from .models import BankMetric, Product
+from .records_repository import RecordRepository, bank_metric_repository, product_repository
+
+logger = logging.getLogger(__name__)
+
+NUMBER_UNIT = r"(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>{units})?"
+RATE_UNITS = "%|‰|BP|bp|个基点"
+LIMIT_UNITS = "亿|万|元"
+TERM_UNITS = "年|个月|月|天|日"
+# Scale factors to the canonical unit of each range: percent, 万元 and months.
+RATE_SCALE = {"%": 1.0, "‰": 0.1}
+LIMIT_SCALE = {"亿": 10000.0, "万": 1.0, "元": 0.0001}
+TERM_SCALE = {"年": 12.0, "个月": 1.0, "月": 1.0, "天": 1 / 30, "日": 1 / 30}
+UPPER_ONLY = r"最高|不超过|不高于|以内|以下|最长|上限"
+LOWER_ONLY = r"起|以上|不低于|最低|最短|下限"
+# BankMetric units that are amounts of money, expressed in 亿元.
+MONEY_SCALE = {"万亿元": 10000.0, "亿元": 1.0, "万元": 0.0001, "元": 1e-8}
+RANGE_COLUMNS = {"rate_range": (RATE_UNITS, RATE_SCALE, "%"), "limit_range": (LIMIT_UNITS, LIMIT_SCALE, "万"), "term_range": (TERM_UNITS, TERM_SCALE, "月")}
+# Parsed per-record rows kept in the row logs, and the groupings maintained over them.
+PRODUCT_FIELDS = ("org", "category", "rate_low", "rate_high", "limit_high", "term_high")
+METRIC_FIELDS = ("bank", "metric", "unit", "year", "value")
+PRODUCT_GROUPINGS = ("org", "category")
+UNCATEGORIZED = "未分类"
+# Running partial aggregates per product group, by combine rule: field -> source column.
+PARTIAL_MIN = {"rate_low": "rate_low"}
+PARTIAL_MAX = {"rate_high": "rate_high", "limit_high": "limit_high", "term_high": "term_high"}
+PARTIAL_MEAN = {"rate_high_avg": "rate_high", "limit_high_avg": "limit_high"}
+
+
+def parse_ranges(values: pd.Series, units: str, scale: Dict[str, float], default_unit: str) -> pd.DataFrame:
+    """Vectorized parse of range strings such as ``100万-1亿元`` into ``low``/``high`` in the canonical unit.
+
+    A number without a unit takes the unit of the next number (``1-3年``);
+    single-bound phrases (``最高``/``起``) leave the other bound empty. Numbers
+    in units missing from ``scale`` (basis-point spreads) are ignored.
+    """
+    text = values.fillna("").astype(str)
+    result = pd.DataFrame({"low": np.nan, "high": np.nan}, index=values.index)
+    found = text.str.extractall(NUMBER_UNIT.format(units=units))
+    if found.empty:
+        return result
+    found["unit"] = found["unit"].groupby(level=0).bfill().fillna(default_unit)
+    found["value"] = found["number"].astype(float) * found["unit"].map(scale)
+    bounds = found.groupby(level=0)["value"].agg(["min", "max", "count"])
+    result.loc[bounds.index, "low"] = bounds["min"]
+    result.loc[bounds.index, "high"] = bounds["max"]
+    single = result.index.isin(bounds.index[bounds["count"] == 1])
+    result.loc[single & text.str.contains(UPPER_ONLY), "low"] = np.nan
+    result.loc[single & text.str.contains(LOWER_ONLY) & ~text.str.contains(UPPER_ONLY), "high"] = np.nan
+    return result
+
+
+def parse_products(products: Iterable[Product], keys: Iterable[str]) -> pd.DataFrame:
+    frame = pd.DataFrame([product.model_dump() for product in products], index=pd.Index(list(keys), name="key"))
+    if frame.empty:
+        return frame
+    frame = frame[~frame.index.duplicated(keep="last")]
+    for column, (units, scale, default_unit) in RANGE_COLUMNS.items():
+        name = column.split("_")[0]
+        bounds = parse_ranges(frame[column], units, scale, default_unit)
+        frame[f"{name}_low"] = bounds["low"]
+        frame[f"{name}_high"] = bounds["high"]
+    return frame
+
+
+def product_partials(frame: pd.DataFrame, by: str) -> Dict[str, Dict[str, Any]]:
+    """Vectorized count/sum/min/max partial aggregates of parsed products per ``by`` group."""
+    grouped = frame.assign(**{by: frame[by].fillna(UNCATEGORIZED)}).groupby(by, sort=False)
+    columns = {"products": ("product_name", "size")}
+    columns.update({name: (source, "min") for name, source in PARTIAL_MIN.items()})
+    columns.update({name: (source, "max") for name, source in PARTIAL_MAX.items()})
+    for name, source in PARTIAL_MEAN.items():
+        columns[f"{name}_sum"] = (source, "sum")
+        columns[f"{name}_n"] = (source, "count")
+    stats = grouped.agg(**columns)
+    return {group: {name: _number(value) for name, value in row.items()} for group, row in stats.to_dict("index").items()}
+
+
+def merge_partials(target: Dict[str, Any], delta: Dict[str, Any]) -> None:
+    """Fold ``delta`` into the running partial ``target`` in place."""
+    target["products"] = target.get("products", 0) + delta["products"]
+    for name in PARTIAL_MEAN:
+        target[f"{name}_sum"] = target.get(f"{name}_sum", 0.0) + delta[f"{name}_sum"]
+        target[f"{name}_n"] = target.get(f"{name}_n", 0) + delta[f"{name}_n"]
+    for names, pick in ((PARTIAL_MIN, min), (PARTIAL_MAX, max)):
+        for name in names:
+            values = [value for value in (target.get(name), delta[name]) if value is not None]
+            target[name] = pick(values) if values else None
+
+
+def series_growth(series: str, values: Dict[int, float]) -> List[Dict[str, Any]]:
+    """Year-over-year change between consecutive years of one ``bank/metric/unit`` series."""
+    bank, metric, unit = series.split("\x1f")
+    rows = []
+    for year in sorted(values):
+        previous = values.get(year - 1)
+        if previous is None:
+            continue
+        value = values[year]
+        change = value - previous
+        rows.append(
+            {
+                "bank": bank,
+                "metric": metric,
+                "unit": unit,
+                "year": year,
+                "previous": previous,
+                "value": value,
+                "change": change,
+                "yoy_pct": round(change / previous * 100, 2) if previous else None,
+            }
+        )
+    return rows
+
+
+def _number(value: Any) -> Any:
+    if isinstance(value, (np.integer, np.floating)):
+        value = value.item()
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+class RowLog:
+    """Append-only JSONL log of parsed per-record rows; the last line of a key wins.
+
+    Each line is ``[key, *values]``. The log is read once and then only its
+    tail, so records appended by other processes are picked up without
+    rescanning; callers hold the store lock around reads and appends.
+    ``members`` indexes the keys of every group of each grouping in log
+    order, so a group can be recomputed without touching other rows.
+    """
+
+    def __init__(self, path: Path, groupings: Dict[str, Callable[[tuple], str]]) -> None:
+        self.path = path
+        self.groupings = groupings
+        self.rows: Dict[str, tuple] = {}
+        self.members: Dict[str, Dict[str, Dict[str, None]]] = {name: {} for name in groupings}
+        self._offset = 0
+        self._epoch: Optional[str] = None
+
+    def catch_up(self, epoch: str) -> None:
+        """Read lines appended since the last call; a new ``epoch`` (after a rebuild) rereads the log."""
+        if epoch != self._epoch or not self.path.exists():
+            self._reset()
+            self._epoch = epoch
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as fh:
+            fh.seek(self._offset)
+            for line in fh:
+                key, *values = json.loads(line)
+                self._set(key, tuple(values))
+            self._offset = fh.tell()
+
+    def append(self, rows: Dict[str, tuple]) -> None:
+        with self.path.open("a", encoding="utf-8") as fh:
+            for key, values in rows.items():
+                fh.write(json.dumps([key, *values], ensure_ascii=False))
+                fh.write("\n")
+        for key, values in rows.items():
+            self._set(key, values)
+        self._offset = self.path.stat().st_size
+
+    def group_rows(self, grouping: str, group: str) -> List[tuple]:
+        return [self.rows[key] for key in self.members[grouping].get(group, ())]
+
+    def _set(self, key: str, values: tuple) -> None:
+        old = self.rows.pop(key, None)
+        for name, group_of in self.groupings.items():
+            members = self.members[name]
+            if old is not None:
+                group = members[group_of(old)]
+                del group[key]
+                if not group:
+                    del members[group_of(old)]
+            members.setdefault(group_of(values), {})[key] = None
+        self.rows[key] = values
+
+    def _reset(self) -> None:
+        self.rows.clear()
+        self.members = {name: {} for name in self.groupings}
+        self._offset = 0
+
+
+class AggregateStore:
+    """Dashboard aggregates over products and bank metrics, maintained at ingest time.
+
+    Range strings are parsed once per record into numeric bounds and appended
+    to ``products.rows.jsonl``/``bank_metrics.rows.jsonl``. ``partials.json``
+    holds running per-group partial aggregates (count, sum, min, max); an
+    ingest folds in the vectorized partials of its new records and touches
+    only the groups they belong to. Only when a replaced record held a group's
+    minimum or maximum is that one group recomputed from its rows. Results are
+    written to ``aggregates.json``, so dashboards read a small precomputed
+    file instead of rescanning raw records. ``*_avg`` columns are means of
+    the upper bounds (``rate_high``/``limit_high``).
+    """
+
+    def __init__(self, root: str | Path = "data/aggregates") -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.output_path = self.root / "aggregates.json"
+        self.partials_path = self.root / "partials.json"
+        self.lock_path = self.root / "aggregates.lock"
+        self.products = RowLog(
+            self.root / "products.rows.jsonl",
+            {by: (lambda row, i=PRODUCT_FIELDS.index(by): row[i] or UNCATEGORIZED) for by in PRODUCT_GROUPINGS},
+        )
+        self.bank_metrics = RowLog(self.root / "bank_metrics.rows.jsonl", {"series": lambda row: "\x1f".join(row[:3])})
+        self._lock = threading.Lock()
+        self._cache: Optional[Tuple[int, Dict[str, Any]]] = None
+
+    def attach(self, repository: RecordRepository) -> None:
+        """Register as upsert listener of a product or bank metric repository."""
+        if repository.model is Product:
+            repository.add_listener(lambda records: self.ingest_products(records, repository))
+        elif repository.model is BankMetric:
+            repository.add_listener(lambda records: self.ingest_bank_metrics(records, repository))
+        else:
+            raise ValueError(f"No aggregates for {repository.model.__name__}")
+
+    def ingest_products(self, products: List[Product], repository: RecordRepository) -> None:
+        keys = ["\x1f".join(repository.make_key(product)) for product in products]
+        frame = parse_products(products, keys)
+        if frame.empty:
+            return
+        fresh = {key: tuple(_number(value) for value in row) for key, row in zip(frame.index, frame[list(PRODUCT_FIELDS)].itertuples(index=False))}
+        with self._locked() as partials:
+            log = self.products
+            old = {key: log.rows[key] for key in fresh if key in log.rows}
+            dirty = {by: set() for by in PRODUCT_GROUPINGS}
+            for by in PRODUCT_GROUPINGS:
+                groups = partials.setdefault(f"products_by_{by}", {})
+                for row in old.values():
+                    group = log.groupings[by](row)
+                    self._remove_product(groups, group, row, dirty[by])
+            log.append(fresh)
+            for by in PRODUCT_GROUPINGS:
+                groups = partials[f"products_by_{by}"]
+                for group, delta in product_partials(frame, by).items():
+                    merge_partials(groups.setdefault(group, {}), delta)
+                for group in dirty[by] & groups.keys():
+                    self._recompute_extremes(groups[group], log.group_rows(by, group))
+
+    def ingest_bank_metrics(self, metrics: List[BankMetric], repository: RecordRepository) -> None:
+        frame = pd.DataFrame([metric.model_dump() for metric in metrics], index=pd.Index(["\x1f".join(repository.make_key(metric)) for metric in metrics], name="key"))
+        if frame.empty:
+            return
+        frame = frame[~frame.index.duplicated(keep="last")]
+        scale = frame["unit"].map(MONEY_SCALE)
+        frame["value"] = frame["value"].where(scale.isna(), frame["value"] * scale)
+        frame["unit"] = frame["unit"].where(scale.isna(), "亿元")
+        fresh = {key: tuple(_number(value) for value in row) for key, row in zip(frame.index, frame[list(METRIC_FIELDS)].itertuples(index=False))}
+        with self._locked() as partials:
+            log = self.bank_metrics
+            series_of = log.groupings["series"]
+            affected = {series_of(log.rows[key]) for key in fresh if key in log.rows}
+            affected.update(series_of(row) for row in fresh.values())
+            log.append(fresh)
+            growth = partials.setdefault("bank_growth", {})
+            for series in affected:
+                values = {row[3]: row[4] for row in log.group_rows("series", series)}
+                growth[series] = series_growth(series, values)
+                if not growth[series]:
+                    del growth[series]
+
+    def rebuild(self, products: RecordRepository | None = None, bank_metrics: RecordRepository | None = None) -> Dict[str, Any]:
+        products = products or product_repository()
+        bank_metrics = bank_metrics or bank_metric_repository()
+        with self._lock, self._file_lock():
+            for path in (self.products.path, self.bank_metrics.path, self.partials_path):
+                path.unlink(missing_ok=True)
+        product_index = products.load_index()
+        self.ingest_products(list(product_index.values()), products)
+        metric_index = bank_metrics.load_index()
+        self.ingest_bank_metrics(list(metric_index.values()), bank_metrics)
+        return self.read()
+
+    def read(self) -> Dict[str, Any]:
+        """Current aggregates; re-read from disk only when another process rewrote them."""
+        if not self.output_path.exists():
+            return {"products_by_org": [], "products_by_category": [], "bank_growth": [], "updated_at": None}
+        mtime = self.output_path.stat().st_mtime_ns
+        cached = self._cache
+        if cached and cached[0] == mtime:
+            return cached[1]
+        data = json.loads(self.output_path.read_text(encoding="utf-8"))
+        self._cache = (mtime, data)
+        return data
+
+    @staticmethod
+    def _remove_product(groups: Dict[str, Dict[str, Any]], group: str, row: tuple, dirty: set) -> None:
+        """Take the contribution of a replaced product out of its group's partials."""
+        partial = groups[group]
+        values = dict(zip(PRODUCT_FIELDS, row))
+        partial["products"] -= 1
+        if not partial["products"]:
+            del groups[group]
+            return
+        for name, source in PARTIAL_MEAN.items():
+            if values[source] is not None:
+                partial[f"{name}_sum"] -= values[source]
+                partial[f"{name}_n"] -= 1
+        for name, source in {**PARTIAL_MIN, **PARTIAL_MAX}.items():
+            if values[source] is not None and values[source] == partial[name]:
+                dirty.add(group)
+
+    @staticmethod
+    def _recompute_extremes(partial: Dict[str, Any], rows: List[tuple]) -> None:
+        for names, pick in ((PARTIAL_MIN, min), (PARTIAL_MAX, max)):
+            for name, source in names.items():
+                index = PRODUCT_FIELDS.index(source)
+                values = [row[index] for row in rows if row[index] is not None]
+                partial[name] = pick(values) if values else None
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, Any]]:
+        """Load partials and catch up the row logs under the inter-process lock, then publish."""
+        with self._lock, self._file_lock():
+            partials = json.loads(self.partials_path.read_text(encoding="utf-8")) if self.partials_path.exists() else {}
+            # A rebuild starts a new epoch, so every process rereads the row logs from scratch.
+            epoch = partials.setdefault("epoch", uuid.uuid4().hex)
+            self.products.catch_up(epoch)
+            self.bank_metrics.catch_up(epoch)
+            yield partials
+            _atomic(self.partials_path, lambda tmp: tmp.write_text(json.dumps(partials, ensure_ascii=False), encoding="utf-8"))
+            self._publish(partials)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold an exclusive inter-process lock on the store (no-op without fcntl)."""
+        with self.lock_path.open("a") as lock_fh:
+            if fcntl:
+                fcntl.flock(lock_fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_fh.fileno(), fcntl.LOCK_UN)
+
+    def _publish(self, partials: Dict[str, Any]) -> None:
+        data: Dict[str, Any] = {}
+        for by in PRODUCT_GROUPINGS:
+            rows = []
+            for group, partial in partials.get(f"products_by_{by}", {}).items():
+                row = {by: group, "products": partial["products"]}
+                row.update({name: partial[name] for name in (*PARTIAL_MIN, *PARTIAL_MAX)})
+                for name in PARTIAL_MEAN:
+                    count = partial[f"{name}_n"]
+                    row[name] = round(partial[f"{name}_sum"] / count, 4) if count else None
+                rows.append(row)
+            data[f"products_by_{by}"] = sorted(rows, key=lambda row: (-row["products"], row[by]))
+        growth = [row for rows in partials.get("bank_growth", {}).values() for row in rows]
+        data["bank_growth"] = sorted(growth, key=lambda row: (row["year"], row["bank"], row["metric"]))
+        data["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        _atomic(self.output_path, lambda tmp: tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8"))
+        logger.debug("聚合结果已更新：%d 个机构，%d 条同比", len(data["products_by_org"]), len(data["bank_growth"]))
+
+
+def _atomic(path: Path, write) -> None:
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Rebuild and show dashboard aggregates for products and bank metrics.")
+    parser.add_argument("--root", default="data/aggregates", help="聚合结果目录")
+    parser.add_argument("--rebuild", action="store_true", help="从产品库与银行指标库全量重算")
+    return parser.parse_args()
+
+
+def main() -> None:
+    from rich import print
+
+    args = parse_args()
+    store = AggregateStore(args.root)
+    data = store.rebuild() if args.rebuild else store.read()
+    for row in data["products_by_org"][:20]:
+        print(f"{row['org']}: {row['products']} 个产品，利率 {row['rate_low']}~{row['rate_high']}%，最高额度 {row['limit_high']} 万元")
+    for row in data["bank_growth"]:
+        print(f"{row['year']} {row['bank']} {row['metric']}: {row['previous']} -> {row['value']} {row['unit']}（{row['yoy_pct']}%）")
+
+
+if __name__ == "__main__":
+    main()
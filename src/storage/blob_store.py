@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+HEADER = struct.Struct(">cB")  # record marker, dictionary id
+MARKER = b"B"
+NO_DICT = 0
+TRAINED_DICT = 1
+ZDICT_SIZE = 32 * 1024
+TRAIN_SAMPLES = 64
+
+
+class BlobStore:
+    """Append-only store of compressed policy bodies keyed by policy id.
+
+    Bodies are kept as zlib-compressed JSON in ``bodies.seg``; ``bodies.idx`` maps
+    ids to ``(offset, length, digest)``. Once ``TRAIN_SAMPLES`` bodies exist, a
+    preset dictionary is sampled from them (``bodies.dict``) and used for later
+    records, which shrinks the many near-identical HTML fragments of a site.
+    Callers must serialize writers (``PolicyRepository`` holds its file lock).
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_path = self.root / "bodies.seg"
+        self.index_path = self.root / "bodies.idx"
+        self.dict_path = self.root / "bodies.dict"
+        self._index: Dict[str, Tuple[int, int, str]] = {}
+        self._index_pos = 0
+        self._zdict: Optional[bytes] = None
+        self._samples: List[bytes] = []
+        self._refresh()
+
+    def __contains__(self, policy_id: str) -> bool:
+        if policy_id not in self._index:
+            self._refresh()
+        return policy_id in self._index
+
+    def ids(self) -> Iterable[str]:
+        self._refresh()
+        return list(self._index)
+
+    def digest(self, policy_id: str) -> Optional[str]:
+        if policy_id not in self._index:
+            self._refresh()
+        entry = self._index.get(policy_id)
+        return entry[2] if entry else None
+
+    def get(self, policy_id: str) -> Dict[str, Optional[str]]:
+        entry = self._index.get(policy_id)
+        if entry is None:
+            self._refresh()
+            entry = self._index.get(policy_id)
+        if entry is None:
+            return {}
+        offset, length, _ = entry
+        with self.segment_path.open("rb") as fh:
+            fh.seek(offset)
+            frame = fh.read(length)
+        return json.loads(self._decompress(frame))
+
+    def put(self, policy_id: str, bodies: Dict[str, Optional[str]]) -> bool:
+        """Store ``bodies`` for ``policy_id``; returns False if the stored copy is identical."""
+        payload = json.dumps(bodies, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha1(payload).hexdigest()
+        # Another worker may have stored a newer copy since this id was last read.
+        self._refresh()
+        entry = self._index.get(policy_id)
+        if entry and entry[2] == digest:
+            return False
+        offset, length = self._append_frame(policy_id, payload, digest)
+        self._index[policy_id] = (offset, length, digest)
+        self._index_pos = self.index_path.stat().st_size
+        return True
+
+    def append(self, policy_id: str, bodies: Dict[str, Optional[str]]) -> None:
+        """Store bodies of a new ``policy_id`` without comparing digests or re-reading the index.
+
+        Used by streaming backfills. The entry is not cached in memory, so a
+        backfill's footprint does not grow with every body; lookups of the id
+        miss the cache and read it from ``bodies.idx`` like any other writer's.
+        """
+        payload = json.dumps(bodies, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        self._append_frame(policy_id, payload, hashlib.sha1(payload).hexdigest())
+
+    def _append_frame(self, policy_id: str, payload: bytes, digest: str) -> Tuple[int, int]:
+        frame = self._compress(payload)
+        with self.segment_path.open("ab") as fh:
+            fh.seek(0, 2)
+            offset = fh.tell()
+            fh.write(frame)
+        with self.index_path.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps({"id": policy_id, "offset": offset, "length": len(frame), "digest": digest}))
+            fh.write("\n")
+        return offset, len(frame)
+
+    def compact(self, live_ids: Iterable[str]) -> None:
+        """Rewrite the segment keeping only the latest body of ``live_ids``."""
+        self._refresh()
+        live = [policy_id for policy_id in live_ids if policy_id in self._index]
+        tmp_segment = self.segment_path.with_suffix(".seg.tmp")
+        tmp_index = self.index_path.with_suffix(".idx.tmp")
+        new_index: Dict[str, Tuple[int, int, str]] = {}
+        with self.segment_path.open("rb") as src, tmp_segment.open("wb") as dst, tmp_index.open("w", encoding="utf-8") as idx:
+            for policy_id in live:
+                offset, length, digest = self._index[policy_id]
+                src.seek(offset)
+                frame = src.read(length)
+                new_offset = dst.tell()
+                dst.write(frame)
+                idx.write(json.dumps({"id": policy_id, "offset": new_offset, "length": length, "digest": digest}))
+                idx.write("\n")
+                new_index[policy_id] = (new_offset, length, digest)
+        tmp_segment.replace(self.segment_path)
+        tmp_index.replace(self.index_path)
+        self._index = new_index
+        self._index_pos = self.index_path.stat().st_size
+
+    def _refresh(self) -> None:
+        """Pick up index entries appended since the last read (e.g. by another worker)."""
+        if not self.index_path.exists():
+            return
+        size = self.index_path.stat().st_size
+        if size < self._index_pos:
+            self._index, self._index_pos = {}, 0
+        if size == self._index_pos:
+            return
+        with self.index_path.open("r", encoding="utf-8") as fh:
+            fh.seek(self._index_pos)
+            for line in fh:
+                if not line.endswith("\n"):
+                    break
+                entry = json.loads(line)
+                self._index[entry["id"]] = (entry["offset"], entry["length"], entry["digest"])
+                self._index_pos += len(line.encode("utf-8"))
+
+    def _dictionary(self) -> Optional[bytes]:
+        if self._zdict is None and self.dict_path.exists():
+            self._zdict = self.dict_path.read_bytes()
+        return self._zdict
+
+    def _compress(self, payload: bytes) -> bytes:
+        zdict = self._dictionary()
+        if zdict is None:
+            self._samples.append(payload)
+            if len(self._samples) + len(self._index) >= TRAIN_SAMPLES and len(self._samples) >= 8:
+                zdict = self._train(self._samples)
+                self.dict_path.write_bytes(zdict)
+                self._zdict, self._samples = zdict, []
+        if zdict is None:
+            return HEADER.pack(MARKER, NO_DICT) + zlib.compress(payload, 6)
+        compressor = zlib.compressobj(6, zdict=zdict)
+        return HEADER.pack(MARKER, TRAINED_DICT) + compressor.compress(payload) + compressor.flush()
+
+    def _decompress(self, frame: bytes) -> bytes:
+        marker, dict_id = HEADER.unpack_from(frame)
+        if marker != MARKER:
+            raise ValueError("Corrupted body frame")
+        data = frame[HEADER.size:]
+        if dict_id == NO_DICT:
+            return zlib.decompress(data)
+        decompressor = zlib.decompressobj(zdict=self._dictionary())
+        return decompressor.decompress(data) + decompressor.flush()
+
+    @staticmethod
+    def _train(samples: List[bytes]) -> bytes:
+        """Build a preset dictionary from fragments that recur across samples.
+
+        zlib favours matches near the end of the dictionary, so the most common
+        fragments are placed last.
+        """
+        counts: Counter = Counter()
+        for sample in samples:
+            fragments = {fragment for fragment in sample.replace(b"<", b"\n<").split(b"\n") if 4 <= len(fragment) <= 256}
+            counts.update(fragments)
+        common = [fragment for fragment, count in counts.most_common() if count > 1]
+        chosen: List[bytes] = []
+        size = 0
+        for fragment in common:
+            if size + len(fragment) > ZDICT_SIZE:
+                break
+            chosen.append(fragment)
+            size += len(fragment)
+        if not chosen:
+            chosen = [samples[-1][-ZDICT_SIZE:]]
+        return b"".join(reversed(chosen))
@@ -1,7 +1,12 @@
+import hashlib
+import re
 from datetime import date
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+# Bulky Policy fields kept out of policies.jsonl and loaded lazily from the blob store.
+BODY_FIELDS = ("content_html", "content_text", "attachment_text")
 
 
 class Attachment(BaseModel):
@@ -12,6 +17,7 @@ class Attachment(BaseModel):
     drive_file_id: Optional[str] = None
     drive_view_url: Optional[str] = None
     drive_download_url: Optional[str] = None
+    sha256: Optional[str] = None
 
 
 class Policy(BaseModel):
@@ -23,10 +29,85 @@ class Policy(BaseModel):
     source_url: str
     content_html: Optional[str] = None
     content_text: Optional[str] = None
+    attachment_text: Optional[str] = None
     keywords: Optional[List[str]] = None
     attachments: List[Attachment] = Field(default_factory=list)
     google_doc_id: Optional[str] = None
     google_doc_url: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    fingerprint: Optional[str] = None
+    page_hash: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    _body_loader: Optional[Callable[[str], Dict[str, Optional[str]]]] = PrivateAttr(default=None)
+
+    def __getattr__(self, name: str) -> Any:
+        if name in BODY_FIELDS:
+            self.load_bodies()
+            return self.__dict__.get(name)
+        return super().__getattr__(name)
+
+    def content_fingerprint(self) -> str:
+        """Hash of the whitespace-normalized body text and the set of attachment URLs."""
+        text = re.sub(r"\s+", " ", self.content_text or "").strip()
+        urls = "\n".join(sorted({att.url for att in self.attachments}))
+        return hashlib.sha1(f"{text}\x1f{urls}".encode("utf-8")).hexdigest()
+
+    def bodies_loaded(self) -> bool:
+        return all(name in self.__dict__ for name in BODY_FIELDS)
+
+    def load_bodies(self) -> None:
+        """Populate body fields that were released to the blob store."""
+        if self.bodies_loaded():
+            return
+        loader = (self.__pydantic_private__ or {}).get("_body_loader")
+        bodies = loader(self.id) if loader else {}
+        for name in BODY_FIELDS:
+            self.__dict__.setdefault(name, bodies.get(name))
+
+    def release_bodies(self, loader: Callable[[str], Dict[str, Optional[str]]]) -> None:
+        """Drop body fields from memory; they are reloaded through ``loader`` on access."""
+        self._body_loader = loader
+        for name in BODY_FIELDS:
+            self.__dict__.pop(name, None)
+
+    def model_dump(self, **kwargs: Any) -> Dict[str, Any]:
+        if not _excludes_bodies(kwargs.get("exclude")):
+            self.load_bodies()
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs: Any) -> str:
+        if not _excludes_bodies(kwargs.get("exclude")):
+            self.load_bodies()
+        return super().model_dump_json(**kwargs)
+
+
+def _excludes_bodies(exclude: Any) -> bool:
+    return exclude is not None and all(name in exclude for name in BODY_FIELDS)
+
+
+class NewsArticle(BaseModel):
+    id: str
+    title: str
+    publish_date: Optional[date] = None
+    site: Optional[str] = None
+    source_url: str
+    content_html: Optional[str] = None
+    content_text: Optional[str] = None
+
+
+class Investment(BaseModel):
+    id: str
+    date: date
+    startup: str
+    round: Optional[str] = None
+    amount: Optional[str] = None
+    currency: Optional[str] = None
+    investors: List[str] = Field(default_factory=list)
+    industry: Optional[str] = None
+    region: Optional[str] = None
+    source_url: str
 
 
 class BankMetric(BaseModel):
@@ -38,7 +119,9 @@ class BankMetric(BaseModel):
     evidence_url: str
     snippet: Optional[str] = None
 
+
 class Product(BaseModel):
+    id: Optional[str] = None
     org: str
     product_name: str
     category: Optional[str] = None
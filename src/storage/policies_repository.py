@@ -1,60 +1,243 @@
 from __future__ import annotations
 
 import json
+import os
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Iterable, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 
-from .models import Policy
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from .blob_store import BlobStore
+from .models import BODY_FIELDS, Policy
+from .search_index import SearchIndex
+from .serialization import BINARY_MAGIC, append_binary, decode_jsonl, dump_binary, encode_jsonl, iter_binary_rows, json_loads, load_binary
+from .similarity import SimilarityIndex
+
+UpsertListener = Callable[[List[Policy]], None]
+STORAGE_FORMATS = {"jsonl": "policies.jsonl", "binary": "policies.bin"}
 
 
 class PolicyRepository:
-    """Persist policies to JSONL storage and handle deduplication."""
+    """Persist policies to JSONL storage and handle deduplication.
+
+    ``policies.jsonl`` only holds metadata; ``content_html``/``content_text`` live
+    in a compressed :class:`BlobStore` and are loaded when first accessed. Stores
+    written before the split are migrated on open.
+
+    Listeners registered with :meth:`add_listener` receive every batch of
+    upserted policies after it is written and before its bodies are released;
+    the full-text index is one of them.
+    The near-duplicate index lives in the store root (``similarity.sqlite``);
+    pass a shared ``similarity_path`` to match reposts across sites.
 
-    def __init__(self, root: str | Path = "data/policies_npc") -> None:
+    ``storage_format`` is ``jsonl`` (default) or ``binary`` (``policies.bin``,
+    length-prefixed JSON frames, see :mod:`storage.serialization`); switching
+    formats converts the store on open.
+    Records on disk are ``trusted`` by default and loaded without validation.
+    """
+
+    def __init__(
+        self,
+        root: str | Path = "data/policies_npc",
+        similarity_path: str | Path | None = None,
+        storage_format: str = "jsonl",
+        trusted: bool = True,
+    ) -> None:
+        if storage_format not in STORAGE_FORMATS:
+            raise ValueError(f"Unknown storage format: {storage_format}")
         self.root = Path(root)
         self.root.mkdir(parents=True, exist_ok=True)
-        self.data_path = self.root / "policies.jsonl"
+        self.storage_format = storage_format
+        self.trusted = trusted
+        self.data_path = self.root / STORAGE_FORMATS[storage_format]
+        self.lock_path = self.root / "policies.lock"
+        self.blobs = BlobStore(self.root / "bodies")
+        self.search_index = SearchIndex(self.root / "search.sqlite")
+        self.similarity = SimilarityIndex(similarity_path or self.root / "similarity.sqlite")
+        self._listeners: List[UpsertListener] = [self.search_index.index_policies, self.similarity.add_policies]
+        if self._has_inline_bodies() or self._other_format_path():
+            self.migrate()
 
     def _make_key(self, title: str, publish_date: str | None, site: str | None) -> Tuple[str, str | None, str | None]:
         return title.strip(), publish_date, site or "zxkc"
 
     def load_index(self) -> Dict[Tuple[str, str | None, str | None], Policy]:
         index: Dict[Tuple[str, str | None, str | None], Policy] = {}
-        if not self.data_path.exists():
-            return index
-        with self.data_path.open("r", encoding="utf-8") as fh:
-            for line in fh:
-                line = line.strip()
-                if not line:
-                    continue
-                data = json.loads(line)
-                policy = Policy(**data)
-                key = self._make_key(policy.title, policy.publish_date.isoformat() if policy.publish_date else None, policy.site)
-                index[key] = policy
+        for policy in self._read(self.data_path):
+            if all(policy.__dict__.get(name) is None for name in BODY_FIELDS):
+                policy.release_bodies(self.blobs.get)
+            key = self._make_key(policy.title, policy.publish_date.isoformat() if policy.publish_date else None, policy.site)
+            index[key] = policy
         return index
 
     def upsert_many(self, policies: Iterable[Policy]) -> Dict[Tuple[str, str | None, str | None], Policy]:
-        index = self.load_index()
-        for policy in policies:
-            publish_date = policy.publish_date.isoformat() if policy.publish_date else None
-            key = self._make_key(policy.title, publish_date, policy.site)
-            index[key] = policy
-        self._write(index)
+        """Merge policies into the store; safe to call from several worker processes."""
+        upserted: List[Policy] = []
+        with self._lock():
+            index = self.load_index()
+            for policy in policies:
+                publish_date = policy.publish_date.isoformat() if policy.publish_date else None
+                key = self._make_key(policy.title, publish_date, policy.site)
+                index[key] = policy
+                upserted.append(policy)
+            self._write(index, release=False)
+        # Listeners see the bodies still in memory; releasing first would make them decompress every body again.
+        self._notify(upserted)
+        for policy in index.values():
+            if any(name in policy.__dict__ for name in BODY_FIELDS):
+                policy.release_bodies(self.blobs.get)
         return index
 
+    def append_many(self, policies: Iterable[Policy]) -> None:
+        """Append policies with keys not stored yet, without reading or rewriting the store.
+
+        For streaming backfills and queue workers that track known keys themselves;
+        if a key does get appended twice, the last line wins on load. Bodies go
+        to the blob store, listeners see the batch, then bodies are released.
+        """
+        policies = list(policies)
+        if not policies:
+            return
+        with self._lock():
+            for policy in policies:
+                policy.load_bodies()
+                self.blobs.append(policy.id, {name: policy.__dict__.get(name) for name in BODY_FIELDS})
+            if self.storage_format == "binary":
+                new_file = not self.data_path.exists()
+                with self.data_path.open("ab") as fh:
+                    if new_file:
+                        fh.write(BINARY_MAGIC)
+                    append_binary(policies, fh)
+            else:
+                with self.data_path.open("a", encoding="utf-8") as fh:
+                    for line in encode_jsonl(policies):
+                        fh.write(line)
+                        fh.write("\n")
+        self._notify(policies)
+        for policy in policies:
+            policy.release_bodies(self.blobs.get)
+
+    def iter_keys(self) -> Iterator[Tuple[str, str | None, str | None]]:
+        """Stream the keys of stored policies without building Policy objects."""
+        if not self.data_path.exists():
+            return
+        if self.storage_format == "binary":
+            with self.data_path.open("rb") as fh:
+                for data in iter_binary_rows(fh):
+                    publish_date = data.get("publish_date")
+                    yield self._make_key(data["title"], publish_date.isoformat() if publish_date else None, data.get("site"))
+            return
+        with self.data_path.open("rb") as fh:
+            for line in fh:
+                if line.strip():
+                    data = json_loads(line)
+                    yield self._make_key(data["title"], data.get("publish_date"), data.get("site"))
+
     def upsert_one(self, index: Dict[Tuple[str, str | None, str | None], Policy], policy: Policy) -> Tuple[str, str | None, str | None]:
+        """Store ``policy`` and record it in the caller's ``index``.
+
+        The store is re-read under the lock rather than rewritten from ``index``,
+        so records written meanwhile by other processes (e.g. workers) are kept.
+        """
         publish_date = policy.publish_date.isoformat() if policy.publish_date else None
         key = self._make_key(policy.title, publish_date, policy.site)
         index[key] = policy
-        self._write(index)
+        self.upsert_many([policy])
         return key
 
     def contains(self, title: str, publish_date: str | None, site: str | None = None) -> bool:
         key = self._make_key(title, publish_date, site)
         return key in self.load_index()
 
-    def _write(self, index: Dict[Tuple[str, str | None, str | None], Policy]) -> None:
-        with self.data_path.open("w", encoding="utf-8") as fh:
-            for policy in index.values():
-                fh.write(policy.model_dump_json())
-                fh.write("\n")
+    def flag_duplicate(self, policy: Policy) -> str | None:
+        """Link ``policy`` to the canonical record if it is a near-duplicate of a stored one."""
+        return self.similarity.flag(policy)
+
+    def add_listener(self, listener: UpsertListener) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, policies: List[Policy]) -> None:
+        if not policies:
+            return
+        for listener in self._listeners:
+            listener(policies)
+
+    def migrate(self) -> None:
+        """Move inline bodies of an older ``policies.jsonl`` into the blob store and convert between formats."""
+        with self._lock():
+            other = self._other_format_path()
+            if other:
+                index = {}
+                for policy in self._read(other):
+                    key = self._make_key(policy.title, policy.publish_date.isoformat() if policy.publish_date else None, policy.site)
+                    index[key] = policy
+                self._write(index)
+                other.replace(other.with_name(f"{other.name}.migrated"))
+            else:
+                self._write(self.load_index())
+
+    def compact_bodies(self) -> None:
+        """Drop superseded bodies from the blob store segment."""
+        with self._lock():
+            self.blobs.compact(policy.id for policy in self.load_index().values())
+
+    def _read(self, path: Path) -> List[Policy]:
+        if not path.exists():
+            return []
+        if path.suffix == ".bin":
+            with path.open("rb") as fh:
+                return load_binary(fh, trusted=self.trusted)
+        return decode_jsonl(path.read_bytes(), trusted=self.trusted)
+
+    def _other_format_path(self) -> Path | None:
+        """Path of a store in the other format when only that one exists."""
+        if self.data_path.exists():
+            return None
+        for filename in STORAGE_FORMATS.values():
+            path = self.root / filename
+            if path != self.data_path and path.exists():
+                return path
+        return None
+
+    def _has_inline_bodies(self) -> bool:
+        if self.storage_format != "jsonl" or not self.data_path.exists():
+            return False
+        with self.data_path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    return any(name in json.loads(line) for name in BODY_FIELDS)
+        return False
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        """Hold an exclusive inter-process lock on the store (no-op without fcntl)."""
+        with self.lock_path.open("a") as lock_fh:
+            if fcntl:
+                fcntl.flock(lock_fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_fh.fileno(), fcntl.LOCK_UN)
+
+    def _write(self, index: Dict[Tuple[str, str | None, str | None], Policy], release: bool = True) -> None:
+        for policy in index.values():
+            if any(name in policy.__dict__ for name in BODY_FIELDS):
+                policy.load_bodies()
+                self.blobs.put(policy.id, {name: policy.__dict__.get(name) for name in BODY_FIELDS})
+                if release:
+                    policy.release_bodies(self.blobs.get)
+        tmp_path = self.data_path.with_name(f"{self.data_path.name}.{os.getpid()}.tmp")
+        if self.storage_format == "binary":
+            with tmp_path.open("wb") as fh:
+                dump_binary(index.values(), fh)
+        else:
+            with tmp_path.open("w", encoding="utf-8") as fh:
+                for line in encode_jsonl(index.values()):
+                    fh.write(line)
+                    fh.write("\n")
+        os.replace(tmp_path, self.data_path)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Generic, Iterable, List, Optional, Tuple
+
+from .records_repository import RecordRepository, RecordT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    sort_key TEXT NOT NULL,
+    {filter_columns}
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_order_idx ON records (sort_key, id);
+"""
+
+
+@dataclass
+class Page(Generic[RecordT]):
+    items: List[RecordT]
+    next_cursor: Optional[str]
+
+
+class RecordIndex(Generic[RecordT]):
+    """SQLite read index over a :class:`RecordRepository` with keyset pagination.
+
+    Records are ordered by ``(sort_key, id)`` and every page continues from the
+    last key of the previous one (an opaque cursor), so following cursors to
+    page 5000 costs the same index seek per page as page 1. Locating page N
+    without a cursor (:meth:`next_cursor`) walks the index and is linear in
+    the number of records skipped. ``filters`` become indexed columns usable as
+    equality filters. The index follows the repository through its upsert
+    listener and is rebuilt, atomically for readers, when the JSONL file was
+    changed by another process; ``generation`` increases on every change so
+    callers can invalidate caches.
+    """
+
+    def __init__(
+        self,
+        repository: RecordRepository[RecordT],
+        path: str | Path | None = None,
+        sort_fields: Tuple[str, ...] = ("date",),
+        filters: Tuple[str, ...] = (),
+        descending: bool = True,
+    ) -> None:
+        self.repository = repository
+        self.path = Path(path or repository.root / "query.sqlite")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sort_fields = sort_fields
+        self.filters = filters
+        self.descending = descending
+        self._conn = sqlite3.connect(str(self.path), timeout=60.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA.format(filter_columns="".join(f"{name} TEXT,\n    " for name in filters)))
+        for name in filters:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS records_{name}_idx ON records ({name}, sort_key, id)")
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced = False
+        repository.add_listener(self.upsert)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def record_id(self, record: RecordT) -> str:
+        """The record's ``id``, or a stable hash of its repository key when it has none."""
+        value = getattr(record, "id", None)
+        if value:
+            return str(value)
+        return hashlib.sha1("\x1f".join(self.repository.make_key(record)).encode("utf-8")).hexdigest()[:16]
+
+    def generation(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def sync(self) -> bool:
+        """Rebuild from the repository file if it changed outside this index; returns True if rebuilt.
+
+        Concurrent callers wait for a rebuild in progress and then find the index current.
+        """
+        with self._sync_lock:
+            if self._meta("source") == self._source_signature():
+                self._synced = True
+                return False
+            self.rebuild()
+            return True
+
+    def rebuild(self) -> int:
+        """Replace every row from the repository file in one transaction; readers see the old or the new index."""
+        source = self._source_signature()
+        rows = [self._row(record) for record in self.repository.load_index().values()]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM records")
+            self._write_rows(rows)
+            self._set_meta("source", source)
+            self._synced = True
+        return len(rows)
+
+    def upsert(self, records: Iterable[RecordT]) -> int:
+        """Repository listener: add or replace ``records``."""
+        rows = [self._row(record) for record in records]
+        with self._lock, self._conn:
+            self._write_rows(rows)
+            if self._synced:
+                # Only an index known to match the file may adopt the new file version as its source.
+                self._set_meta("source", self._source_signature())
+        return len(rows)
+
+    def _write_rows(self, rows: List[tuple]) -> None:
+        columns = ", ".join(("id", "sort_key", *self.filters, "payload"))
+        placeholders = ", ".join("?" * (3 + len(self.filters)))
+        self._conn.executemany(f"INSERT OR REPLACE INTO records ({columns}) VALUES ({placeholders})", rows)
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def page(self, limit: int = 10, cursor: Optional[str] = None, **filters: Optional[str]) -> Page[RecordT]:
+        sql, params = self._select("sort_key, id, payload", cursor, filters)
+        sql.append("LIMIT ?")
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(" ".join(sql), params).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        items = [self.repository.model.model_validate_json(row[2]) for row in rows]
+        return Page(items=items, next_cursor=encode_cursor(rows[-1][0], rows[-1][1]) if more else None)
+
+    def next_cursor(self, limit: int, cursor: Optional[str] = None, **filters: Optional[str]) -> Optional[str]:
+        """Cursor after the page of ``limit`` records following ``cursor``, from the index alone.
+
+        Skips ``limit`` index entries with OFFSET, so its cost grows with ``limit``.
+        """
+        sql, params = self._select("sort_key, id", cursor, filters)
+        sql.append("LIMIT 1 OFFSET ?")
+        params.append(limit - 1)
+        with self._lock:
+            row = self._conn.execute(" ".join(sql), params).fetchone()
+        return encode_cursor(row[0], row[1]) if row else None
+
+    def get(self, record_id: str) -> Optional[RecordT]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM records WHERE id = ?", (record_id,)).fetchone()
+        return self.repository.model.model_validate_json(row[0]) if row else None
+
+    def _select(self, columns: str, cursor: Optional[str], filters: dict) -> Tuple[List[str], list]:
+        sql = [f"SELECT {columns} FROM records WHERE 1 = 1"]
+        params: list = []
+        for name, value in filters.items():
+            if name not in self.filters:
+                raise ValueError(f"Unknown filter: {name}")
+            if value is not None:
+                sql.append(f"AND {name} = ?")
+                params.append(value)
+        if cursor:
+            sql.append(f"AND (sort_key, id) {'<' if self.descending else '>'} (?, ?)")
+            params.extend(decode_cursor(cursor))
+        direction = "DESC" if self.descending else "ASC"
+        sql.append(f"ORDER BY sort_key {direction}, id {direction}")
+        return sql, params
+
+    def _row(self, record: RecordT) -> tuple:
+        sort_key = "\x1f".join(_sort_text(getattr(record, name)) for name in self.sort_fields)
+        filter_values = tuple(getattr(record, name) for name in self.filters)
+        return (self.record_id(record), sort_key, *filter_values, record.model_dump_json())
+
+    def _source_signature(self) -> str:
+        path = self.repository.data_path
+        if not path.exists():
+            return ""
+        stat = path.stat()
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def encode_cursor(sort_key: str, record_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_key, record_id], ensure_ascii=False).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        sort_key, record_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+    return str(sort_key), str(record_id)
+
+
+def _sort_text(value: object) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Callable, Dict, Generic, Iterable, List, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from .models import BankMetric, Investment, NewsArticle, Product
+
+RecordT = TypeVar("RecordT", bound=BaseModel)
+
+
+class RecordRepository(Generic[RecordT]):
+    """Persist non-policy records (products, investments, metrics...) to JSONL keyed by ``key_fields``.
+
+    Listeners registered with :meth:`add_listener` receive every batch of
+    upserted records after it is written.
+    """
+
+    def __init__(self, root: str | Path, model: Type[RecordT], key_fields: Tuple[str, ...], filename: str) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.model = model
+        self.key_fields = key_fields
+        self.data_path = self.root / filename
+        self._listeners: List[Callable[[List[RecordT]], None]] = []
+
+    def make_key(self, record: RecordT) -> Tuple:
+        return tuple(str(getattr(record, field) or "").strip() for field in self.key_fields)
+
+    def load_index(self) -> Dict[Tuple, RecordT]:
+        index: Dict[Tuple, RecordT] = {}
+        if not self.data_path.exists():
+            return index
+        with self.data_path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                record = self.model.model_validate_json(line)
+                index[self.make_key(record)] = record
+        return index
+
+    def upsert_many(self, records: Iterable[RecordT]) -> Dict[Tuple, RecordT]:
+        records = list(records)
+        index = self.load_index()
+        for record in records:
+            index[self.make_key(record)] = record
+        self._write(index)
+        for listener in self._listeners:
+            listener(records)
+        return index
+
+    def add_listener(self, listener: Callable[[List[RecordT]], None]) -> None:
+        self._listeners.append(listener)
+
+    def _write(self, index: Dict[Tuple, RecordT]) -> None:
+        tmp_path = self.data_path.with_name(f"{self.data_path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as fh:
+            for record in index.values():
+                fh.write(record.model_dump_json())
+                fh.write("\n")
+        os.replace(tmp_path, self.data_path)
+
+
+def product_repository(root: str | Path = "data/peer_products") -> RecordRepository[Product]:
+    return RecordRepository(root, Product, ("org", "product_name"), "products.jsonl")
+
+
+def investment_repository(root: str | Path = "data/investment_itjuzi") -> RecordRepository[Investment]:
+    return RecordRepository(root, Investment, ("id",), "investments.jsonl")
+
+
+def bank_metric_repository(root: str | Path = "data/bank_tech_finance") -> RecordRepository[BankMetric]:
+    return RecordRepository(root, BankMetric, ("bank", "metric", "year", "evidence_url"), "bank_metrics.jsonl")
+
+
+def news_repository(root: str | Path) -> RecordRepository[NewsArticle]:
+    return RecordRepository(root, NewsArticle, ("id",), "articles.jsonl")
+
+
+REPOSITORY_FACTORIES: Dict[str, Callable[..., RecordRepository]] = {
+    "product": product_repository,
+    "investment": investment_repository,
+    "bank_metric": bank_metric_repository,
+    "article": news_repository,
+}
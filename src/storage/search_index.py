@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from .models import Policy
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    rowid INTEGER PRIMARY KEY,
+    policy_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    publish_date TEXT,
+    site TEXT,
+    region_level TEXT,
+    source_url TEXT,
+    digest TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS meta_date_idx ON meta (publish_date);
+CREATE INDEX IF NOT EXISTS meta_site_idx ON meta (site, publish_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(title, body, keywords, tokenize = 'unicode61');
+"""
+
+CJK_RUN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9A-Za-z]+")
+# Column weights for bm25(): title, body, keywords.
+BM25_WEIGHTS = (5.0, 1.0, 3.0)
+
+
+def ngram_tokens(text: Optional[str]) -> List[str]:
+    """Split text into overlapping CJK character bigrams and lowercase latin/digit words."""
+    tokens: List[str] = []
+    for run in CJK_RUN.findall(text or ""):
+        if run.isascii():
+            tokens.append(run.lower())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn a free-text query into an FTS5 expression: each term is a bigram phrase, terms are ANDed."""
+    clauses = []
+    for term in query.split():
+        tokens = ngram_tokens(term)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1 and not tokens[0].isascii():
+            clauses.append(f"{tokens[0]}*")
+        else:
+            clauses.append('"' + " ".join(tokens) + '"')
+    return " AND ".join(clauses) or None
+
+
+@dataclass
+class SearchHit:
+    policy_id: str
+    title: str
+    publish_date: Optional[date]
+    site: Optional[str]
+    region_level: Optional[str]
+    source_url: Optional[str]
+    score: float
+
+
+class SearchIndex:
+    """Persistent inverted index over policy title, body and attachment text, and ``keywords``.
+
+    Text is indexed as character bigrams in an SQLite FTS5 table, so Chinese
+    phrases of any length match without a word segmenter; results are ranked
+    with bm25 and filtered through indexed metadata columns.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=60.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0]
+
+    def index_policies(self, policies: Iterable[Policy]) -> int:
+        """Add or refresh ``policies``; unchanged documents are skipped. Returns the number indexed."""
+        indexed = 0
+        with self._lock, self._conn:
+            for policy in policies:
+                text = "\n".join(part for part in (policy.content_text, policy.attachment_text) if part)
+                keywords = " ".join(policy.keywords or [])
+                meta = (
+                    policy.title,
+                    policy.publish_date.isoformat() if policy.publish_date else None,
+                    policy.site or "zxkc",
+                    policy.region_level,
+                    policy.source_url,
+                )
+                # Metadata is part of the digest so that filter columns follow re-dated or re-levelled policies.
+                digest = hashlib.sha1("\x1f".join([*(value or "" for value in meta), text, keywords]).encode("utf-8")).hexdigest()
+                row = self._conn.execute("SELECT rowid, digest FROM meta WHERE policy_id = ?", (policy.id,)).fetchone()
+                if row and row[1] == digest:
+                    continue
+                if row:
+                    rowid = row[0]
+                    self._conn.execute("DELETE FROM docs WHERE rowid = ?", (rowid,))
+                    self._conn.execute(
+                        "UPDATE meta SET title = ?, publish_date = ?, site = ?, region_level = ?, source_url = ?, digest = ? WHERE rowid = ?",
+                        (*meta, digest, rowid),
+                    )
+                else:
+                    rowid = self._conn.execute(
+                        "INSERT INTO meta (policy_id, title, publish_date, site, region_level, source_url, digest) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (policy.id, *meta, digest),
+                    ).lastrowid
+                self._conn.execute(
+                    "INSERT INTO docs (rowid, title, body, keywords) VALUES (?, ?, ?, ?)",
+                    (rowid, " ".join(ngram_tokens(policy.title)), " ".join(ngram_tokens(text)), " ".join(ngram_tokens(keywords))),
+                )
+                indexed += 1
+        return indexed
+
+    def rebuild(self, policies: Iterable[Policy]) -> int:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM meta")
+        return self.index_policies(policies)
+
+    def search(
+        self,
+        query: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        site: Optional[str] = None,
+        region_level: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[SearchHit]:
+        match = build_match_query(query)
+        if not match:
+            return []
+        sql = [
+            "SELECT m.policy_id, m.title, m.publish_date, m.site, m.region_level, m.source_url, bm25(docs, ?, ?, ?) AS score",
+            "FROM docs JOIN meta m ON m.rowid = docs.rowid WHERE docs MATCH ?",
+        ]
+        params: list = [*BM25_WEIGHTS, match]
+        if since:
+            sql.append("AND m.publish_date >= ?")
+            params.append(since.isoformat())
+        if until:
+            sql.append("AND m.publish_date <= ?")
+            params.append(until.isoformat())
+        if site:
+            sql.append("AND m.site = ?")
+            params.append(site)
+        if region_level:
+            sql.append("AND m.region_level = ?")
+            params.append(region_level)
+        sql.append("ORDER BY score LIMIT ?")
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(" ".join(sql), params).fetchall()
+        return [
+            SearchHit(
+                policy_id=row[0],
+                title=row[1],
+                publish_date=date.fromisoformat(row[2]) if row[2] else None,
+                site=row[3],
+                region_level=row[4],
+                source_url=row[5],
+                score=-row[6],
+            )
+            for row in rows
+        ]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Full-text search over stored policies.")
+    parser.add_argument("query", nargs="?", default="", help="检索词，多个词用空格分隔（AND）")
+    parser.add_argument("--root", default="data/policies_npc", help="政策库目录")
+    parser.add_argument("--since", type=_parse_date, help="发布日期下限 YYYY-MM-DD")
+    parser.add_argument("--until", type=_parse_date, help="发布日期上限 YYYY-MM-DD")
+    parser.add_argument("--site", help="站点，例如 zxkc")
+    parser.add_argument("--region-level", choices=["national", "provincial", "municipal"], help="政策层级")
+    parser.add_argument("--limit", type=int, default=20, help="返回条数")
+    parser.add_argument("--rebuild", action="store_true", help="从政策库重建索引")
+    return parser.parse_args()
+
+
+def _parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def main() -> None:
+    from rich import print
+
+    from .policies_repository import PolicyRepository
+
+    args = parse_args()
+    repo = PolicyRepository(args.root)
+    index = repo.search_index
+    if args.rebuild or (not len(index) and repo.data_path.exists()):
+        count = index.rebuild(repo.load_index().values())
+        print(f"[cyan]索引已重建：{count} 条[/]")
+    if not args.query:
+        return
+    hits = index.search(args.query, since=args.since, until=args.until, site=args.site, region_level=args.region_level, limit=args.limit)
+    for hit in hits:
+        published = hit.publish_date.isoformat() if hit.publish_date else "----------"
+        print(f"{hit.score:6.2f}  {published}  [{hit.site}/{hit.region_level}] {hit.title}\n        {hit.source_url}")
+    if not hits:
+        print("[yellow]没有匹配的政策。[/]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .models import Policy
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    policy_id TEXT PRIMARY KEY,
+    canonical_id TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    digest TEXT
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    hash INTEGER NOT NULL,
+    policy_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS buckets_idx ON buckets (band, hash);
+CREATE INDEX IF NOT EXISTS buckets_policy_idx ON buckets (policy_id);
+"""
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5
+PRIME = 4294967311  # smallest prime above 2**32
+NON_WORD = re.compile(r"[\W_]+")
+
+_rng = np.random.RandomState(20251022)
+_A = _rng.randint(1, 1 << 29, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 1 << 29, size=NUM_PERM).astype(np.uint64)
+
+
+def minhash(text: Optional[str], min_chars: int = 80) -> Optional[np.ndarray]:
+    """MinHash signature of the character ``SHINGLE``-grams of ``text``; None if it is too short."""
+    normalized = NON_WORD.sub("", text or "")
+    if len(normalized) < max(min_chars, SHINGLE):
+        return None
+    shingles = {normalized[i:i + SHINGLE] for i in range(len(normalized) - SHINGLE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (hashes[:, None] * _A[None, :] + _B[None, :]) % PRIME
+    return permuted.min(axis=0)
+
+
+def text_digest(text: Optional[str]) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+def band_hashes(signature: np.ndarray) -> list[int]:
+    return [zlib.crc32(signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class SimilarityIndex:
+    """MinHash/LSH index that finds near-duplicate policies across sites.
+
+    Each signature is split into ``BANDS`` bands; policies sharing any band hash
+    are candidates, and a candidate counts as a duplicate when the estimated
+    Jaccard similarity of the bodies reaches ``threshold``. Lookups touch only
+    the matching buckets, so they stay sub-linear in the number of policies.
+    """
+
+    def __init__(self, path: str | Path, threshold: float = 0.8, min_chars: int = 80) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self._conn = sqlite3.connect(str(self.path), timeout=60.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")}
+        if "digest" not in columns:
+            # Indexes created before body digests were kept: rows without one are re-signed on the next write.
+            self._conn.execute("ALTER TABLE signatures ADD COLUMN digest TEXT")
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def find_duplicate(self, policy: Policy) -> Optional[str]:
+        """Return the canonical id of a stored near-duplicate of ``policy``, if any."""
+        signature = minhash(policy.content_text, self.min_chars)
+        if signature is None:
+            return None
+        return self._best_match(policy.id, signature)
+
+    def add(self, policy: Policy, canonical_id: Optional[str] = None) -> None:
+        """Register ``policy``; it points at ``canonical_id`` (itself by default)."""
+        signature = minhash(policy.content_text, self.min_chars)
+        if signature is None:
+            return
+        with self._lock, self._conn:
+            self._insert(policy, signature, canonical_id)
+
+    def add_policies(self, policies: Iterable[Policy]) -> None:
+        """Repository listener: register new, re-linked or amended policies, in one transaction.
+
+        A stored policy is skipped only when both its canonical id and the
+        digest of its body text are unchanged; an amended body is re-signed, or
+        dropped from the index when it became too short to sign.
+        """
+        with self._lock, self._conn:
+            for policy in policies:
+                digest = text_digest(policy.content_text)
+                known = self._conn.execute("SELECT canonical_id, digest FROM signatures WHERE policy_id = ?", (policy.id,)).fetchone()
+                if known and known == (policy.duplicate_of or policy.id, digest):
+                    continue
+                signature = minhash(policy.content_text, self.min_chars)
+                if signature is not None:
+                    self._insert(policy, signature, digest=digest)
+                elif known:
+                    self._conn.execute("DELETE FROM buckets WHERE policy_id = ?", (policy.id,))
+                    self._conn.execute("DELETE FROM signatures WHERE policy_id = ?", (policy.id,))
+
+    def _insert(self, policy: Policy, signature: np.ndarray, canonical_id: Optional[str] = None, digest: Optional[str] = None) -> None:
+        self._conn.execute("DELETE FROM buckets WHERE policy_id = ?", (policy.id,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO signatures (policy_id, canonical_id, signature, digest) VALUES (?, ?, ?, ?)",
+            (policy.id, canonical_id or policy.duplicate_of or policy.id, signature.tobytes(), digest or text_digest(policy.content_text)),
+        )
+        self._conn.executemany(
+            "INSERT INTO buckets (band, hash, policy_id) VALUES (?, ?, ?)",
+            [(band, value, policy.id) for band, value in enumerate(band_hashes(signature))],
+        )
+
+    def flag(self, policy: Policy) -> Optional[str]:
+        """Set ``policy.duplicate_of`` when a near-duplicate exists.
+
+        The policy itself is registered by :meth:`add_policies` once the
+        repository has stored it, so a failed write leaves no orphan signature.
+        """
+        canonical = self.find_duplicate(policy)
+        if canonical:
+            policy.duplicate_of = canonical
+        return canonical
+
+    def _best_match(self, policy_id: str, signature: np.ndarray) -> Optional[str]:
+        with self._lock:
+            candidates = set()
+            for band, value in enumerate(band_hashes(signature)):
+                rows = self._conn.execute("SELECT policy_id FROM buckets WHERE band = ? AND hash = ?", (band, value)).fetchall()
+                candidates.update(row[0] for row in rows)
+            candidates.discard(policy_id)
+            best_score, best_id = 0.0, None
+            for candidate in candidates:
+                row = self._conn.execute("SELECT canonical_id, signature FROM signatures WHERE policy_id = ?", (candidate,)).fetchone()
+                if not row or row[0] == policy_id:
+                    continue
+                score = float(np.mean(np.frombuffer(row[1], dtype=np.uint64) == signature))
+                if score >= self.threshold and score > best_score:
+                    best_score, best_id = score, row[0]
+        return best_id
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import shutil
+import uuid
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, get_args, get_origin
+
+from pydantic import BaseModel
+
+from .models import BODY_FIELDS, Policy
+from .policies_repository import PolicyRepository
+from .records_repository import RecordRepository, bank_metric_repository, product_repository
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "_state.json"
+CHUNK_SIZE = 5000  # records per written file; bounds body memory during export
+ARROW_TYPES = {str: "string", int: "int64", float: "float64", date: "date32", bool: "bool_"}
+
+# key -> (partition directory, fingerprint, record)
+Entries = Dict[str, Tuple[str, str, Any]]
+# (dataset directory, schema, row builder)
+Output = Tuple[str, Any, Callable[[Any], Dict[str, Any]]]
+
+
+class SnapshotExporter:
+    """Export repositories to partitioned Parquet datasets for analytics.
+
+    Layout under ``out_dir``::
+
+        policies/site=<site>/publish_year=<year>/*.parquet   metadata only
+        policy_bodies/site=<site>/publish_year=<year>/*.parquet
+        products/*.parquet
+        bank_metrics/year=<year>/*.parquet
+
+    Every file is written with one fixed Arrow schema per dataset, so a column
+    that is null throughout one partition keeps its type and partitions always
+    read back together. ``_state.json`` records a content fingerprint and the
+    partition of every exported key: new records are appended as new files,
+    while a partition holding amended, moved or deleted records is rewritten
+    from the current repository contents. Unchanged partitions are untouched.
+    Read with e.g. ``pd.read_parquet(out / "policies", filters=[("site", "==", "zxkc")])``.
+    """
+
+    def __init__(
+        self,
+        out_dir: str | Path = "data/snapshots",
+        policies: PolicyRepository | None = None,
+        products: RecordRepository | None = None,
+        bank_metrics: RecordRepository | None = None,
+    ) -> None:
+        _require_parquet_engine()
+        self.out_dir = Path(out_dir)
+        self.policies = policies or PolicyRepository()
+        self.products = products or product_repository()
+        self.bank_metrics = bank_metrics or bank_metric_repository()
+        self.state_path = self.out_dir / STATE_FILE
+
+    def export(self, full: bool = False) -> Dict[str, int]:
+        """Export new and amended records; returns the number written per dataset."""
+        state = None if full else self._load_state()
+        if state is None and self.out_dir.exists():
+            shutil.rmtree(self.out_dir)
+        state = state or {}
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        counts = {
+            "policies": self._export_policies(state.setdefault("policies", {})),
+            "products": self._export_records(self.products, "products", state.setdefault("products", {}), partition_col=None),
+            "bank_metrics": self._export_records(self.bank_metrics, "bank_metrics", state.setdefault("bank_metrics", {}), partition_col="year"),
+        }
+        self._save_state(state)
+        return counts
+
+    def _export_policies(self, state: Dict[str, List[str]]) -> int:
+        entries: Entries = {}
+        for policy in self.policies.load_index().values():
+            row = policy_metadata_row(policy)
+            digest = json.dumps(row, ensure_ascii=False, sort_keys=True, default=str) + "\x1f" + (self.policies.blobs.digest(policy.id) or "")
+            partition = f"site={row['site']}/publish_year={row['publish_year']}"
+            entries[policy.id] = (partition, hashlib.sha1(digest.encode("utf-8")).hexdigest(), policy)
+        outputs: List[Output] = [
+            ("policies", policy_schema(), policy_metadata_row),
+            ("policy_bodies", policy_body_schema(), self._policy_body_row),
+        ]
+        return self._sync(entries, state, outputs)
+
+    def _policy_body_row(self, policy: Policy) -> Dict[str, Optional[str]]:
+        # Read from the blob store so the model never keeps its bodies: only
+        # the chunk being written holds them.
+        bodies = self.policies.blobs.get(policy.id)
+        return {"id": policy.id} | {name: bodies.get(name) for name in BODY_FIELDS}
+
+    def _export_records(self, repo: RecordRepository, name: str, state: Dict[str, List[str]], partition_col: Optional[str]) -> int:
+        entries: Entries = {}
+        for key, record in repo.load_index().items():
+            partition = f"{partition_col}={getattr(record, partition_col)}" if partition_col else ""
+            fingerprint = hashlib.sha1(record.model_dump_json().encode("utf-8")).hexdigest()
+            entries["\x1f".join(str(part) for part in key)] = (partition, fingerprint, record)
+        exclude = {partition_col} if partition_col else set()
+        return self._sync(entries, state, [(name, model_schema(repo.model, exclude), lambda record: record.model_dump())])
+
+    def _sync(self, entries: Entries, state: Dict[str, List[str]], outputs: List[Output]) -> int:
+        """Bring the datasets of ``outputs`` in line with ``entries``; returns the number of records written."""
+        changed = [key for key, (partition, fingerprint, _) in entries.items() if state.get(key) != [fingerprint, partition]]
+        rewrite = {state[key][1] for key in changed if key in state}
+        rewrite.update(entries[key][0] for key in changed if key in state)
+        for key in set(state) - set(entries):
+            rewrite.add(state.pop(key)[1])
+
+        groups: Dict[str, List[str]] = defaultdict(list)
+        for key in changed:
+            if entries[key][0] not in rewrite:
+                groups[entries[key][0]].append(key)
+        for key, (partition, _, _) in entries.items():
+            if partition in rewrite:
+                groups[partition].append(key)
+        for partition in rewrite:
+            for directory, _, _ in outputs:
+                _clear_partition(self.out_dir / directory, partition)
+
+        for partition, keys in groups.items():
+            for start in range(0, len(keys), CHUNK_SIZE):
+                chunk = [entries[key][2] for key in keys[start:start + CHUNK_SIZE]]
+                for directory, schema, build in outputs:
+                    _write_part(self.out_dir / directory / partition, [build(record) for record in chunk], schema)
+        for key in changed:
+            state[key] = [entries[key][1], entries[key][0]]
+        return len(changed)
+
+    def _load_state(self) -> Optional[Dict[str, Dict[str, List[str]]]]:
+        """Saved export state; None when missing or in the old id-only format (forces a full export)."""
+        if not self.state_path.exists():
+            return None
+        data = json.loads(self.state_path.read_text(encoding="utf-8"))
+        if any(not isinstance(keys, dict) for keys in data.values()):
+            logger.info("快照状态为旧格式（仅记录 id），将全量重新导出。")
+            return None
+        return data
+
+    def _save_state(self, state: Dict[str, Dict[str, List[str]]]) -> None:
+        tmp_path = self.state_path.with_name(f"{STATE_FILE}.tmp")
+        tmp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.state_path)
+
+
+def policy_metadata_row(policy: Policy) -> Dict[str, object]:
+    return {
+        "id": policy.id,
+        "title": policy.title,
+        "region_level": policy.region_level,
+        "publish_date": policy.publish_date,
+        "publish_year": _publish_year(policy),
+        "site": policy.site or "zxkc",
+        "source_url": policy.source_url,
+        "keywords": list(policy.keywords or []),
+        "attachment_urls": [att.url for att in policy.attachments],
+        "google_doc_url": policy.google_doc_url,
+    }
+
+
+def policy_schema():
+    """Columns of ``policies`` files; ``site``/``publish_year`` live in the partition path."""
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("title", pa.string()),
+            ("region_level", pa.string()),
+            ("publish_date", pa.date32()),
+            ("source_url", pa.string()),
+            ("keywords", pa.list_(pa.string())),
+            ("attachment_urls", pa.list_(pa.string())),
+            ("google_doc_url", pa.string()),
+        ]
+    )
+
+
+def policy_body_schema():
+    import pyarrow as pa
+
+    return pa.schema([("id", pa.string())] + [(name, pa.string()) for name in BODY_FIELDS])
+
+
+def model_schema(model: type[BaseModel], exclude: Set[str] = frozenset()):
+    """Arrow schema from the field annotations of a record model."""
+    import pyarrow as pa
+
+    def arrow_type(annotation: Any):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if get_origin(annotation) is list:
+            return pa.list_(arrow_type(args[0]))
+        if args:
+            return arrow_type(args[0])
+        return getattr(pa, ARROW_TYPES[annotation])()
+
+    return pa.schema([(name, arrow_type(field.annotation)) for name, field in model.model_fields.items() if name not in exclude])
+
+
+def _publish_year(policy: Policy) -> int:
+    """Partition value; 0 collects policies without a publish date."""
+    return policy.publish_date.year if policy.publish_date else 0
+
+
+def _write_part(path: Path, rows: List[Dict[str, Any]], schema) -> None:
+    """Write ``rows`` as a new file inside the partition directory ``path``."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pylist(rows, schema=schema), path / f"part-{uuid.uuid4().hex}.parquet")
+
+
+def _clear_partition(dataset: Path, partition: str) -> None:
+    if partition:
+        shutil.rmtree(dataset / partition, ignore_errors=True)
+    else:
+        for path in dataset.glob("part-*.parquet"):
+            path.unlink()
+
+
+def _require_parquet_engine() -> None:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError("Parquet snapshots require pyarrow: uv sync --extra parquet") from exc
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export repositories to partitioned Parquet snapshots.")
+    parser.add_argument("--out", default="data/snapshots", help="快照输出目录")
+    parser.add_argument("--policies-root", default="data/policies_npc", help="政策库目录")
+    parser.add_argument("--full", action="store_true", help="清空输出目录后全量导出")
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args = parse_args()
+    exporter = SnapshotExporter(args.out, policies=PolicyRepository(args.policies_root))
+    counts = exporter.export(full=args.full)
+    logger.info("快照完成：%s", ", ".join(f"{name}={count}" for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL,
+    worker TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, priority, id);
+"""
+
+
+@dataclass
+class Job:
+    id: int
+    key: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+class WorkQueue:
+    """SQLite-backed job queue with lease timeouts (at-least-once delivery).
+
+    Several worker processes, on one host or on hosts sharing the database file,
+    lease jobs with :meth:`lease`. A job whose lease expires before it is marked
+    done is handed out again, so job handlers must be idempotent.
+    """
+
+    def __init__(self, path: str | Path = "data/policies_npc/queue.sqlite", lease_seconds: float = 300.0, max_attempts: int = 5) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(str(self.path), timeout=60.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def enqueue(self, kind: str, key: str, payload: Dict[str, Any], priority: int = 0, reset_done: bool = False) -> bool:
+        """Add a job unless one with the same key exists; return True if it was (re)queued.
+
+        With ``reset_done`` a finished or failed job with the same key is put back
+        into the pending state, e.g. to re-scan list pages on the next crawl. A
+        job whose last allowed lease expired counts as failed.
+        """
+        now = time.time()
+        data = json.dumps(payload, ensure_ascii=False)
+        if reset_done:
+            self._fail_expired(now)
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (key, kind, payload, priority, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET payload=excluded.payload, priority=excluded.priority, "
+                "status='pending', attempts=0, lease_until=NULL, worker=NULL, error=NULL, updated_at=excluded.updated_at "
+                "WHERE jobs.status IN ('done', 'failed')",
+                (key, kind, data, priority, now),
+            )
+        else:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (key, kind, payload, priority, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, data, priority, now),
+            )
+        return cursor.rowcount > 0
+
+    def lease(self, worker: str) -> Optional[Job]:
+        """Claim the next pending (or lease-expired) job for ``worker``."""
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._fail_expired(now)
+            row = self._conn.execute(
+                "SELECT id, key, kind, payload, attempts FROM jobs "
+                "WHERE (status = 'pending' OR (status = 'leased' AND lease_until < ?)) AND attempts < ? "
+                "ORDER BY priority, id LIMIT 1",
+                (now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+            job_id, key, kind, payload, attempts = row
+            self._conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_until = ?, worker = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (now + self.lease_seconds, worker, now, job_id),
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return Job(id=job_id, key=key, kind=kind, payload=json.loads(payload), attempts=attempts + 1)
+
+    def complete(self, job: Job) -> None:
+        self._conn.execute(
+            "UPDATE jobs SET status = 'done', lease_until = NULL, error = NULL, updated_at = ? WHERE id = ?",
+            (time.time(), job.id),
+        )
+
+    def fail(self, job: Job, error: str) -> None:
+        """Release a job after an error; it is retried until ``max_attempts`` is reached."""
+        status = "failed" if job.attempts >= self.max_attempts else "pending"
+        self._conn.execute(
+            "UPDATE jobs SET status = ?, lease_until = NULL, error = ?, updated_at = ? WHERE id = ?",
+            (status, error[:2000], time.time(), job.id),
+        )
+
+    def _fail_expired(self, now: float) -> None:
+        """Mark jobs whose worker died during the last allowed attempt as failed."""
+        self._conn.execute(
+            "UPDATE jobs SET status = 'failed', lease_until = NULL, error = ?, updated_at = ? "
+            "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+            ("lease expired on the last attempt", now, now, self.max_attempts),
+        )
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def is_drained(self) -> bool:
+        """True when no job is pending or held under a lease."""
+        self._fail_expired(time.time())
+        row = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()
+        return row[0] == 0
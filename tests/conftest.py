@@ -0,0 +1,18 @@
+from datetime import date
+from typing import Any
+
+from storage.models import Policy
+
+
+def make_policy(n: int = 1, site: str = "zxkc", **fields: Any) -> Policy:
+    """Policy ``<site>-<n>`` with placeholder title, date and body; ``fields`` override any of them."""
+    values = {
+        "id": f"{site}-{n}",
+        "title": f"政策 {n}",
+        "publish_date": date(2024, 1, 1),
+        "region_level": "national",
+        "site": site,
+        "source_url": f"https://example.com/{site}/{n}",
+        "content_text": f"正文 {n}",
+    }
+    return Policy(**(values | fields))
@@ -0,0 +1,106 @@
+import random
+
+import pandas as pd
+
+from storage.aggregates import LIMIT_SCALE, LIMIT_UNITS, AggregateStore, parse_ranges
+from storage.models import BankMetric, Product
+from storage.records_repository import bank_metric_repository, product_repository
+
+
+def test_parse_ranges_normalizes_units_and_single_bounds():
+    values = pd.Series(["100万-1亿元", "最高1000万元", "50万元起", None, "面议"], index=list("abcde"))
+    bounds = parse_ranges(values, LIMIT_UNITS, LIMIT_SCALE, "万")
+
+    assert bounds.loc["a"].tolist() == [100.0, 10000.0]
+    assert pd.isna(bounds.loc["b", "low"]) and bounds.loc["b", "high"] == 1000.0
+    assert bounds.loc["c", "low"] == 50.0 and pd.isna(bounds.loc["c", "high"])
+    assert bounds.loc[["d", "e"]].isna().all().all()
+
+
+def test_aggregates_follow_ingest(tmp_path):
+    store = AggregateStore(tmp_path / "aggregates")
+    products = product_repository(tmp_path / "products")
+    metrics = bank_metric_repository(tmp_path / "metrics")
+    store.attach(products)
+    store.attach(metrics)
+
+    products.upsert_many(
+        [
+            Product(org="光谷银行", product_name="科创贷", category="信用贷", rate_range="3.2%-4.5%", limit_range="最高1000万元", term_range="1-3年"),
+            Product(org="光谷银行", product_name="人才贷", category="信用贷", rate_range="LPR+50BP", limit_range="最高500万元", term_range="最长36个月"),
+            Product(org="汉口银行", product_name="知识产权质押贷", category="质押贷", rate_range="年化3.8%起", limit_range="100万-1亿元", term_range="12个月"),
+        ]
+    )
+    data = store.read()
+    by_org = {row["org"]: row for row in data["products_by_org"]}
+    assert by_org["光谷银行"]["products"] == 2
+    assert by_org["光谷银行"]["rate_low"] == 3.2 and by_org["光谷银行"]["term_high"] == 36.0
+    assert by_org["汉口银行"]["limit_high"] == 10000.0
+
+    products.upsert_many([Product(org="汉口银行", product_name="知识产权质押贷", category="质押贷", limit_range="最高2亿元")])
+    by_category = {row["category"]: row for row in store.read()["products_by_category"]}
+    assert by_category["质押贷"]["products"] == 1 and by_category["质押贷"]["limit_high"] == 20000.0
+
+    metrics.upsert_many(
+        [
+            BankMetric(bank="招商银行", metric="科技企业贷款余额", year=2023, value=5000, unit="亿元", evidence_url="https://example.com/a"),
+            BankMetric(bank="招商银行", metric="科技企业贷款余额", year=2024, value=0.6, unit="万亿元", evidence_url="https://example.com/b"),
+            BankMetric(bank="招商银行", metric="科技企业客户数", year=2024, value=12, unit="万户", evidence_url="https://example.com/b"),
+        ]
+    )
+    growth = store.read()["bank_growth"]
+    assert growth == [
+        {"bank": "招商银行", "metric": "科技企业贷款余额", "unit": "亿元", "year": 2024, "previous": 5000.0, "value": 6000.0, "change": 1000.0, "yoy_pct": 20.0}
+    ]
+    assert AggregateStore(tmp_path / "aggregates").rebuild(products, metrics)["bank_growth"] == growth
+
+
+def test_incremental_partials_match_rebuild(tmp_path):
+    store = AggregateStore(tmp_path / "aggregates")
+    products = product_repository(tmp_path / "products")
+    store.attach(products)
+    rng = random.Random(7)
+    orgs, categories = ["光谷银行", "汉口银行", "湖北银行"], ["信用贷", "质押贷", None]
+    for _ in range(30):
+        products.upsert_many(
+            Product(
+                org=rng.choice(orgs),
+                product_name=f"产品{rng.randrange(12)}",
+                category=rng.choice(categories),
+                rate_range=rng.choice([f"{rng.randint(30, 45) / 10}%-{rng.randint(46, 60) / 10}%", "LPR+50BP", None]),
+                limit_range=rng.choice([f"最高{rng.randint(1, 20) * 100}万元", "100万-1亿元", None]),
+                term_range=rng.choice(["1-3年", "12个月", None]),
+            )
+            for _ in range(rng.randint(1, 4))
+        )
+    incremental = store.read()
+    rebuilt = AggregateStore(tmp_path / "rebuilt").rebuild(products, bank_metric_repository(tmp_path / "metrics"))
+
+    for view in ("products_by_org", "products_by_category"):
+        assert _rounded(incremental[view]) == _rounded(rebuilt[view])
+    assert sum(row["products"] for row in incremental["products_by_org"]) == len(products.load_index())
+
+
+def test_replaced_product_leaves_its_old_group(tmp_path):
+    store = AggregateStore(tmp_path / "aggregates")
+    products = product_repository(tmp_path / "products")
+    store.attach(products)
+    products.upsert_many(
+        [
+            Product(org="光谷银行", product_name="科创贷", category="信用贷", rate_range="3.2%-6%", limit_range="最高3000万元"),
+            Product(org="光谷银行", product_name="人才贷", category="信用贷", rate_range="3.5%-4%", limit_range="最高500万元"),
+        ]
+    )
+    products.upsert_many([Product(org="光谷银行", product_name="科创贷", category="质押贷", rate_range="3.6%-4.2%", limit_range="最高800万元")])
+
+    by_category = {row["category"]: row for row in store.read()["products_by_category"]}
+    assert by_category["信用贷"]["products"] == 1
+    assert by_category["信用贷"]["rate_high"] == 4.0 and by_category["信用贷"]["limit_high"] == 500.0
+    by_org = {row["org"]: row for row in store.read()["products_by_org"]}
+    assert by_org["光谷银行"]["rate_low"] == 3.5 and by_org["光谷银行"]["rate_high"] == 4.2
+    assert by_org["光谷银行"]["rate_high_avg"] == 4.1 and by_org["光谷银行"]["limit_high_avg"] == 650.0
+    assert not list((tmp_path / "aggregates").glob("*.pkl"))
+
+
+def _rounded(rows):
+    return [{name: round(value, 6) if isinstance(value, float) else value for name, value in row.items()} for row in rows]
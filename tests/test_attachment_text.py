@@ -0,0 +1,124 @@
+import os
+import zipfile
+
+import pytest
+
+from conftest import make_policy
+from services import attachment_text
+from services.attachment_text import AttachmentTextExtractor, extract_to_file, iter_docx_paragraphs
+from storage.models import Attachment
+from storage.policies_repository import PolicyRepository
+
+DOCX_BODY = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    "{paragraphs}</w:body></w:document>"
+)
+
+
+def write_docx(path, paragraphs):
+    xml = DOCX_BODY.format(paragraphs="".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs))
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", xml)
+    return path
+
+
+def write_pdf(path, text):
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    body += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(body)
+    return path
+
+
+
+
+def test_iter_docx_paragraphs_streams_text(tmp_path):
+    path = write_docx(tmp_path / "a.docx", ["第一条 支持科技贷款", "第二条 风险补偿"])
+    assert list(iter_docx_paragraphs(path)) == ["第一条 支持科技贷款", "第二条 风险补偿"]
+
+
+def test_extractor_attaches_text_and_reuses_shared_annex(tmp_path, monkeypatch):
+    annex = write_docx(tmp_path / "annex.docx", ["科技贷款贴息申报指南"])
+    copy = tmp_path / "annex-copy.docx"
+    copy.write_bytes(annex.read_bytes())
+    image = tmp_path / "scan.jpg"
+    image.write_bytes(b"JPEG")
+    repo = PolicyRepository(tmp_path / "store")
+    repo.upsert_many(
+        [
+            make_policy(1, attachments=[Attachment(name="附件1", url="https://example.com/a.docx", local_path=str(annex))]),
+            make_policy(2, attachments=[
+                Attachment(name="附件", url="https://example.com/b.docx", local_path=str(copy)),
+                Attachment(name="图片", url="https://example.com/scan.jpg", local_path=str(image)),
+            ]),
+        ]
+    )
+    extractor = AttachmentTextExtractor(tmp_path / "cache", workers=2, memory_limit_mb=None)
+
+    assert extractor.run(repo) == 2
+    assert len(list((tmp_path / "cache").glob("*.txt.gz"))) == 1
+
+    index = PolicyRepository(tmp_path / "store").load_index()
+    texts = {policy.id: policy.attachment_text for policy in index.values()}
+    assert texts["zxkc-1"] == "【附件1】\n科技贷款贴息申报指南"
+    assert texts["zxkc-2"] == "【附件】\n科技贷款贴息申报指南"
+    assert {hit.policy_id for hit in repo.search_index.search("贴息申报")} == {"zxkc-1", "zxkc-2"}
+    assert extractor.run(repo) == 0
+
+
+def test_pdf_pages_are_extracted(tmp_path):
+    pytest.importorskip("pypdf")
+    pdf = write_pdf(tmp_path / "notice.pdf", "Science and technology loans")
+    repo = PolicyRepository(tmp_path / "store")
+    repo.upsert_many([make_policy(1, attachments=[Attachment(name="notice", url="https://example.com/notice.pdf", local_path=str(pdf))])])
+
+    AttachmentTextExtractor(tmp_path / "cache", workers=1).run(repo)
+
+    policy = next(iter(PolicyRepository(tmp_path / "store").load_index().values()))
+    assert "Science and technology loans" in policy.attachment_text
+
+
+def crash_on_poison(source, target, max_chars):
+    """Stands in for a worker killed by the memory cap."""
+    if "poison" in source:
+        os._exit(1)
+    return extract_to_file(source, target, max_chars)
+
+
+def test_broken_pool_is_replaced_and_failures_are_retried(tmp_path, monkeypatch):
+    poison = write_docx(tmp_path / "poison.docx", ["超大附件"])
+    files = [write_docx(tmp_path / f"annex-{n}.docx", [f"第{n}号附件正文"]) for n in range(6)]
+    repo = PolicyRepository(tmp_path / "store")
+    repo.upsert_many(
+        [make_policy(0, attachments=[Attachment(name="附件", url="https://example.com/poison.docx", local_path=str(poison))])]
+        + [make_policy(n + 1, attachments=[Attachment(name="附件", url=f"https://example.com/{n}.docx", local_path=str(path))]) for n, path in enumerate(files)]
+    )
+    monkeypatch.setattr(attachment_text, "extract_to_file", crash_on_poison)
+    extractor = AttachmentTextExtractor(tmp_path / "cache", workers=1, memory_limit_mb=None)
+
+    assert extractor.run(repo) == 7
+    index = PolicyRepository(tmp_path / "store").load_index()
+    failed = {policy.id for policy in index.values() if not policy.attachments[0].sha256}
+    assert "zxkc-0" in failed
+    # Files submitted after the pool broke were extracted by its replacement.
+    assert index[("政策 6", "2024-01-01", "zxkc")].attachment_text == "【附件】\n第5号附件正文"
+
+    monkeypatch.setattr(attachment_text, "extract_to_file", extract_to_file)
+    assert extractor.run(repo) == len(failed)
+    index = PolicyRepository(tmp_path / "store").load_index()
+    assert all(policy.attachments[0].sha256 and policy.attachment_text for policy in index.values())
@@ -0,0 +1,92 @@
+from datetime import date
+
+from extractors.bank_metrics import MAX_SNIPPET, MIN_SNIPPET, bank_metrics, segment, synthetic_articles
+from storage.models import NewsArticle
+
+ARTICLE = NewsArticle(
+    id="news-1",
+    title="招行科技金融答卷：2024年科技贷款突破万亿",
+    publish_date=date(2025, 3, 28),
+    site="bank_news",
+    source_url="https://www.thepaper.cn/newsDetail_forward_31569275",
+    content_text="\n".join(
+        [
+            "3月27日，招商银行发布2024年度业绩报告。",
+            "截至2024年末，该行科技企业贷款余额1.2万亿元，较上年末增长12.5%，高于各项贷款平均增速。",
+            "科技企业客户达到125,600户，同比增长15%。",
+            "2023年，中国工商银行科技贷款余额突破2.2万亿元，专精特新企业贷款增速18.6%。",
+            "分析人士认为，银行业正在加大对新质生产力的金融支持力度，但仍需警惕信用风险的累积。",
+        ]
+    ),
+)
+
+
+def test_segment_builds_evidence_sized_snippets():
+    text = "短段落。\n" + "这是一句很长的说明文字，" * 30 + "。\n" + "另一段正文内容，介绍科技金融的发展情况和主要做法。" * 2
+    segments = segment(text)
+
+    assert "".join(segments).replace(" ", "") == text.replace("\n", "")
+    assert all(len(part) <= MAX_SNIPPET for part in segments)
+    assert all(len(part) >= MIN_SNIPPET for part in segments)
+
+
+def test_bank_metrics_normalizes_units_and_inherits_context():
+    metrics = {(m.bank, m.metric, m.year): m for m in bank_metrics([ARTICLE])}
+
+    loans = metrics[("招商银行", "科技贷款余额", 2024)]
+    assert (loans.value, loans.unit) == (12000.0, "亿元")
+    assert metrics[("招商银行", "科技贷款余额同比增速", 2024)].value == 12.5
+    # The client sentence names neither bank nor year; both come from earlier in the article.
+    clients = metrics[("招商银行", "科技企业客户数", 2024)]
+    assert (clients.value, clients.unit) == (12.56, "万户")
+    assert metrics[("招商银行", "科技企业客户数同比增速", 2024)].value == 15.0
+    assert metrics[("工商银行", "科技贷款余额", 2023)].value == 22000.0
+    assert (metrics[("工商银行", "专精特新贷款余额同比增速", 2023)].value, metrics[("工商银行", "专精特新贷款余额同比增速", 2023)].unit) == (18.6, "%")
+    for metric in metrics.values():
+        assert metric.evidence_url == ARTICLE.source_url
+        assert metric.snippet in ARTICLE.content_text.replace("\n", "")
+        assert len(metric.snippet) <= MAX_SNIPPET
+
+
+def test_bank_metrics_skips_articles_without_metrics():
+    article = NewsArticle(id="news-2", title="银行业动态", source_url="https://example.com/2", content_text="今日市场平稳运行，无重大事项。")
+    assert bank_metrics([article]) == []
+    assert bank_metrics([]) == []
+
+
+def test_bank_metrics_over_synthetic_corpus():
+    metrics = bank_metrics(synthetic_articles(600))
+
+    assert len(metrics) == 600 * 4
+    assert {metric.year for metric in metrics} == {2023, 2024}
+    assert {metric.unit for metric in metrics} == {"亿元", "万户", "%"}
+
+
+def test_segment_keeps_trailing_snippets_above_minimum():
+    text = "开头的说明文字。" + "这是一句很长的说明文字，" * 16 + "。\n结尾短句。"
+    segments = segment(text)
+
+    assert "".join(segments) == text.replace("\n", "")
+    assert len(segments) > 1
+    assert all(MIN_SNIPPET <= len(part) <= MAX_SNIPPET for part in segments)
+
+
+def test_bank_pattern_ignores_industry_wide_terms():
+    lines = [
+        "截至2024年末，中国银行业金融机构科技贷款余额达到30万亿元。",
+        "据中国银行保险监督管理委员会披露，2024年末某地科技贷款余额300亿元。",
+        "2024年，中国银行间市场交易商协会支持科创企业，科技贷款余额500亿元。",
+        "2024年湖北银行业科技贷款余额突破1万亿元。",
+        "中国银行业绩快报显示，2024年科技贷款余额达到8000亿元。",
+    ]
+    article = NewsArticle(
+        id="news-2",
+        title="中国银行业协会发布科技金融报告",
+        publish_date=date(2025, 4, 2),
+        site="bank_news",
+        source_url="https://www.thepaper.cn/newsDetail_forward_2",
+        content_text="\n".join(lines),
+    )
+    metrics = bank_metrics([article])
+
+    assert [(m.bank, m.value) for m in metrics] == [("中国银行", 8000.0)]
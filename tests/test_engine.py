@@ -0,0 +1,148 @@
+import glob
+from datetime import date
+from pathlib import Path
+
+import httpx
+
+from scrapers.engine import SiteEngine, SiteSpec, load_site_spec
+from storage.models import Policy
+
+SPEC = {
+    "site": "demo",
+    "model": "policy",
+    "base_url": "https://demo.test",
+    "list": {
+        "url": "/list?page={page}",
+        "item": "ul.items li",
+        "fields": {
+            "title": "a",
+            "url": {"selector": "a", "attr": "href"},
+            "publish_date": "span.date",
+        },
+    },
+    "detail": {
+        "fields": {
+            "content_html": {"selector": "div.body", "attr": "html"},
+            "content_text": "div.body",
+        },
+    },
+    "date_field": "publish_date",
+    "id_pattern": "id=(\\d+)",
+    "rate_limit": {"per_second": 0},
+    "batch_size": 2,
+}
+
+PAGES = {
+    1: [("3", "2025-03-01"), ("2", "2025-02-01")],
+    2: [("1", "2025年1月1日")],
+}
+
+
+def make_transport(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        if request.url.path == "/list":
+            page = int(request.url.params["page"])
+            rows = "".join(
+                f'<li><a href="/detail?id={article_id}">政策 {article_id}</a><span class="date">{day}</span></li>'
+                for article_id, day in PAGES.get(page, [])
+            )
+            return httpx.Response(200, text=f'<ul class="items">{rows}</ul>')
+        article_id = request.url.params["id"]
+        return httpx.Response(200, text=f'<div class="body"><p>正文 {article_id}</p></div>')
+
+    return httpx.MockTransport(handler)
+
+
+def make_engine(tmp_path, calls, batches):
+    spec = SiteSpec.from_dict(SPEC)
+    client = httpx.Client(base_url=spec.base_url, transport=make_transport(calls))
+    return SiteEngine(spec, data_root=tmp_path, client=client, sink=batches.append)
+
+
+def test_engine_crawls_pages_and_flushes_in_batches(tmp_path):
+    calls, batches = [], []
+    with make_engine(tmp_path, calls, batches) as engine:
+        saved = engine.run()
+
+    assert saved == 3
+    assert [len(batch) for batch in batches] == [2, 1]
+    first = batches[0][0]
+    assert isinstance(first, Policy)
+    assert first.id == "demo-3"
+    assert first.source_url == "https://demo.test/detail?id=3"
+    assert first.content_text == "正文 3"
+    assert batches[1][0].publish_date == date(2025, 1, 1)
+    assert engine.watermark.load() == date(2025, 3, 1)
+
+
+def test_engine_watermark_and_cache_skip_work_on_rerun(tmp_path):
+    calls, batches = [], []
+    with make_engine(tmp_path, calls, batches) as engine:
+        engine.run()
+    calls.clear()
+    batches.clear()
+    with make_engine(tmp_path, calls, batches) as engine:
+        saved = engine.run()
+
+    assert saved == 1  # only the record dated on the watermark is re-upserted
+    assert calls == ["https://demo.test/list?page=1"]
+
+
+def test_limited_run_keeps_watermark_so_older_items_are_crawled_later(tmp_path):
+    calls, batches = [], []
+    with make_engine(tmp_path, calls, batches) as engine:
+        assert engine.run(limit=1) == 1
+        assert engine.watermark.load() is None
+        batches.clear()
+        assert engine.run() == 3
+
+    assert [record.id for batch in batches for record in batch] == ["demo-3", "demo-2", "demo-1"]
+    assert engine.watermark.load() == date(2025, 3, 1)
+
+
+def test_explicit_since_overrides_watermark(tmp_path):
+    calls, batches = [], []
+    with make_engine(tmp_path, calls, batches) as engine:
+        engine.run()
+        batches.clear()
+        saved = engine.run(since=date(2025, 1, 1))
+
+    assert saved == 3
+    assert engine.watermark.load() == date(2025, 3, 1)
+
+
+def test_since_after_watermark_keeps_watermark(tmp_path):
+    calls, batches = [], []
+    with make_engine(tmp_path, calls, batches) as engine:
+        engine.watermark.save(date(2024, 12, 1))
+        assert engine.run(since=date(2025, 2, 15)) == 1
+        assert engine.watermark.load() == date(2024, 12, 1)
+        batches.clear()
+        engine.run()
+
+    assert [record.id for batch in batches for record in batch] == ["demo-3", "demo-2", "demo-1"]
+    assert engine.watermark.load() == date(2025, 3, 1)
+
+
+def test_engine_creates_storage_lazily(tmp_path):
+    spec = SiteSpec.from_dict(SPEC)
+    client = httpx.Client(base_url=spec.base_url, transport=make_transport([]))
+    with SiteEngine(spec, data_root=tmp_path, client=client) as engine:
+        engine.fetch("/list?page=1")
+        assert list(tmp_path.iterdir()) == []
+
+
+def test_site_specs_loadable():
+    for path in glob.glob("openspec/sites/*.yml"):
+        spec = load_site_spec(Path(path).stem, sites_dir=Path(path).parent)
+        assert spec.site == Path(path).stem
+        assert spec.seeds or (spec.list_url and spec.item_selector)
+
+
+def test_stub_sites_are_backed_by_specs():
+    import importlib
+
+    for site in ["bank_news", "itjuzi", "ggjrdn_products", "ggjrdn_policies", "wechat_finreg"]:
+        module = importlib.import_module(f"scrapers.{site}")
+        assert module.SPEC.site == site
@@ -0,0 +1,129 @@
+import re
+
+from conftest import make_policy
+from services.google_sheets import HEADER, GoogleSheetsIndexer
+from storage.models import Attachment, Policy
+
+
+class FakeRequest:
+    def __init__(self, func):
+        self._func = func
+
+    def execute(self):
+        return self._func()
+
+
+class FakeValues:
+    """In-memory stand-in for ``spreadsheets().values()`` that records API calls."""
+
+    def __init__(self):
+        self.grid = []
+        self.calls = []
+
+    def batchGet(self, spreadsheetId, ranges):
+        self.calls.append("batchGet")
+        return FakeRequest(
+            lambda: {
+                "valueRanges": [
+                    {"values": self.grid[:1]},
+                    {"values": [[row[3] if len(row) > 3 else ""] for row in self.grid]},
+                ]
+            }
+        )
+
+    def append(self, spreadsheetId, range, valueInputOption, insertDataOption, body):
+        self.calls.append("append")
+
+        def run():
+            start = len(self.grid) + 1
+            self.grid.extend(list(row) for row in body["values"])
+            return {"updates": {"updatedRange": f"{range.split('!')[0]}!A{start}:F{len(self.grid)}"}}
+
+        return FakeRequest(run)
+
+    def batchUpdate(self, spreadsheetId, body):
+        self.calls.append("batchUpdate")
+
+        def run():
+            for item in body["data"]:
+                number = int(re.search(r"!A(\d+):", item["range"]).group(1))
+                self.grid[number - 1] = list(item["values"][0])
+            return {}
+
+        return FakeRequest(run)
+
+
+class FakeSheetsService:
+    def __init__(self):
+        self.values_api = FakeValues()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self.values_api
+
+
+def indexed_policy(n: int, doc_url=None) -> Policy:
+    """Policy with one Drive-hosted attachment, as rows in the sheet have."""
+    attachments = [Attachment(name="附件1.pdf", url=f"http://x/{n}.pdf", drive_view_url=f"https://drive/{n}")]
+    return make_policy(n, google_doc_url=doc_url, attachments=attachments)
+
+
+def test_backfill_is_batched_and_updates_rows_in_place():
+    service = FakeSheetsService()
+    indexer = GoogleSheetsIndexer("sheet-id", service=service, batch_size=300, min_interval=0)
+
+    assert indexer.sync(indexed_policy(n) for n in range(1000)) == 1000
+    grid = service.values_api.grid
+    assert grid[0] == HEADER
+    assert len(grid) == 1001
+    # Each later append re-reads the key column in case another worker appended meanwhile.
+    assert service.values_api.calls == ["batchGet"] + ["append", "batchGet"] * 3 + ["append"]
+    assert grid[1][5] == "附件1.pdf: https://drive/0"
+
+    with indexer:
+        indexer.add_policies([indexed_policy(5, doc_url="https://docs/5"), indexed_policy(1000)])
+    assert service.values_api.calls[-3:] == ["batchGet", "batchUpdate", "append"]
+    assert grid[6][4] == "https://docs/5"
+    assert grid[-1][3].endswith("/1000")
+    assert len(grid) == 1002
+
+
+def test_existing_rows_are_found_by_source_url():
+    service = FakeSheetsService()
+    GoogleSheetsIndexer("sheet-id", service=service, min_interval=0).sync([indexed_policy(1), indexed_policy(2)])
+
+    indexer = GoogleSheetsIndexer("sheet-id", service=service, min_interval=0)
+    indexer.sync([indexed_policy(2, doc_url="https://docs/2")])
+
+    assert len(service.values_api.grid) == 3
+    assert service.values_api.grid[2][4] == "https://docs/2"
+
+
+def test_concurrent_workers_do_not_duplicate_rows_or_header():
+    service = FakeSheetsService()
+    first = GoogleSheetsIndexer("sheet-id", service=service, min_interval=0)
+    second = GoogleSheetsIndexer("sheet-id", service=service, min_interval=0)
+    first.sync([indexed_policy(0)])
+    second.sync([indexed_policy(1)])
+
+    # ``first`` still has its old view of the sheet; policy 1 was appended by ``second``.
+    first.sync([indexed_policy(1, doc_url="https://docs/1"), indexed_policy(2)])
+
+    grid = service.values_api.grid
+    assert [row[3][-1] for row in grid[1:]] == ["0", "1", "2"]
+    assert grid.count(HEADER) == 1
+    assert grid[2][4] == "https://docs/1"
+
+
+def test_header_is_detected_from_row_one():
+    service = FakeSheetsService()
+    service.values_api.grid = [list(HEADER), GoogleSheetsIndexer.row(indexed_policy(1))]
+
+    indexer = GoogleSheetsIndexer("sheet-id", service=service, min_interval=0)
+    indexer.sync([indexed_policy(1, doc_url="https://docs/1"), indexed_policy(2)])
+
+    grid = service.values_api.grid
+    assert grid.count(HEADER) == 1 and len(grid) == 3
+    assert grid[1][4] == "https://docs/1"
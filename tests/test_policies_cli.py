@@ -19,6 +19,9 @@ class DummyRepo:
         self.saved.extend(policies)
         return {}
 
+    def flag_duplicate(self, policy):
+        return None
+
     def upsert_one(self, index, policy):
         key = (policy.title.strip(), policy.publish_date.isoformat() if policy.publish_date else None, policy.site or "zxkc")
         self.index = dict(index)
@@ -76,7 +79,7 @@ def sample_policy():
 def test_run_dry_run_skips_side_effects(monkeypatch, tmp_path, sample_policy):
     repo = DummyRepo()
     client = DummyClient([sample_policy])
-    monkeypatch.setattr(policies_npc, "PolicyRepository", lambda: repo)
+    monkeypatch.setattr(policies_npc, "PolicyRepository", lambda **kwargs: repo)
     monkeypatch.setattr(policies_npc, "ZxkcPoliciesClient", lambda: client)
 
     policies_npc.run(dry_run=True, skip_google_docs=True, download_dir=tmp_path)
@@ -89,7 +92,7 @@ def test_run_persists_and_exports(monkeypatch, tmp_path, sample_policy):
     repo = DummyRepo()
     client = DummyClient([sample_policy])
     exporter = DummyExporter()
-    monkeypatch.setattr(policies_npc, "PolicyRepository", lambda: repo)
+    monkeypatch.setattr(policies_npc, "PolicyRepository", lambda **kwargs: repo)
     monkeypatch.setattr(policies_npc, "ZxkcPoliciesClient", lambda: client)
 
     policies_npc.run(dry_run=False, skip_google_docs=False, download_dir=tmp_path, exporter=exporter)
@@ -97,3 +100,32 @@ def test_run_persists_and_exports(monkeypatch, tmp_path, sample_policy):
     assert repo.saved, "Policy should be persisted"
     assert exporter.calls, "Exporter should be invoked"
     assert Path(repo.saved[0].attachments[0].local_path).exists()
+
+
+def test_run_skips_attachments_and_export_for_near_duplicates(monkeypatch, tmp_path, sample_policy):
+    class DuplicateRepo(DummyRepo):
+        def flag_duplicate(self, policy):
+            policy.duplicate_of = "ggjrdn_policies-1"
+            return policy.duplicate_of
+
+    repo = DuplicateRepo()
+    client = DummyClient([sample_policy])
+    exporter = DummyExporter()
+    monkeypatch.setattr(policies_npc, "PolicyRepository", lambda **kwargs: repo)
+    monkeypatch.setattr(policies_npc, "ZxkcPoliciesClient", lambda: client)
+
+    policies_npc.run(dry_run=False, skip_google_docs=False, download_dir=tmp_path, exporter=exporter)
+
+    assert repo.saved[0].duplicate_of == "ggjrdn_policies-1"
+    assert not client.downloaded
+    assert not exporter.calls
+
+
+def test_main_passes_keep_duplicates_to_workers(monkeypatch):
+    calls = []
+    monkeypatch.setattr(policies_npc, "work", lambda queue_path, **kwargs: calls.append(kwargs))
+    monkeypatch.setattr("sys.argv", ["policies_npc", "--worker", "--queue", "jobs.sqlite", "--keep-duplicates", "--skip-google-docs"])
+
+    policies_npc.main()
+
+    assert calls[0]["skip_duplicates"] is False
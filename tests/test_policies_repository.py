@@ -0,0 +1,88 @@
+import json
+import random
+
+from conftest import make_policy
+from storage.models import Policy
+from storage.policies_repository import PolicyRepository
+
+PHRASES = [
+    "为贯彻落实党中央、国务院决策部署，",
+    "进一步加大科技型中小企业信贷支持力度，",
+    "各银行业金融机构要完善科技贷款风险分担机制，",
+    "推动知识产权质押融资扩面增量，",
+    "本通知自印发之日起施行。",
+]
+
+
+def article_policy(n: int) -> Policy:
+    """Policy with a dozen paragraphs of boilerplate, like real notices."""
+    rng = random.Random(n)
+    paragraphs = ["".join(rng.choice(PHRASES) for _ in range(6)) + f"（第{n}号）" for _ in range(12)]
+    html = '<div class="article_con">' + "".join(f'<p style="text-indent:2em;">{p}</p>' for p in paragraphs) + "</div>"
+    return make_policy(n, content_html=html, content_text="\n".join(paragraphs))
+
+
+def test_bodies_are_stored_outside_index_and_loaded_lazily(tmp_path):
+    repo = PolicyRepository(tmp_path)
+    original = article_policy(1)
+    repo.upsert_many([original.model_copy()])
+
+    line = json.loads(repo.data_path.read_text(encoding="utf-8").splitlines()[0])
+    assert "content_html" not in line and "content_text" not in line
+
+    loaded = next(iter(PolicyRepository(tmp_path).load_index().values()))
+    assert not loaded.bodies_loaded()
+    assert loaded.content_text == original.content_text
+    assert loaded.model_dump()["content_html"] == original.content_html
+
+
+def test_updated_body_replaces_stored_body(tmp_path):
+    repo = PolicyRepository(tmp_path)
+    repo.upsert_many([article_policy(1)])
+    index = repo.load_index()
+    policy = next(iter(index.values()))
+    policy.content_text = "更正后的正文"
+    repo.upsert_one(index, policy)
+    repo.compact_bodies()
+
+    reloaded = next(iter(PolicyRepository(tmp_path).load_index().values()))
+    assert reloaded.content_text == "更正后的正文"
+    assert reloaded.content_html == article_policy(1).content_html
+
+
+def test_legacy_inline_store_is_migrated_on_open(tmp_path):
+    policies = [article_policy(n) for n in range(200)]
+    legacy_path = tmp_path / "policies.jsonl"
+    with legacy_path.open("w", encoding="utf-8") as fh:
+        for policy in policies:
+            fh.write(policy.model_dump_json() + "\n")
+    legacy_size = legacy_path.stat().st_size
+
+    repo = PolicyRepository(tmp_path)
+    index = repo.load_index()
+
+    assert len(index) == 200
+    assert legacy_path.stat().st_size * 10 < legacy_size
+    assert (tmp_path / "bodies" / "bodies.seg").stat().st_size < legacy_size
+    assert index[("政策 7", "2024-01-01", "zxkc")].content_text == policies[7].content_text
+
+
+def test_upsert_one_keeps_records_written_by_other_processes(tmp_path):
+    repo = PolicyRepository(tmp_path)
+    index = repo.load_index()
+    PolicyRepository(tmp_path).append_many([article_policy(1)])
+
+    repo.upsert_one(index, article_policy(2))
+
+    assert {policy.id for policy in PolicyRepository(tmp_path).load_index().values()} == {"zxkc-1", "zxkc-2"}
+
+
+def test_appended_bodies_are_read_back_without_being_cached(tmp_path):
+    repo = PolicyRepository(tmp_path)
+    policy = article_policy(3)
+    text = policy.content_text
+    repo.append_many([policy])
+
+    assert "zxkc-3" not in repo.blobs._index
+    assert policy.content_text == text
+    assert repo.blobs.digest("zxkc-3") is not None
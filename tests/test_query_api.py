@@ -0,0 +1,131 @@
+import json
+import threading
+import urllib.request
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer
+
+from services.query_api import QueryService, make_handler
+from storage.models import Investment, Product
+from storage.record_index import RecordIndex
+from storage.records_repository import investment_repository, product_repository
+
+
+def make_investment(n: int) -> Investment:
+    return Investment(
+        id=f"inv-{n}",
+        date=date(2024, 1, 1) + timedelta(days=n // 3),
+        startup=f"初创公司{n}",
+        industry="人工智能" if n % 2 else "企业服务",
+        source_url=f"https://www.itjuzi.com/investevent/{n}",
+    )
+
+
+def make_service(tmp_path):
+    investments = RecordIndex(investment_repository(tmp_path / "investments"), filters=("industry", "region"))
+    products = RecordIndex(product_repository(tmp_path / "products"), sort_fields=("org", "product_name"), filters=("org", "category"), descending=False)
+    return QueryService(investments=investments, products=products)
+
+
+def test_keyset_pages_cover_all_records_newest_first(tmp_path):
+    service = make_service(tmp_path)
+    service.views["investments"].repository.upsert_many(make_investment(n) for n in range(95))
+
+    seen, cursor = [], None
+    while True:
+        result = service.list("investments", cursor=cursor, limit=10)
+        seen.extend(item["id"] for item in result["items"])
+        cursor = result["next"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 95
+    dates = [service.detail("investments", record_id)["date"] for record_id in seen]
+    assert dates == sorted(dates, reverse=True)
+
+    assert [item["id"] for item in service.list("investments", page=3)["items"]] == seen[20:30]
+    assert service.list("investments", page=11)["items"] == []
+    filtered = service.list("investments", limit=100, industry="人工智能")["items"]
+    assert len(filtered) == 47 and all(item["industry"] == "人工智能" for item in filtered)
+
+
+def test_homepage_cache_is_invalidated_on_ingest(tmp_path):
+    service = make_service(tmp_path)
+    repo = service.views["investments"].repository
+    repo.upsert_many(make_investment(n) for n in range(30))
+    first = service.homepage()
+    assert len(first) == 10 and service.homepage() is first
+
+    repo.upsert_many([make_investment(1000)])
+    assert service.homepage()[0]["id"] == "inv-1000"
+
+
+def test_index_rebuilds_after_external_write(tmp_path):
+    service = make_service(tmp_path)
+    other_process_repo = product_repository(tmp_path / "products")
+    other_process_repo.upsert_many([Product(org="光谷银行", product_name=f"科创贷{n}", category="信用贷") for n in range(3)])
+
+    service.sync()
+    items = service.list("products")["items"]
+    assert [item["product_name"] for item in items] == ["科创贷0", "科创贷1", "科创贷2"]
+    assert service.detail("products", items[1]["id"])["product_name"] == "科创贷1"
+
+
+def test_concurrent_syncs_rebuild_once_and_atomically(tmp_path, monkeypatch):
+    service = make_service(tmp_path)
+    index = service.views["products"]
+    index.repository.upsert_many([Product(org="光谷银行", product_name=f"科创贷{n}", category="信用贷") for n in range(50)])
+    product_repository(tmp_path / "products").upsert_many([Product(org="光谷银行", product_name="科创贷50", category="信用贷")])
+
+    rebuilds, counts = [], []
+    original = index.rebuild
+
+    def observed_rebuild():
+        rebuilds.append(threading.get_ident())
+        return original()
+
+    original_write = index._write_rows
+
+    def observed_write(rows):
+        # Delete and re-insert happen in the one transaction of the rebuild.
+        counts.append(len(rows))
+        original_write(rows)
+
+    monkeypatch.setattr(index, "rebuild", observed_rebuild)
+    monkeypatch.setattr(index, "_write_rows", observed_write)
+    threads = [threading.Thread(target=index.sync) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(rebuilds) == 1
+    assert counts == [51]
+    assert len(index) == 51 and not index.sync()
+
+
+def test_http_routes(tmp_path):
+    service = make_service(tmp_path)
+    service.views["investments"].repository.upsert_many(make_investment(n) for n in range(25))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(path):
+        try:
+            with urllib.request.urlopen(base + path) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as exc:
+            return exc.code, json.loads(exc.read())
+
+    try:
+        status, home = get("/")
+        assert status == 200 and len(home["investments"]) == 10
+        status, page2 = get("/investments?page=2")
+        assert status == 200 and page2["items"][0]["id"] != home["investments"][0]["id"]
+        status, page3 = get(page2["next"])
+        assert status == 200 and len(page3["items"]) == 5 and page3["next"] is None
+        assert get("/investments/inv-7")[1]["startup"] == "初创公司7"
+        assert get("/investments/missing")[0] == 404
+        assert get("/investments?cursor=%%%")[0] == 400
+    finally:
+        server.shutdown()
+        server.server_close()
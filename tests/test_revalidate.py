@@ -0,0 +1,145 @@
+from datetime import date
+
+import httpx
+import pytest
+
+from scrapers import policies_npc
+from scrapers.zxkc import ListItem, ZxkcPoliciesClient
+from storage.policies_repository import PolicyRepository
+
+DETAIL = """
+<div class="xw_xq"><div class="b_t">关于科技贷款的通知</div>
+<div class="z_c"><span>时间：2025-08-11</span></div>
+<div class="article_con"><p>{body}</p>{links}</div></div>
+"""
+
+
+class FakeSite:
+    def __init__(self):
+        self.body = "第一版正文"
+        self.links = '<a href="/files/a.pdf">附件一</a>'
+        self.etag = '"v1"'
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path.startswith("/files/"):
+            return httpx.Response(200, content=b"PDF", headers={"content-type": "application/pdf"})
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text=DETAIL.format(body=self.body, links=self.links), headers={"etag": self.etag})
+
+
+class DummyExporter:
+    def __init__(self):
+        self.updated = []
+
+    def update(self, policy):
+        self.updated.append(policy)
+
+
+@pytest.fixture
+def site(monkeypatch, tmp_path):
+    fake = FakeSite()
+
+    def make_client():
+        client = ZxkcPoliciesClient()
+        client.client.close()
+        client.client = httpx.Client(base_url=client.base_url, transport=httpx.MockTransport(fake.handler))
+        return client
+
+    monkeypatch.setattr(policies_npc, "ZxkcPoliciesClient", make_client)
+    monkeypatch.setattr(policies_npc, "PolicyRepository", lambda **kwargs: PolicyRepository(tmp_path / "store"))
+    with make_client() as client:
+        policy = client.fetch_policy(ListItem("2703", "关于科技贷款的通知", "http://www.zxkc.org.cn/index.php?c=show&id=2703", date(2025, 8, 11)))
+    PolicyRepository(tmp_path / "store").upsert_many([policy])
+    fake.requests.clear()
+    return fake
+
+
+def stored_policy(tmp_path):
+    return next(iter(PolicyRepository(tmp_path / "store").load_index().values()))
+
+
+def test_unchanged_policies_cost_one_conditional_request(site, tmp_path):
+    exporter = DummyExporter()
+    stats = policies_npc.revalidate(download_dir=tmp_path / "att", exporter=exporter)
+
+    assert stats == {"not_modified": 1}
+    assert len(site.requests) == 1 and site.requests[0].headers["if-none-match"] == '"v1"'
+    assert not exporter.updated
+
+
+def test_same_content_with_new_etag_is_not_reexported(site, tmp_path):
+    site.etag = '"v2"'
+    exporter = DummyExporter()
+    stats = policies_npc.revalidate(download_dir=tmp_path / "att", exporter=exporter)
+
+    assert stats == {"unchanged": 1}
+    assert not exporter.updated
+    assert stored_policy(tmp_path).etag == '"v2"'
+
+
+def test_validator_only_updates_are_stored_in_one_write(site, tmp_path, monkeypatch):
+    repo = PolicyRepository(tmp_path / "store")
+    original = stored_policy(tmp_path)
+    repo.upsert_many([original.model_copy(update={"id": f"zxkc-{n}", "title": f"关于科技贷款的通知（{n}）"}) for n in range(5)])
+    writes = []
+    upsert_many = PolicyRepository.upsert_many
+    monkeypatch.setattr(PolicyRepository, "upsert_many", lambda self, policies: writes.append(len(policies)) or upsert_many(self, policies))
+    site.etag = '"v2"'
+
+    stats = policies_npc.revalidate(download_dir=tmp_path / "att", exporter=DummyExporter(), batch_size=2)
+
+    assert stats == {"unchanged": 6}
+    assert writes == [6]
+    assert {policy.etag for policy in PolicyRepository(tmp_path / "store").load_index().values()} == {'"v2"'}
+
+
+def test_changed_policy_is_patched_with_new_attachments(site, tmp_path):
+    before = stored_policy(tmp_path).fingerprint
+    site.etag = '"v3"'
+    site.body = "更正后的正文"
+    site.links += '<a href="/files/b.pdf">附件二</a>'
+    exporter = DummyExporter()
+    stats = policies_npc.revalidate(download_dir=tmp_path / "att", exporter=exporter)
+
+    assert stats == {"changed": 1}
+    assert [request.url.path for request in site.requests] == ["/index.php", "/files/b.pdf"]
+    assert len(exporter.updated) == 1
+    policy = stored_policy(tmp_path)
+    assert policy.content_text.startswith("更正后的正文")
+    assert policy.fingerprint != before
+    assert [att.name for att in policy.attachments] == ["附件一", "附件二"]
+
+
+def test_dry_run_reports_changes_without_side_effects(site, tmp_path):
+    site.etag = '"v3"'
+    site.body = "更正后的正文"
+    site.links += '<a href="/files/b.pdf">附件二</a>'
+    exporter = DummyExporter()
+    stats = policies_npc.revalidate(download_dir=tmp_path / "att", exporter=exporter, dry_run=True)
+
+    assert stats == {"changed": 1}
+    assert [request.url.path for request in site.requests] == ["/index.php"]
+    assert not exporter.updated
+    assert not (tmp_path / "att").exists()
+    policy = stored_policy(tmp_path)
+    assert policy.content_text.startswith("第一版正文") and policy.etag == '"v1"'
+
+
+def test_legacy_record_adopts_fresh_fingerprint_without_change(site, tmp_path):
+    repo = PolicyRepository(tmp_path / "store")
+    policy = stored_policy(tmp_path)
+    policy.fingerprint = policy.page_hash = policy.etag = None
+    # Stored by an older parser: the text differs slightly from what is parsed today.
+    policy.content_text = policy.content_text + "【打印本页】【关闭窗口】"
+    repo.upsert_many([policy])
+
+    exporter = DummyExporter()
+    stats = policies_npc.revalidate(download_dir=tmp_path / "att", exporter=exporter)
+
+    assert stats == {"unchanged": 1}
+    assert not exporter.updated
+    stored = stored_policy(tmp_path)
+    assert stored.fingerprint and stored.etag == '"v1"'
@@ -0,0 +1,82 @@
+import time
+from datetime import date, timedelta
+
+from conftest import make_policy
+from extractors.keywords import extract_keywords
+from storage.policies_repository import PolicyRepository
+from storage.search_index import SearchIndex, build_match_query, ngram_tokens
+
+
+
+
+def test_ngram_tokens_and_query():
+    assert ngram_tokens("科技贷款 API") == ["科技", "技贷", "贷款", "api"]
+    assert build_match_query("科技贷款 担保") == '"科技 技贷 贷款" AND "担保"'
+
+
+def test_extract_keywords_prefers_title_terms():
+    keywords = extract_keywords("关于加大科技贷款投放的通知", "支持专精特新企业，完善融资担保。融资担保")
+    assert keywords[0] == "科技贷款"
+    assert {"专精特新", "融资担保"} <= set(keywords)
+
+
+def test_repository_upsert_updates_index_and_filters(tmp_path):
+    repo = PolicyRepository(tmp_path)
+    repo.upsert_many(
+        [
+            make_policy(1, title="关于加大科技贷款投放的通知", content_text="各银行要扩大科技贷款规模。", publish_date=date(2024, 3, 1)),
+            make_policy(2, title="普惠金融工作要点", content_text="提到科技贷款一次。", publish_date=date(2023, 5, 1), region_level="provincial"),
+            make_policy(3, title="融资担保办法", content_text="与本主题无关。", publish_date=date(2024, 7, 1)),
+        ]
+    )
+    index = repo.search_index
+
+    hits = index.search("科技贷款")
+    assert [hit.policy_id for hit in hits] == ["zxkc-1", "zxkc-2"]
+    assert [hit.policy_id for hit in index.search("科技贷款", since=date(2024, 1, 1))] == ["zxkc-1"]
+    assert [hit.policy_id for hit in index.search("科技贷款", region_level="provincial")] == ["zxkc-2"]
+
+    updated = make_policy(3, title="融资担保办法（修订）", content_text="新增科技贷款风险补偿。", publish_date=date(2024, 7, 1))
+    repo.upsert_many([updated])
+    assert {hit.policy_id for hit in index.search("科技贷款")} == {"zxkc-1", "zxkc-2", "zxkc-3"}
+    assert len(index) == 3
+
+
+def test_query_latency_at_scale(tmp_path):
+    index = SearchIndex(tmp_path / "search.sqlite")
+    filler = "为贯彻落实党中央国务院决策部署进一步优化营商环境支持中小企业发展"
+    policies = (
+        make_policy(n, title=f"政策文件 {n}", content_text=filler[n % 7:] + ("科技贷款" if n % 50 == 0 else "融资担保") + filler[: n % 11], publish_date=date(2020, 1, 1) + timedelta(days=n % 1800))
+        for n in range(100_000)
+    )
+    index.index_policies(policies)
+
+    started = time.perf_counter()
+    hits = index.search("科技贷款", since=date(2024, 1, 1), limit=20)
+    elapsed = time.perf_counter() - started
+
+    assert hits and all(hit.publish_date >= date(2024, 1, 1) for hit in hits)
+    assert elapsed < 0.2
+
+
+def test_metadata_changes_refresh_index_filters(tmp_path):
+    index = SearchIndex(tmp_path / "search.sqlite")
+    index.index_policies([make_policy(1, title="科技贷款贴息办法", content_text="支持科技贷款。", region_level="provincial")])
+    assert index.index_policies([make_policy(1, title="科技贷款贴息办法", content_text="支持科技贷款。", region_level="provincial")]) == 0
+
+    assert index.index_policies([make_policy(1, title="科技贷款贴息办法", content_text="支持科技贷款。", publish_date=date(2025, 1, 1), region_level="national")]) == 1
+    assert [hit.policy_id for hit in index.search("科技贷款", region_level="national", since=date(2025, 1, 1))] == ["zxkc-1"]
+    assert not index.search("科技贷款", region_level="provincial")
+
+
+def test_listeners_see_bodies_before_release(tmp_path, monkeypatch):
+    repo = PolicyRepository(tmp_path)
+    seen = []
+    repo.add_listener(lambda policies: seen.extend(policy.bodies_loaded() for policy in policies))
+    monkeypatch.setattr(repo.blobs, "get", lambda policy_id: (_ for _ in ()).throw(AssertionError("body reloaded")))
+
+    policy = make_policy(1, title="科技贷款贴息办法", content_text="支持科技贷款。")
+    repo.upsert_many([policy])
+
+    assert seen == [True]
+    assert not policy.bodies_loaded()
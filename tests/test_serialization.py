@@ -0,0 +1,79 @@
+import io
+import json
+from datetime import date
+
+import pytest
+
+from conftest import make_policy
+from storage.models import Attachment, Policy
+from storage.policies_repository import PolicyRepository
+from storage.serialization import FRAME_HEADER, decode_jsonl, dump_binary, encode_jsonl, load_binary
+
+
+def varied_policy(n: int) -> Policy:
+    """Policy whose date, keywords and attachment checksum vary with ``n``."""
+    return make_policy(
+        n,
+        publish_date=date(2024, 3, 1) if n % 2 else None,
+        keywords=["科技金融", "科技贷款"] if n % 3 else None,
+        attachments=[Attachment(name="附件1.pdf", url=f"http://www.zxkc.org.cn/uploads/{n}.pdf", sha256="ab" * 32)],
+    )
+
+
+def metadata(policy: Policy) -> dict:
+    return policy.model_dump(exclude={"content_html", "content_text", "attachment_text"})
+
+
+def test_trusted_and_validated_jsonl_decode_agree():
+    policies = [varied_policy(n) for n in range(20)]
+    raw = "\n".join(encode_jsonl(policies)).encode("utf-8")
+
+    trusted = decode_jsonl(raw, trusted=True)
+    validated = decode_jsonl(raw, trusted=False)
+
+    assert [metadata(p) for p in trusted] == [metadata(p) for p in validated] == [metadata(p) for p in policies]
+    assert "content_text" not in trusted[0].__dict__
+    trusted[0].attachments.append(Attachment(name="附件2.pdf", url="http://x/2.pdf"))
+    assert len(trusted[1].attachments) == 1
+
+
+def test_binary_round_trip():
+    policies = [varied_policy(n) for n in range(2500)]
+    buffer = io.BytesIO()
+    dump_binary(policies, buffer)
+
+    for trusted in (True, False):
+        buffer.seek(0)
+        loaded = load_binary(buffer, trusted=trusted)
+        assert [metadata(p) for p in loaded] == [metadata(p) for p in policies]
+
+
+def test_binary_frames_are_versioned_json():
+    buffer = io.BytesIO()
+    dump_binary([varied_policy(1)], buffer)
+    raw = buffer.getvalue()
+
+    assert raw[:4] == b"PLB3"
+    (length,) = FRAME_HEADER.unpack(raw[4:8])
+    rows = json.loads(raw[8:8 + length])
+    assert rows[0]["publish_date"] == "2024-03-01" and rows[0]["attachments"][0]["sha256"] == "ab" * 32
+
+    with pytest.raises(ValueError, match="version"):
+        load_binary(io.BytesIO(b"PLB2" + raw[4:]))
+
+
+def test_repository_converts_between_formats(tmp_path):
+    repo = PolicyRepository(tmp_path, similarity_path=tmp_path / "similarity.sqlite")
+    repo.upsert_many([varied_policy(n) for n in range(5)])
+
+    binary = PolicyRepository(tmp_path, similarity_path=tmp_path / "similarity.sqlite", storage_format="binary")
+    assert binary.data_path.name == "policies.bin"
+    assert not (tmp_path / "policies.jsonl").exists()
+    index = binary.load_index()
+    assert len(index) == 5
+    policy = next(p for p in index.values() if p.id == "zxkc-3")
+    assert policy.content_text.endswith("3")
+
+    binary.upsert_many([varied_policy(7)])
+    back = PolicyRepository(tmp_path, similarity_path=tmp_path / "similarity.sqlite", storage_format="jsonl")
+    assert sorted(p.id for p in back.load_index().values()) == [f"zxkc-{n}" for n in (0, 1, 2, 3, 4, 7)]
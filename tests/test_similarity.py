@@ -0,0 +1,104 @@
+import random
+import time
+
+from conftest import make_policy
+from storage.policies_repository import PolicyRepository
+from storage.similarity import SimilarityIndex
+
+SENTENCES = [
+    "为深入贯彻落实党中央国务院关于加快科技金融发展的决策部署。",
+    "各银行业金融机构要加大对科技型中小企业的信贷投放力度。",
+    "鼓励保险机构开发科技保险产品，完善风险分担和补偿机制。",
+    "支持符合条件的科创企业在多层次资本市场上市融资。",
+    "地方政府应当设立科技信贷风险补偿资金池。",
+    "推动知识产权质押融资扩面增量，降低企业融资成本。",
+    "各地要加强部门协同，建立常态化政银企对接机制。",
+    "本通知自印发之日起施行，由国家金融监督管理总局负责解释。",
+]
+
+
+
+
+def random_text(seed, sentences=12):
+    rng = random.Random(seed)
+    return "".join(rng.choice(SENTENCES) + f"第{rng.randint(1, 10_000)}条。" for _ in range(sentences))
+
+
+def test_repost_on_other_site_is_linked_to_canonical(tmp_path):
+    index = SimilarityIndex(tmp_path / "similarity.sqlite")
+    original = make_policy(1, content_text=random_text(1))
+    index.add(original)
+
+    repost = make_policy(9, content_text="转载：" + original.content_text[:-8] + "（来源：中小科创）", title="【转】科技金融通知", site="wechat_finreg")
+    other = make_policy(2, content_text=random_text(2))
+
+    assert index.flag(repost) == "zxkc-1"
+    assert repost.duplicate_of == "zxkc-1"
+    assert index.flag(other) is None
+    second_repost = make_policy(3, content_text=original.content_text, site="ggjrdn_policies")
+    assert index.flag(second_repost) == "zxkc-1"
+
+
+def test_short_placeholder_bodies_are_not_matched(tmp_path):
+    index = SimilarityIndex(tmp_path / "similarity.sqlite")
+    placeholder = "正文以图片形式呈现，详情见附件中的图片文件。"
+    index.add(make_policy(1, content_text=placeholder))
+    assert index.flag(make_policy(2, content_text=placeholder)) is None
+
+
+def test_repository_registers_upserted_policies(tmp_path):
+    shared = tmp_path / "similarity.sqlite"
+    repo = PolicyRepository(tmp_path / "zxkc", similarity_path=shared)
+    text = random_text(3)
+    repo.upsert_many([make_policy(1, content_text=text)])
+    other_site = PolicyRepository(tmp_path / "ggjrdn_policies", similarity_path=shared)
+    repost = make_policy(1, content_text=text, site="ggjrdn_policies")
+    assert other_site.flag_duplicate(repost) == "zxkc-1"
+    assert not (tmp_path / "zxkc" / "similarity.sqlite").exists()
+
+    other_site.upsert_many([repost])
+    assert other_site.flag_duplicate(make_policy(2, content_text=text, site="ggjrdn_policies")) == "zxkc-1"
+
+
+def test_default_index_lives_in_store_root(tmp_path):
+    repo = PolicyRepository(tmp_path / "zxkc")
+    assert repo.similarity.path == tmp_path / "zxkc" / "similarity.sqlite"
+
+
+def test_flag_registers_only_after_store_write(tmp_path):
+    index = SimilarityIndex(tmp_path / "similarity.sqlite")
+    text = random_text(4)
+    index.add(make_policy(1, content_text=text))
+    repost = make_policy(1, content_text=text, site="wechat_finreg")
+
+    assert index.flag(repost) == "zxkc-1"
+    # The write failed: nothing else may be linked to the unstored repost.
+    assert index._conn.execute("SELECT 1 FROM signatures WHERE policy_id = ?", (repost.id,)).fetchone() is None
+
+    index.add_policies([repost])
+    row = index._conn.execute("SELECT canonical_id FROM signatures WHERE policy_id = ?", (repost.id,)).fetchone()
+    assert row == ("zxkc-1",)
+
+
+def test_amended_body_is_re_signed(tmp_path):
+    index = SimilarityIndex(tmp_path / "similarity.sqlite")
+    policy = make_policy(1, content_text=random_text(5))
+    index.add_policies([policy])
+    old_text = policy.content_text
+
+    policy.content_text = random_text(6)
+    index.add_policies([policy])
+
+    assert index.find_duplicate(make_policy(2, content_text=policy.content_text)) == "zxkc-1"
+    assert index.find_duplicate(make_policy(3, content_text=old_text)) is None
+
+
+def test_lookup_stays_fast_with_many_signatures(tmp_path):
+    index = SimilarityIndex(tmp_path / "similarity.sqlite")
+    for n in range(2000):
+        index.add(make_policy(n, content_text=random_text(n)))
+    probe = make_policy(10_000, content_text=random_text(1234))
+    started = time.perf_counter()
+    for _ in range(20):
+        index.find_duplicate(probe)
+    assert (time.perf_counter() - started) / 20 < 0.05
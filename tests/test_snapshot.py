@@ -0,0 +1,99 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from conftest import make_policy
+from storage.models import BankMetric, Policy, Product
+from storage.policies_repository import PolicyRepository
+from storage.records_repository import bank_metric_repository, product_repository
+from storage.snapshot import SnapshotExporter
+
+
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    return SnapshotExporter(
+        tmp_path / "snapshots",
+        policies=PolicyRepository(tmp_path / "policies"),
+        products=product_repository(tmp_path / "products"),
+        bank_metrics=bank_metric_repository(tmp_path / "metrics"),
+    )
+
+
+def test_snapshot_partitions_and_separates_bodies(exporter):
+    exporter.policies.upsert_many([make_policy(n) for n in range(3)] + [make_policy(9, site="ggjrdn_policies", publish_date=date(2023, 1, 1))])
+    exporter.products.upsert_many([Product(org="光谷银行", product_name="科创贷", source_url="https://example.com/p")])
+    exporter.bank_metrics.upsert_many([BankMetric(bank="招商银行", metric="科技贷款余额", year=2024, value=1.2, unit="万亿元", evidence_url="https://example.com/n")])
+
+    counts = exporter.export()
+
+    assert counts == {"policies": 4, "products": 1, "bank_metrics": 1}
+    assert (exporter.out_dir / "policies" / "site=zxkc" / "publish_year=2024").is_dir()
+    meta = pd.read_parquet(exporter.out_dir / "policies", filters=[("site", "==", "ggjrdn_policies")])
+    assert meta["id"].tolist() == ["ggjrdn_policies-9"]
+    assert "content_text" not in meta.columns
+    bodies = pd.read_parquet(exporter.out_dir / "policy_bodies")
+    assert set(bodies["content_text"]) == {"正文 0", "正文 1", "正文 2", "正文 9"}
+    assert len(pd.read_parquet(exporter.out_dir / "bank_metrics")) == 1
+
+
+def test_policy_bodies_are_not_kept_on_the_models(exporter, monkeypatch):
+    exporter.policies.upsert_many([make_policy(n) for n in range(3)])
+    loaded = []
+    monkeypatch.setattr(Policy, "load_bodies", lambda self: loaded.append(self.id))
+
+    exporter.export()
+
+    assert loaded == []
+    assert len(pd.read_parquet(exporter.out_dir / "policy_bodies")) == 3
+
+
+def test_snapshot_is_incremental(exporter):
+    exporter.policies.upsert_many([make_policy(n) for n in range(3)])
+    exporter.export()
+    exporter.policies.upsert_many([make_policy(3)])
+
+    assert exporter.export()["policies"] == 1
+    assert exporter.export()["policies"] == 0
+    assert sorted(pd.read_parquet(exporter.out_dir / "policies")["id"]) == ["zxkc-0", "zxkc-1", "zxkc-2", "zxkc-3"]
+
+
+def test_snapshot_schema_is_stable_across_partitions(exporter):
+    sparse = make_policy(1, publish_date=date(2023, 1, 1))
+    sparse.region_level = None
+    exporter.policies.upsert_many([sparse])
+    exporter.export()
+    full = make_policy(2)
+    full.keywords = ["科技金融"]
+    full.google_doc_url = "https://docs.google.com/document/d/2"
+    exporter.policies.upsert_many([full])
+    exporter.export()
+
+    meta = pd.read_parquet(exporter.out_dir / "policies").set_index("id")
+    assert meta.loc["zxkc-2", "google_doc_url"] == "https://docs.google.com/document/d/2"
+    assert list(meta.loc["zxkc-2", "keywords"]) == ["科技金融"]
+    assert meta[["region_level", "google_doc_url"]].loc["zxkc-1"].isna().all()
+
+
+def test_amended_records_replace_their_exported_rows(exporter):
+    policies = [make_policy(n) for n in range(3)]
+    exporter.policies.upsert_many(policies)
+    exporter.bank_metrics.upsert_many([BankMetric(bank="招商银行", metric="科技贷款余额", year=2024, value=1.2, unit="万亿元", evidence_url="https://example.com/n")])
+    exporter.export()
+
+    policies[1].google_doc_url = "https://docs.google.com/document/d/1"
+    policies[2].content_text = "更正后的正文"
+    exporter.policies.upsert_many(policies[1:])
+    exporter.bank_metrics.upsert_many([BankMetric(bank="招商银行", metric="科技贷款余额", year=2024, value=1.3, unit="万亿元", evidence_url="https://example.com/n")])
+
+    assert exporter.export() == {"policies": 2, "products": 0, "bank_metrics": 1}
+    meta = pd.read_parquet(exporter.out_dir / "policies").set_index("id")
+    assert len(meta) == 3
+    assert meta.loc["zxkc-1", "google_doc_url"] == "https://docs.google.com/document/d/1"
+    bodies = pd.read_parquet(exporter.out_dir / "policy_bodies").set_index("id")
+    assert len(bodies) == 3 and bodies.loc["zxkc-2", "content_text"] == "更正后的正文"
+    assert pd.read_parquet(exporter.out_dir / "bank_metrics")["value"].tolist() == [1.3]
@@ -0,0 +1,146 @@
+import multiprocessing
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from scrapers import policies_npc
+from scrapers.zxkc import ZxkcPoliciesClient
+from storage.policies_repository import PolicyRepository
+from storage.work_queue import WorkQueue
+
+PAGES = 4
+PER_PAGE = 8
+DETAIL_DELAY = 0.1
+
+
+class StandInSite(BaseHTTPRequestHandler):
+    """Tiny zxkc look-alike: PAGES list pages of PER_PAGE articles, slow detail pages."""
+
+    def do_GET(self):
+        qs = parse_qs(urlparse(self.path).query)
+        if qs.get("c") == ["category"]:
+            page = int(qs["page"][0])
+            body = self._list_page(page)
+        else:
+            time.sleep(DETAIL_DELAY)
+            article_id = qs["id"][0]
+            body = (
+                '<div class="xw_xq"><div class="b_t">政策 {0}</div>'
+                '<div class="z_c"><span>时间：2025-01-01</span></div>'
+                '<div class="article_con"><p>正文 {0}</p></div></div>'
+            ).format(article_id)
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _list_page(self, page):
+        if page > PAGES:
+            return '<div class="lsrw"></div>'
+        links = "".join(
+            f'<a href="/index.php?c=show&id={page * 100 + n}" class="newa"><p>政策 {page * 100 + n}</p><span>2025-01-01</span></a>'
+            for n in range(PER_PAGE)
+        )
+        return f'<div class="lsrw">{links}</div>'
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInSite)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_lease_expiry_redelivers_job(tmp_path):
+    with WorkQueue(tmp_path / "q.sqlite", lease_seconds=0.05) as queue:
+        assert queue.enqueue("detail", "detail:1", {"id": 1})
+        assert not queue.enqueue("detail", "detail:1", {"id": 1})
+        first = queue.lease("a")
+        assert first is not None
+        assert queue.lease("b") is None
+        time.sleep(0.1)
+        second = queue.lease("b")
+        assert second.id == first.id and second.attempts == 2
+        queue.complete(second)
+        assert queue.is_drained()
+        assert queue.counts() == {"done": 1}
+
+
+def test_failed_job_is_retried_until_max_attempts(tmp_path):
+    with WorkQueue(tmp_path / "q.sqlite", max_attempts=2) as queue:
+        queue.enqueue("detail", "detail:1", {})
+        queue.fail(queue.lease("a"), "boom")
+        queue.fail(queue.lease("a"), "boom")
+        assert queue.lease("a") is None
+        assert queue.counts() == {"failed": 1}
+
+
+def test_expired_last_attempt_fails_and_can_be_requeued(tmp_path):
+    with WorkQueue(tmp_path / "q.sqlite", lease_seconds=0.05, max_attempts=2) as queue:
+        queue.enqueue("list", "list:1", {"page": 1})
+        queue.fail(queue.lease("a"), "boom")
+        assert queue.lease("a") is not None  # this worker dies holding the last attempt
+        time.sleep(0.1)
+        assert queue.lease("b") is None
+        assert queue.is_drained()
+        assert queue.counts() == {"failed": 1}
+        assert queue.enqueue("list", "list:1", {"page": 1}, reset_done=True)
+        assert queue.lease("b").attempts == 1
+
+
+def _worker_process(root, site, queue_path, worker_id, barrier, spans):
+    policies_npc.PolicyRepository = lambda **kwargs: PolicyRepository(root)
+    policies_npc.ZxkcPoliciesClient = lambda: ZxkcPoliciesClient(base_url=site)
+    barrier.wait()
+    started = time.time()
+    policies_npc.work(queue_path, worker_id=worker_id, download_dir=root / "att", skip_google_docs=True, poll_interval=0.01)
+    spans.put((started, time.time()))
+
+
+def _crawl_with_workers(root, site, workers):
+    """Drain a fresh queue with ``workers`` processes; returns the wall time from the common start."""
+    queue_path = root / "queue.sqlite"
+    policies_npc.enqueue(queue_path)
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    spans = ctx.Queue()
+    processes = [ctx.Process(target=_worker_process, args=(root, site, queue_path, f"w{n}", barrier, spans)) for n in range(workers)]
+    for process in processes:
+        process.start()
+    times = [spans.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join(timeout=120)
+    assert [process.exitcode for process in processes] == [0] * workers
+    return max(end for _, end in times) - min(start for start, _ in times)
+
+
+def test_worker_processes_split_crawl(tmp_path, site):
+    workers = 4
+    single = _crawl_with_workers(tmp_path / "single", site, 1)
+    root = tmp_path / "store"
+    queue_path = root / "queue.sqlite"
+    parallel = _crawl_with_workers(root, site, workers)
+    # Detail pages take DETAIL_DELAY each, so throughput scales with workers
+    # (loose bound: process start-up and list pages are not parallel).
+    assert single / parallel > 1.8, f"1 worker {single:.2f}s, {workers} workers {parallel:.2f}s"
+
+    with sqlite3.connect(queue_path) as conn:
+        statuses = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        done_by = dict(conn.execute("SELECT worker, COUNT(*) FROM jobs WHERE kind = 'detail' AND status = 'done' GROUP BY worker").fetchall())
+    assert statuses == {"done": PAGES + 1 + PAGES * PER_PAGE}
+    # Every worker process took part in fetching detail pages.
+    assert set(done_by) == {f"w{n}" for n in range(workers)}
+    assert sum(done_by.values()) == PAGES * PER_PAGE
+    assert len(PolicyRepository(root).load_index()) == PAGES * PER_PAGE